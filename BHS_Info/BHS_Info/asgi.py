@@ -11,6 +11,7 @@ import os
 
 from django.core.asgi import get_asgi_application
 
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'BHS_Info.settings')
+# the pages querying the backend are served by the asynchronous views (see settings_asgi.py)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'BHS_Info.settings_asgi')
 
 application = get_asgi_application()
@@ -45,6 +45,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'info.timing.TimingMiddleware',
+    'info.middleware.CompressionMiddleware',
     'django.middleware.common.CommonMiddleware',
 ]
 
@@ -0,0 +1,17 @@
+"""
+Django settings of BHS_Info served by ASGI (see asgi.py).
+
+The same as settings, but the pages querying the backend are served by the asynchronous views (see info/urls_async.py),
+which query the backend with httpx; so httpx is required (pip install httpx).
+"""
+
+from django.core.exceptions import ImproperlyConfigured
+
+from .settings import *
+
+try:
+    import httpx
+except ImportError as err:
+    raise ImproperlyConfigured('The asynchronous views (ASGI) require httpx: pip install httpx') from err
+
+ROOT_URLCONF = 'BHS_Info.urls_async'
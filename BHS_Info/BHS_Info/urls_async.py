@@ -0,0 +1,7 @@
+"""BHS_Info URL Configuration of the application served by ASGI (see settings_asgi.py)
+"""
+from django.urls import path, include
+
+urlpatterns = [
+    path('', include('info.urls_async')),
+]
@@ -1,7 +1,20 @@
 from django.apps import AppConfig
+from django.core.signals import request_started
 from configparser import ConfigParser
 
 
+def _start_snapshot_poller(sender, **kwargs):
+    from .restinfo import start_snapshot_poller
+    request_started.disconnect(dispatch_uid=InfoConfig.POLLER_DISPATCH_UID)
+    start_snapshot_poller()
+
+
 class InfoConfig(AppConfig):
     name = 'info'
 
+    POLLER_DISPATCH_UID = 'bhs-info-snapshot-poller'
+
+    def ready(self):
+        # the poller is started by the first request, so only in the process serving the requests
+        # (not in the management commands)
+        request_started.connect(_start_snapshot_poller, dispatch_uid=self.POLLER_DISPATCH_UID)
@@ -0,0 +1,481 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Event, Lock, Thread
+from urllib.parse import parse_qs, urlsplit
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer
+import json
+import math
+import random
+import time
+
+import requests
+from django.conf import settings
+
+from . import restinfo
+from .bundle import PARAM_PATHS, PART_BODY, PART_CONTENT_TYPE, PART_STATUS
+from .restcache import HistoryCache
+from .restconfig import RestConfig
+
+CONTENT_TYPE_JSON = 'application/json'
+CONTENT_TYPE_SVG = 'image/svg+xml'
+
+# the paths of the graphs start with this prefix (see [REST] of web-info.ini), all the other endpoints return JSON
+GRAPH_PATH_PREFIX = '/graph/'
+# the path of the bundles, if served by the stub
+STUB_BUNDLE_PATH = '/bundle'
+# the entry of the JSON object naming the class of the bean it is decoded to (see core.bean.json_to_bean)
+BEAN_TYPE_KEY = 'type'
+
+
+def synthetic_graph(points: int) -> str:
+    """
+    :param points: number of points of the plotted line
+    :return: SVG resembling the graphs of the backend (matplotlib): XML prolog, metadata, style, long decimals
+    """
+    line = ' L '.join(f'{57.6 + i * 357.12 / max(1, points - 1):.6f} {174.528 + 100 * math.sin(i / 10):.6f}'
+                      for i in range(points))
+    return '<?xml version="1.0" encoding="utf-8" standalone="no"?>\n' \
+           '<!-- Created with matplotlib (https://matplotlib.org/) -->\n' \
+           '<svg height="345.6pt" version="1.1" viewBox="0 0 460.8 345.6" width="460.8pt" ' \
+           'xmlns="http://www.w3.org/2000/svg" xmlns:xlink="http://www.w3.org/1999/xlink">\n' \
+           ' <metadata><rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#"></rdf:RDF></metadata>\n' \
+           ' <defs>\n  <style type="text/css">*{stroke-linecap:butt;stroke-linejoin:round;}</style>\n </defs>\n' \
+           f' <g id="figure_1">\n  <path d="M {line}" style="fill:none;stroke:#1f77b4;stroke-width:1.5;"/>\n' \
+           ' </g>\n</svg>\n'
+
+
+def _bean(bean_type: str, **attributes) -> dict:
+    return dict(attributes, **{BEAN_TYPE_KEY: bean_type})
+
+
+def _moment(moment: datetime) -> str:
+    return moment.strftime('%Y-%m-%d %H:%M:%S')
+
+
+def synthetic_fixtures(configuration: RestConfig, now: datetime = None) -> dict:
+    """
+    The responses of the endpoints presented by the views, synthesized (not recorded, see record_fixtures),
+    so that the benchmark measures the views presenting the information, not the path of the unavailable one.
+    Each bean has all the attributes the views read; the readings are taken a minute before now.
+    :param configuration: the endpoints not configured in [REST] are skipped
+    :param now: the time the fixtures are synthesized for, the current one if not given
+    :return: the fixtures by path (see StubBackend)
+    """
+    now = now if now is not None else datetime.now()
+    taken_at = _moment(now - timedelta(minutes=1))
+    locations = (restinfo.SENSOR_LOC_EXTERNAL, restinfo.SENSOR_LOC_BUNKER, restinfo.SENSOR_LOC_OFFICE,
+                 restinfo.SENSOR_LOC_SYSTEM, restinfo.SENSOR_LOC_RPIRED, restinfo.SENSOR_LOC_ATTIC,
+                 restinfo.SENSOR_LOC_ROOF, restinfo.SENSOR_LOC_CHIMINEY, restinfo.SENSOR_LOC_WEATHERSTATION,
+                 restinfo.SENSOR_LOC_RPIVIOLET, restinfo.SENSOR_LOC_RPICOPPER, restinfo.SENSOR_LOC_GARDEN,
+                 restinfo.SENSOR_LOC_GRASS)
+
+    def _statistics(temp_min: float, temp_avg: float, temp_max: float) -> dict:
+        return _bean('TemperatureStatisticsJson', temp_min=temp_min, temp_avg=temp_avg, temp_max=temp_max,
+                     min_at=_moment(now.replace(hour=4, minute=30)), max_at=_moment(now.replace(hour=14, minute=15)))
+
+    def _activity(name: str) -> dict:
+        return _bean('ServiceActivityStateJson', name=name, state=restinfo.ServiceActivityState.OK.name,
+                     timestamp=taken_at, message='running')
+
+    responses = {
+        RestConfig.OPTION_CURRENT_TEMP: [
+            _bean('TemperatureReadingJson', sensor_location=_location, temperature=20.0 + _i / 2, timestamp=taken_at)
+            for _i, _location in enumerate(locations)],
+        RestConfig.OPTION_CURRENT_CESSPIT: _bean(
+            'CesspitInterpretedReadingJson', failure_detected=False,
+            original_reading=_bean('CesspitReadingJson', fill=42, timestamp=taken_at)),
+        RestConfig.OPTION_CURRENT_CESSPIT_PREDICTION: _bean(
+            'CesspitPredictionJson', predicted_date=_moment(now + timedelta(days=12)), as_of_date=taken_at),
+        RestConfig.OPTION_CURRENT_CESSPIT_LOG: _bean(
+            'ServiceLogJson', log_entries=[f'{_moment(now - timedelta(hours=_h))} level measured'
+                                           for _h in range(20, 0, -1)]),
+        RestConfig.OPTION_CURRENT_HUMIDITY_IN: _bean(
+            'ValueTendencyJson', current_value=45.0, tendency=restinfo.Tendency.STEADY.name),
+        RestConfig.OPTION_CURRENT_PRESSURE: _bean(
+            'ValueTendencyJson', current_value=1013.0, tendency=restinfo.Tendency.RISING.name),
+        RestConfig.OPTION_CURRENT_AIR_QUALITY: _bean(
+            'AirQualityInterpretedReadingJson', pm_10=38, pm_2_5=52,
+            original_reading=_bean('AirQualityReadingJson', pm_10=19, pm_2_5=13, timestamp=taken_at)),
+        RestConfig.OPTION_CURRENT_DAYLIGHT: _bean(
+            'DaylightInterpretedReadingJson', time_of_day=restinfo.TimeOfDay.DAY.name, sunrise='06:12',
+            sunset='19:48',
+            original_reading=_bean('DaylightReadingJson', is_sunlight=True, luminescence_perc=64, timestamp=taken_at)),
+        RestConfig.OPTION_CURRENT_SOIL_MOISTURE: [
+            _bean('ValueTendencyJson', current_value=31.0 + _i, tendency=restinfo.Tendency.FALLING.name)
+            for _i in range(3)],
+        RestConfig.OPTION_CURRENT_SOLAR_PLANT: _bean(
+            'SolarPlantInterpretedReadingJson', current_production_perc=55, hourly_min_perc=40, hourly_avg_perc=50,
+            hourly_max_perc=60,
+            reading=_bean('SolarPlantReadingJson', last_production_at=taken_at, current_production_w=3300,
+                          daily_production_kwh=12.4, hourly_min_w=2400, hourly_avg_w=3000, hourly_max_w=3600)),
+        RestConfig.OPTION_CURRENT_PRECIPITATION: _bean(
+            'PrecipitationObservationsReadingJson', is_raining=False, precipitation_mm=0.4, observation_duration_h=24),
+        RestConfig.OPTION_CURRENT_WIND: _bean(
+            'WindObservationsReadingJson',
+            long_term_observation=_bean('WindObservationJson', direction=restinfo.WindDirection.SW.name,
+                                        direction_var=12, wind_peak=31, wind_speed=14),
+            short_term_observation=_bean('WindObservationJson', direction=restinfo.WindDirection.SW.name,
+                                         direction_var=8, wind_peak=22, wind_speed=12)),
+        RestConfig.OPTION_CURRENT_WATER_TANK: _bean('WaterLevelReadingJson', fill=76, timestamp=taken_at),
+        RestConfig.OPTION_SYSTEM_STATUS: _bean(
+            'SystemStatusJson', timestamp=taken_at,
+            internet_connection_status=_bean(
+                'InternetConnectionStatusJson', timestamp=taken_at, alive=True, download_kbps=300000,
+                upload_kbps=30000, ping_microseconds=12500, jitter_microseconds=800, external_ip='192.0.2.1'),
+            database_status=_bean('DatabaseStatusJson', timestamp=taken_at, is_available=True,
+                                  connected_to='RPiCopper', log=None, issue=None),
+            service_statuses=[
+                _bean('ServiceStatusJson', name=_service, hostname='RPiCopper',
+                      activities_state=[_activity(f'{_service}-{_i}') for _i in range(3)])
+                for _service in ('temperature', 'cesspit', 'weather')],
+            host_statuses=[
+                _bean('HostStatusJson', host_name=_host, timestamp=taken_at,
+                      boot_time=_moment(now - timedelta(days=9, hours=5)), up=True)
+                for _host in ('RPiCopper', 'RPiRed', 'RPiViolet')]),
+        RestConfig.OPTION_HISTORY_TEMP_DAILY: _bean(
+            'TemperatureDailyStatistics', statistics_24h=_statistics(8.5, 13.2, 19.0),
+            statistics_day=_statistics(11.0, 15.1, 19.0), statistics_night=_statistics(8.5, 10.3, 12.0)),
+    }
+    paths = configured_paths(configuration)
+    return {paths[_name]: {'content_type': CONTENT_TYPE_JSON, 'body': json.dumps(_response)}
+            for _name, _response in responses.items() if _name in paths}
+
+
+def check_fixtures(fixtures: dict) -> list:
+    """
+    :param fixtures: the fixtures by path (see StubBackend)
+    :return: the paths of the JSON fixtures, which are not decoded to the successful beans (so presented as
+             unavailable by the views)
+    """
+    failed = []
+    for path, fixture in fixtures.items():
+        if fixture['content_type'] != CONTENT_TYPE_JSON:
+            continue
+        try:
+            decoded = restinfo._decode(fixture['body'])
+            beans = decoded if type(decoded) == list else [decoded]
+            if not all(_decoded.has_succeeded() for _decoded in beans):
+                failed.append(path)
+        except Exception:
+            failed.append(path)
+    return failed
+
+
+class StubBackend:
+
+    def __init__(self, fixtures: dict = None, latency: float = 0.0, jitter: float = 0.0, failure_rate: float = 0.0,
+                 failure_status: int = 503, graph_points: int = 500, port: int = 0, bundle_path: str = None):
+        """
+        Local imitation of the REST backend of BHS, for benchmarking.
+        Answers each path with the recorded response (fixture) or, if there's none, with the synthesized one
+        (see synthetic_fixtures), a synthetic graph (paths under /graph/) or an empty JSON object;
+        the parameters of the requests are ignored.
+        :param fixtures: the recorded responses by path: {"content_type": ..., "body": ...} (see record_fixtures);
+                         they take precedence over the synthesized ones
+        :param latency: seconds each response is delayed by
+        :param jitter: max additional (random, uniform) delay, in seconds
+        :param failure_rate: the fraction (0..1) of requests answered with failure_status
+        :param failure_status: the HTTP status of the injected failures
+        :param graph_points: size of the synthetic graphs
+        :param port: the port to listen on; 0 picks a free one
+        :param bundle_path: if given, the bundles of the other paths are served at this path (see info/bundle.py)
+        """
+        self.bundle_path = bundle_path
+        self.fixtures = dict(synthetic_fixtures(restinfo.rest_configuration), **(fixtures or {}))
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.failure_status = failure_status
+        self._graph = synthetic_graph(graph_points).encode()
+        self._served = 0
+        self._failed = 0
+        self._lock = Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', port), self._handler())
+        self._server.daemon_threads = True
+
+    @property
+    def host(self) -> str:
+        return self._server.server_address[0]
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def counters(self) -> tuple:
+        """
+        :return: (number of the requests served, number of the injected failures)
+        """
+        with self._lock:
+            return self._served, self._failed
+
+    def _response(self, path: str) -> tuple:
+        fixture = self.fixtures.get(path)
+        if fixture is not None:
+            return fixture['content_type'], fixture['body'].encode()
+        if path.startswith(GRAPH_PATH_PREFIX):
+            return CONTENT_TYPE_SVG, self._graph
+        return CONTENT_TYPE_JSON, b'{}'
+
+    def _bundle(self, query: str) -> tuple:
+        parts = {}
+        for path in [_path for _value in parse_qs(query).get(PARAM_PATHS, []) for _path in _value.split(',') if _path]:
+            content_type, body = self._response(path)
+            parts[path] = {PART_STATUS: 200, PART_CONTENT_TYPE: content_type, PART_BODY: body.decode()}
+        return CONTENT_TYPE_JSON, json.dumps(parts).encode()
+
+    def _handler(self):
+        stub = self
+
+        class _Handler(BaseHTTPRequestHandler):
+
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                time.sleep(stub.latency + random.uniform(0, stub.jitter))
+                failed = random.random() < stub.failure_rate
+                with stub._lock:
+                    stub._served += 1
+                    stub._failed += 1 if failed else 0
+                if failed:
+                    status, content_type, body = stub.failure_status, 'text/plain', b'injected failure'
+                else:
+                    status = 200
+                    url = urlsplit(self.path)
+                    content_type, body = stub._bundle(url.query) if url.path == stub.bundle_path \
+                        else stub._response(url.path)
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return _Handler
+
+    def start(self):
+        Thread(target=self._server.serve_forever, name='bhs-stub-backend', daemon=True).start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def redirect_backend(stub: StubBackend, history_dir: str):
+    """
+    Points the application to the stub: the stub's address, no background polling,
+    the history cache in the given (temporary) directory, never mixed with the real one; the caches are emptied.
+    The bundles are used only if the stub serves them.
+    """
+    configuration = restinfo.rest_configuration
+    configuration.set(RestConfig.SECTION_REST, RestConfig.OPTION_HOST, stub.host)
+    configuration.set(RestConfig.SECTION_REST, RestConfig.OPTION_PORT, str(stub.port))
+    if stub.bundle_path:
+        configuration.set(RestConfig.SECTION_REST, RestConfig.OPTION_BUNDLE, stub.bundle_path)
+    else:
+        configuration.remove_option(RestConfig.SECTION_REST, RestConfig.OPTION_BUNDLE)
+    if configuration.has_section(RestConfig.SECTION_POLLER):
+        configuration.set(RestConfig.SECTION_POLLER, RestConfig.OPTION_ENABLED, 'no')
+    restinfo.snapshot_poller.stop()
+    restinfo.history_cache = HistoryCache(history_dir)
+    restinfo.response_cache.clear()
+    restinfo.svg_cache.clear()
+    restinfo.bean_cache.clear()
+    restinfo.fragment_cache.clear()
+
+
+def allowed_host() -> str:
+    """
+    :return: the host name the requests to the application must carry (see ALLOWED_HOSTS)
+    """
+    return next((_host for _host in settings.ALLOWED_HOSTS if '*' not in _host), 'localhost')
+
+
+def configured_paths(configuration: RestConfig) -> dict:
+    """
+    :return: the paths of all the endpoints configured in [REST], by endpoint name
+    """
+    return {name: endpoint.path for name, endpoint in configuration.registry().endpoints.items()}
+
+
+def record_fixtures(configuration: RestConfig, session, timeout: float = 30) -> dict:
+    """
+    Records the current responses of the real backend (the one configured), to be replayed by StubBackend
+    :param session: requests.Session (or compatible) used to query the backend
+    :return: the fixtures by path, the failed endpoints are skipped
+    """
+    host = configuration.get(RestConfig.SECTION_REST, RestConfig.OPTION_HOST)
+    port = configuration.get(RestConfig.SECTION_REST, RestConfig.OPTION_PORT)
+    fixtures = {}
+    for name, path in configured_paths(configuration).items():
+        try:
+            response = session.get(f'http://{host}:{port}{path}', timeout=timeout)
+        except requests.RequestException:
+            continue
+        if response.status_code == 200:
+            fixtures[path] = {'content_type': response.headers.get('Content-Type', CONTENT_TYPE_JSON),
+                              'body': response.text}
+    return fixtures
+
+
+def load_fixtures(path: str) -> dict:
+    with open(path) as fixtures_file:
+        return json.load(fixtures_file)
+
+
+def save_fixtures(path: str, fixtures: dict):
+    with open(path, 'w') as fixtures_file:
+        json.dump(fixtures, fixtures_file, indent=1)
+
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    """
+    :param sorted_values: the values, ascending
+    :param fraction: e.g. 0.95 for 95th percentile
+    :return: the nearest-rank percentile or NaN if there are no values
+    """
+    if not sorted_values:
+        return float('nan')
+    return sorted_values[max(0, math.ceil(fraction * len(sorted_values)) - 1)]
+
+
+class LatencyReport:
+
+    def __init__(self, name: str):
+        """
+        Collects the latencies (seconds) of the requests of one kind, e.g. of a view
+        """
+        self.name = name
+        self.latencies = []
+        self.errors = 0
+        self._lock = Lock()
+
+    def add(self, latency: float, failed: bool = False):
+        with self._lock:
+            self.latencies.append(latency)
+            self.errors += 1 if failed else 0
+
+    def summary(self, elapsed: float) -> dict:
+        """
+        :param elapsed: the wall-clock time (seconds) of the whole run, for throughput
+        :return: count, errors, p50/p95/p99/max (milliseconds) and throughput (requests per second)
+        """
+        latencies = sorted(self.latencies)
+        return {
+            'count': len(latencies),
+            'errors': self.errors,
+            'p50': percentile(latencies, 0.50) * 1000,
+            'p95': percentile(latencies, 0.95) * 1000,
+            'p99': percentile(latencies, 0.99) * 1000,
+            'max': (latencies[-1] if latencies else float('nan')) * 1000,
+            'rps': len(latencies) / elapsed if elapsed > 0 else float('nan')
+        }
+
+
+class WorkerStats:
+
+    SAMPLING_INTERVAL = 0.1
+
+    def __init__(self, workers: int):
+        """
+        The load of the workers of PooledWSGIServer: how many are busy and how long the requests wait for them
+        :param workers: the number of the workers
+        """
+        self.workers = workers
+        self.busy = 0
+        self.max_busy = 0
+        self.queue_waits = []
+        self._samples = 0
+        self._saturated_samples = 0
+        self._lock = Lock()
+        self._stop = Event()
+
+    def started(self, queue_wait: float):
+        with self._lock:
+            self.busy += 1
+            self.max_busy = max(self.max_busy, self.busy)
+            self.queue_waits.append(queue_wait)
+
+    def finished(self):
+        with self._lock:
+            self.busy -= 1
+
+    def _sample(self):
+        while not self._stop.wait(self.SAMPLING_INTERVAL):
+            with self._lock:
+                self._samples += 1
+                self._saturated_samples += 1 if self.busy >= self.workers else 0
+
+    def start_sampling(self):
+        Thread(target=self._sample, name='bhs-worker-stats', daemon=True).start()
+
+    def stop_sampling(self):
+        self._stop.set()
+
+    def summary(self) -> dict:
+        """
+        :return: max number of busy workers, the fraction of time all of them were busy, p95/max waiting (ms)
+        """
+        with self._lock:
+            waits = sorted(self.queue_waits)
+            return {
+                'workers': self.workers,
+                'max_busy': self.max_busy,
+                'saturated': self._saturated_samples / self._samples if self._samples else 0.0,
+                'queue_wait_p95': percentile(waits, 0.95) * 1000,
+                'queue_wait_max': (waits[-1] if waits else float('nan')) * 1000
+            }
+
+
+class _QuietWSGIRequestHandler(WSGIRequestHandler):
+
+    def log_message(self, format, *args):
+        pass
+
+
+class PooledWSGIServer(WSGIServer):
+
+    request_queue_size = 128
+
+    def __init__(self, application, workers: int, port: int = 0, host: str = '127.0.0.1'):
+        """
+        Serves the WSGI application with the fixed number of worker threads, like mod_wsgi daemon process does;
+        the connections wait (in the queue) while all the workers are busy
+        :param application: the WSGI application
+        :param workers: number of the worker threads
+        :param port: the port to listen on; 0 picks a free one
+        :param host: the address to listen on
+        """
+        WSGIServer.__init__(self, (host, port), _QuietWSGIRequestHandler)
+        self.set_app(application)
+        self.stats = WorkerStats(workers)
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bhs-wsgi-worker')
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def process_request(self, request, client_address):
+        self._pool.submit(self._process, request, client_address, time.perf_counter())
+
+    def _process(self, request, client_address, queued_at: float):
+        self.stats.started(time.perf_counter() - queued_at)
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self.stats.finished()
+
+    def start(self):
+        self.stats.start_sampling()
+        Thread(target=self.serve_forever, name='bhs-wsgi-server', daemon=True).start()
+
+    def stop(self):
+        self.shutdown()
+        self.stats.stop_sampling()
+        self._pool.shutdown(wait=False)
+        self.server_close()
@@ -0,0 +1,166 @@
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import parse_qs
+import json
+import logging
+import time
+
+import requests
+
+from .restsession import RestSession
+
+_log = logging.getLogger('bhs-info')
+
+# the parameter of the bundle call: comma-separated paths of the bundled endpoints
+PARAM_PATHS = 'paths'
+
+# the bundle (JSON object) holds a part for each path: {"status": ..., "content_type": ..., "body": ...}
+PART_STATUS = 'status'
+PART_CONTENT_TYPE = 'content_type'
+PART_BODY = 'body'
+
+CONTENT_TYPE_JSON = 'application/json'
+
+
+def _status_line(status: int) -> str:
+    try:
+        return f'{status} {HTTPStatus(status).phrase}'
+    except ValueError:
+        return f'{status} Unknown'
+
+
+class BundledResponse:
+
+    __slots__ = ('url', 'status_code', 'content')
+
+    def __init__(self, url: str, status_code: int, content: bytes):
+        """
+        The part of the bundle: the response of one endpoint, as if it was queried on its own
+        (compatible with the response of requests, as far as the rest-client is concerned)
+        """
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+
+    @property
+    def text(self) -> str:
+        return self.content.decode('utf-8')
+
+
+def bundle_params(endpoints) -> dict:
+    """
+    :param endpoints: the endpoints (RestEndPoint) to bundle, queried without parameters
+    :return: the parameters of the bundle call
+    """
+    return {PARAM_PATHS: ','.join(endpoint.path for endpoint in endpoints)}
+
+
+def split_bundle(content, endpoints) -> dict:
+    """
+    :param content: the bundle, as returned by the backend (or the shim)
+    :param endpoints: the bundled endpoints
+    :return: the responses by endpoint name; the endpoints missing in the bundle are skipped
+    :raise ValueError: if the bundle is not valid
+    """
+    parts = json.loads(content)
+    if not isinstance(parts, dict):
+        raise ValueError('The bundle is not a JSON object')
+    responses = {}
+    for endpoint in endpoints:
+        part = parts.get(endpoint.path)
+        if part is not None:
+            responses[endpoint.name] = _bundled_response(endpoint, part)
+    return responses
+
+
+def _bundled_response(endpoint, part) -> BundledResponse:
+    """
+    :raise ValueError: if the part is not valid
+    """
+    if not isinstance(part, dict):
+        raise ValueError(f'The part {endpoint.path} of the bundle is not a JSON object')
+    status, body = part.get(PART_STATUS), part.get(PART_BODY)
+    if isinstance(status, bool) or not isinstance(status, (int, str)):
+        raise ValueError(f'The part {endpoint.path} of the bundle has no valid {PART_STATUS}')
+    if not isinstance(body, str):
+        raise ValueError(f'The part {endpoint.path} of the bundle has no valid {PART_BODY}')
+    # int('abc') raises ValueError as well
+    return BundledResponse(endpoint.get_url(), int(status), body.encode('utf-8'))
+
+
+class BundleSupport:
+
+    def __init__(self, retry_after: float):
+        """
+        Remembers that the backend does not serve the bundles (answers 404), so that it is not asked for a while
+        :param retry_after: seconds after which the bundle is tried again
+        """
+        self.retry_after = retry_after
+        self._unsupported_until = 0.0
+
+    def is_supported(self) -> bool:
+        return time.monotonic() >= self._unsupported_until
+
+    def mark_unsupported(self):
+        self._unsupported_until = time.monotonic() + self.retry_after
+
+
+class BundleShim:
+
+    def __init__(self, backend_url: str, bundle_path: str, allowed_paths, workers: int, timeout: float = 10):
+        """
+        WSGI application aggregating the calls to the backend, for the backend not serving the bundles itself.
+        Meant to run next to the backend (e.g. manage.py bundleshim on the same host) and to be configured
+        as the backend of the web application: the bundle is answered by querying the bundled paths concurrently,
+        the other requests are passed to the backend as they are. Only the allowed paths are passed to the backend,
+        the others are answered 404 (also within the bundle), so the shim does not expose the rest of the backend.
+        :param backend_url: e.g. http://localhost:12999
+        :param bundle_path: the path of the bundle, e.g. /bundle (see [REST] bundle)
+        :param allowed_paths: the paths passed to the backend (the endpoints configured in [REST])
+        :param workers: max number of the calls to the backend made at the same time
+        :param timeout: the timeout (seconds) of each call to the backend
+        """
+        self.backend_url = backend_url.rstrip('/')
+        self.bundle_path = bundle_path
+        self.allowed_paths = frozenset(allowed_paths)
+        self.timeout = timeout
+        # each worker thread gets its own session, sharing the pool of connections
+        self._session = RestSession(pool_size=workers, retries=0, retry_backoff=0)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bhs-bundle')
+
+    def _query(self, path: str, query_string: str = '') -> tuple:
+        """
+        :return: status, content type and body of the response of the backend; 502 if it is not available,
+                 404 if the path is not allowed
+        """
+        if path not in self.allowed_paths:
+            return 404, 'text/plain', b'Not Found'
+        try:
+            response = self._session.get(self.backend_url + path + ('?' + query_string if query_string else ''),
+                                         timeout=self.timeout)
+        except requests.RequestException as err:
+            _log.warning(f'Bundle shim: {path} failed: {str(err)}')
+            return 502, 'text/plain', str(err).encode('utf-8')
+        return response.status_code, response.headers.get('Content-Type', CONTENT_TYPE_JSON), response.content
+
+    def aggregate(self, paths: list) -> bytes:
+        """
+        :return: the bundle of the responses of given paths, queried concurrently
+        """
+        parts = {}
+        for path, (status, content_type, body) in zip(paths, self._executor.map(self._query, paths)):
+            parts[path] = {PART_STATUS: status, PART_CONTENT_TYPE: content_type,
+                           PART_BODY: body.decode('utf-8', errors='replace')}
+        return json.dumps(parts).encode('utf-8')
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        query_string = environ.get('QUERY_STRING', '')
+        if path == self.bundle_path:
+            paths = [_path for _value in parse_qs(query_string).get(PARAM_PATHS, [])
+                     for _path in _value.split(',') if _path]
+            status, content_type, body = 200, CONTENT_TYPE_JSON, self.aggregate(paths)
+        else:
+            status, content_type, body = self._query(path, query_string)
+        start_response(_status_line(status), [('Content-Type', content_type), ('Content-Length', str(len(body)))])
+        return [body]
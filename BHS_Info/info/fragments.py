@@ -0,0 +1,107 @@
+from collections import OrderedDict
+from threading import Lock
+
+from django.template import loader
+from django.template.base import FilterExpression, Node, NodeList, Variable
+
+from .metrics import cache_events
+
+
+def _expression_names(value, names: set):
+    """
+    Collects the names of the context entries the expression reads: the variables, their filters' arguments
+    and the operands of the conditions (e.g. {% if ... %}), wherever they are kept by the node
+    """
+    if isinstance(value, Variable):
+        if value.lookups:
+            names.add(value.lookups[0])
+    elif isinstance(value, FilterExpression):
+        _expression_names(value.var, names)
+        for _filter, arguments in value.filters:
+            for _lookup, argument in arguments:
+                _expression_names(argument, names)
+    elif isinstance(value, (Node, NodeList, str)):
+        # the nested nodes are walked on their own
+        return
+    elif isinstance(value, dict):
+        for item in value.values():
+            _expression_names(item, names)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            _expression_names(item, names)
+    elif hasattr(value, 'first') or hasattr(value, 'value'):
+        # the operators and the operands of the conditions (django.template.smartif)
+        for attribute in ('first', 'second', 'value'):
+            _expression_names(getattr(value, attribute, None), names)
+
+
+def template_variables(template) -> tuple:
+    """
+    :param template: the template (as returned by django.template.loader)
+    :return: the names of the context entries the template reads, sorted: the variables ({{ ... }})
+             as well as the arguments of the tags (e.g. {% if ... %}, {% for ... %})
+    """
+    names = set()
+    for node in template.template.nodelist.get_nodes_by_type(Node):
+        for value in vars(node).values():
+            _expression_names(value, names)
+    return tuple(sorted(names))
+
+
+class FragmentCache:
+
+    def __init__(self, max_entries: int):
+        """
+        The rendered fragments of the pages (e.g. the tiles of the main page), by the values they present:
+        the fragment is rendered again only if any of its values changes, e.g. with the new reading
+        (the time of the reading is one of the values). The least recently used fragments are evicted first.
+        :param max_entries: max number of the fragments kept
+        """
+        self.max_entries = max_entries
+        self._fragments = OrderedDict()
+        self._variables = {}
+        self._lock = Lock()
+
+    def _template(self, template_name: str):
+        template = loader.get_template(template_name)
+        with self._lock:
+            variables = self._variables.get(template_name)
+            if variables is None:
+                variables = self._variables[template_name] = template_variables(template)
+        return template, variables
+
+    def render(self, template_name: str, context: dict) -> str:
+        """
+        :param template_name: the template of the fragment; it must not depend on the request
+        :param context: the context of the page
+        :return: the fragment, rendered or cached
+        """
+        template, variables = self._template(template_name)
+        fragment_context = {_name: context[_name] for _name in variables if _name in context}
+        key = (template_name, tuple(context.get(_name) for _name in variables))
+        try:
+            hash(key)
+        except TypeError:
+            # e.g. the list presented by the fragment, not cached then
+            return template.render(fragment_context)
+
+        with self._lock:
+            fragment = self._fragments.get(key)
+            if fragment is not None:
+                self._fragments.move_to_end(key)
+                cache_events.inc('fragment', 'hit')
+                return fragment
+
+        cache_events.inc('fragment', 'miss')
+        fragment = template.render(fragment_context)
+        with self._lock:
+            self._fragments[key] = fragment
+            while len(self._fragments) > self.max_entries:
+                self._fragments.popitem(last=False)
+                cache_events.inc('fragment', 'eviction')
+        return fragment
+
+    def clear(self):
+        with self._lock:
+            self._fragments.clear()
+            self._variables.clear()
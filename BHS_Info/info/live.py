@@ -0,0 +1,93 @@
+from collections import OrderedDict
+from threading import Lock
+import hashlib
+import json
+import time
+
+from .restcache import SingleFlight
+
+
+def live_event(version: str, values: dict, retry: float) -> str:
+    """
+    :param version: the version of the values, the browser tells it when reconnecting (Last-Event-ID)
+    :param values: the values to push, the event carries no data if there's none
+    :param retry: seconds after which the browser reconnects, once the response is over
+    :return: the Server-Sent Event
+    """
+    event = f'retry: {int(retry * 1000)}\nid: {version}\n'
+    if values:
+        event += f'data: {json.dumps(values, default=str)}\n'
+    return event + '\n'
+
+
+class LiveFeed:
+
+    HISTORY = 32
+
+    def __init__(self, build, interval: float):
+        """
+        The values of the page pushed to the displays: built at most once per interval, no matter how many displays
+        ask for them. The recent versions are kept, so that each display gets only the values changed since
+        the version it already has. The version is the digest of the values, so it is the same in all the processes.
+        The values are built by one of the callers, without holding the lock; the others get the previous version
+        meanwhile (or wait for the first one).
+        :param build: callable returning the values of the page (serializable to JSON, see live_event)
+        :param interval: seconds for which the built values are served
+        """
+        self._build = build
+        self.interval = interval
+        self._versions = OrderedDict()
+        self._current = None
+        self._built_at = None
+        self._building = False
+        self._lock = Lock()
+        self._single_flight = SingleFlight()
+
+    @staticmethod
+    def _version(values: dict) -> str:
+        return hashlib.md5(json.dumps(values, sort_keys=True, default=str).encode()).hexdigest()
+
+    def _is_fresh(self) -> bool:
+        return self._built_at is not None and time.monotonic() - self._built_at < self.interval
+
+    def current(self) -> tuple:
+        """
+        :return: the version and the values, built again if older than interval; meanwhile the other callers
+                 get the previous version
+        """
+        with self._lock:
+            if self._current is not None and (self._building or self._is_fresh()):
+                return self._current, self._versions[self._current]
+            self._building = True
+        return self._single_flight.do('build', self._rebuild)
+
+    def _rebuild(self) -> tuple:
+        try:
+            with self._lock:
+                # built by the previous flight meanwhile
+                if self._is_fresh():
+                    return self._current, self._versions[self._current]
+            values = self._build()
+            with self._lock:
+                self._current = self._version(values)
+                self._versions[self._current] = values
+                self._versions.move_to_end(self._current)
+                while len(self._versions) > self.HISTORY:
+                    self._versions.popitem(last=False)
+                self._built_at = time.monotonic()
+                return self._current, values
+        finally:
+            with self._lock:
+                self._building = False
+
+    def changes(self, since: str = None) -> tuple:
+        """
+        :param since: the version the display has, None if it has none
+        :return: the current version and the values changed since given version (all of them if it is not known)
+        """
+        version, values = self.current()
+        with self._lock:
+            known = self._versions.get(since) if since else None
+        if known is None:
+            return version, dict(values)
+        return version, {key: value for key, value in values.items() if key not in known or known[key] != value}
@@ -0,0 +1,142 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from tempfile import TemporaryDirectory
+import json
+import logging
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.urls import reverse
+
+from info import restinfo
+from info.benchmark import STUB_BUNDLE_PATH, LatencyReport, StubBackend, allowed_host, check_fixtures, \
+    load_fixtures, record_fixtures, redirect_backend, save_fixtures
+
+# the views benchmarked by default, with the parameters of the request
+VIEWS = {
+    'index': {},
+    'temp_ext': {},
+    'temp_int': {},
+    'any_temp': {'sensor': restinfo.SENSOR_LOC_EXTERNAL, 'name': 'benchmark'},
+    'cesspit': {},
+    'sys_status': {},
+    'api_index': {},
+    'api_temp_ext': {},
+    'api_temp_int': {},
+    'api_any_temp': {'sensor': restinfo.SENSOR_LOC_EXTERNAL, 'name': 'benchmark'},
+    'api_cesspit': {},
+    'api_sys_status': {},
+}
+
+
+class Command(BaseCommand):
+
+    help = 'Measures the latency and throughput of the views, served by a local stub of the REST backend'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--views', default=','.join(VIEWS), help='comma-separated names of the views (urls.py)')
+        parser.add_argument('--requests', type=int, default=50, help='number of the measured requests per view')
+        parser.add_argument('--warmup', type=int, default=3, help='number of the requests per view not measured')
+        parser.add_argument('--concurrency', type=int, default=1, help='number of the clients at the same time')
+        parser.add_argument('--cold', action='store_true',
+                            help='clear the response, graph and bean caches before each request')
+        parser.add_argument('--latency', type=float, default=20, help='latency of the backend (milliseconds)')
+        parser.add_argument('--jitter', type=float, default=10, help='max random extra latency (milliseconds)')
+        parser.add_argument('--failure-rate', type=float, default=0.0,
+                            help='fraction (0..1) of the backend requests failing with 503')
+        parser.add_argument('--graph-points', type=int, default=500, help='size of the synthetic graphs')
+        parser.add_argument('--bundle', action='store_true',
+                            help='the stub serves the bundles, so the main page is queried with one call')
+        parser.add_argument('--fixtures', help='JSON file with the responses replayed by the stub')
+        parser.add_argument('--record', metavar='FILE',
+                            help='record the responses of the configured (real) backend to the file and exit')
+        parser.add_argument('--json', action='store_true', help='print the results as JSON')
+
+    def handle(self, *args, **options):
+        configuration = restinfo.rest_configuration
+        if options['record']:
+            fixtures = record_fixtures(configuration, restinfo.rest_session)
+            save_fixtures(options['record'], fixtures)
+            self.stdout.write(f'Recorded {len(fixtures)} responses to {options["record"]}')
+            return
+
+        views = [name.strip() for name in options['views'].split(',') if name.strip()]
+        unknown = [name for name in views if name not in VIEWS]
+        if unknown:
+            raise CommandError(f'Unknown views: {", ".join(unknown)}')
+
+        stub = StubBackend(fixtures=load_fixtures(options['fixtures']) if options['fixtures'] else None,
+                           latency=options['latency'] / 1000, jitter=options['jitter'] / 1000,
+                           failure_rate=options['failure_rate'], graph_points=options['graph_points'],
+                           bundle_path=STUB_BUNDLE_PATH if options['bundle'] else None)
+        failed = check_fixtures(stub.fixtures)
+        if failed:
+            self.stderr.write(f'The responses of {", ".join(sorted(failed))} are presented as unavailable '
+                              f'(not decoded to the beans), consider --fixtures')
+        stub.start()
+        if options['verbosity'] < 2:
+            # the timing of each request is logged otherwise
+            logging.getLogger('bhs-info').setLevel(logging.WARNING)
+
+        with TemporaryDirectory(prefix='bhs-benchmark-') as history_dir:
+            redirect_backend(stub, history_dir)
+            results = {}
+            try:
+                for name in views:
+                    results[name] = self._benchmark_view(name, options, stub)
+            finally:
+                stub.stop()
+
+        self._report(results, options['json'])
+
+    @staticmethod
+    def _clear_caches():
+        restinfo.response_cache.clear()
+        restinfo.svg_cache.clear()
+        restinfo.bean_cache.clear()
+        restinfo.fragment_cache.clear()
+
+    def _benchmark_view(self, name: str, options: dict, stub: StubBackend) -> dict:
+        url = reverse(name)
+        params = dict(VIEWS[name])
+        if 'sensor' in params:
+            params['date'] = datetime.today().strftime('%Y-%m-%d')
+        host = allowed_host()
+        report = LatencyReport(name)
+
+        def _request(measured: bool):
+            client = Client(raise_request_exception=False, HTTP_HOST=host)
+            if options['cold']:
+                self._clear_caches()
+            started_at = time.perf_counter()
+            response = client.get(url, params)
+            if measured:
+                report.add(time.perf_counter() - started_at, failed=response.status_code != 200)
+
+        for _i in range(options['warmup']):
+            _request(measured=False)
+
+        served_before, failed_before = stub.counters()
+        started_at = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+            for future in [executor.submit(_request, True) for _i in range(options['requests'])]:
+                future.result()
+        elapsed = time.perf_counter() - started_at
+        served_after, failed_after = stub.counters()
+
+        summary = report.summary(elapsed)
+        summary['backend_calls'] = served_after - served_before
+        summary['backend_failures'] = failed_after - failed_before
+        return summary
+
+    def _report(self, results: dict, as_json: bool):
+        if as_json:
+            self.stdout.write(json.dumps(results, indent=1))
+            return
+        self.stdout.write(f'{"view":<16}{"n":>6}{"err":>6}{"p50 ms":>10}{"p95 ms":>10}{"p99 ms":>10}'
+                          f'{"max ms":>10}{"req/s":>9}{"backend":>9}')
+        for name, summary in results.items():
+            self.stdout.write(f'{name:<16}{summary["count"]:>6}{summary["errors"]:>6}'
+                              f'{summary["p50"]:>10.1f}{summary["p95"]:>10.1f}{summary["p99"]:>10.1f}'
+                              f'{summary["max"]:>10.1f}{summary["rps"]:>9.1f}{summary["backend_calls"]:>9}')
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+
+from info import restinfo
+from info.benchmark import PooledWSGIServer
+from info.bundle import BundleShim
+from info.restconfig import RestConfig
+
+DEFAULT_BUNDLE_PATH = '/bundle'
+
+
+class Command(BaseCommand):
+
+    help = 'Serves the bundles (see [REST] bundle) in front of the backend not serving them itself'
+
+    def add_arguments(self, parser):
+        configuration = restinfo.rest_configuration
+        backend = f'http://{configuration.get(RestConfig.SECTION_REST, RestConfig.OPTION_HOST)}:' \
+                  f'{configuration.get(RestConfig.SECTION_REST, RestConfig.OPTION_PORT)}'
+        parser.add_argument('--backend', default=backend, help='URL of the backend (by default the one configured)')
+        parser.add_argument('--bundle-path', default=DEFAULT_BUNDLE_PATH, help='the path of the bundle')
+        parser.add_argument('--host', default='0.0.0.0', help='the address to listen on')
+        parser.add_argument('--port', type=int, default=12998, help='the port to listen on')
+        parser.add_argument('--workers', type=int, default=16,
+                            help='number of the worker threads, also the max number of the bundled calls at once')
+        parser.add_argument('--timeout', type=float, default=10, help='timeout of each call to the backend (seconds)')
+
+    def handle(self, *args, **options):
+        # only the endpoints of the web application are passed to the backend
+        allowed_paths = [endpoint.path for name, endpoint in restinfo.rest_configuration.registry().endpoints.items()
+                         if name != RestConfig.OPTION_BUNDLE]
+        shim = BundleShim(options['backend'], options['bundle_path'], allowed_paths, workers=options['workers'],
+                          timeout=options['timeout'])
+        server = PooledWSGIServer(shim, workers=options['workers'], port=options['port'], host=options['host'])
+        self.stdout.write(f'Serving {options["bundle_path"]} of {options["backend"]} '
+                          f'at http://{options["host"]}:{server.port}')
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,217 @@
+from datetime import datetime, timedelta
+from tempfile import TemporaryDirectory
+from threading import Event, Thread
+import json
+import logging
+import random
+import time
+
+import requests
+from django.core.management.base import BaseCommand
+from django.core.wsgi import get_wsgi_application
+from django.urls import reverse
+
+from info import restinfo
+from info.benchmark import STUB_BUNDLE_PATH, LatencyReport, PooledWSGIServer, StubBackend, allowed_host, \
+    check_fixtures, load_fixtures, redirect_backend
+
+REQUEST_DATE_FORMAT = '%Y-%m-%d'
+# the kinds of the requests made by the displays
+KIND_INDEX = 'index'
+KIND_HISTORY = 'any_temp'
+KIND_STATUS = 'sys_status'
+KIND_LIVE = 'live'
+# how the displays keep the main page up-to-date
+MODE_LIVE = 'live'
+MODE_RELOAD = 'reload'
+# seconds after which EventSource reconnects, unless told otherwise by the server (retry field)
+DEFAULT_LIVE_RETRY = 3.0
+
+
+class Command(BaseCommand):
+
+    help = 'Simulates many wall displays using the application (served by WSGI server) backed by a local stub'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--displays', type=int, default=20, help='number of the simulated displays')
+        parser.add_argument('--duration', type=float, default=120, help='duration of the test (seconds)')
+        parser.add_argument('--mode', choices=(MODE_LIVE, MODE_RELOAD), default=MODE_LIVE,
+                            help='live: a display loads the main page once and then receives its updates '
+                                 '(as the browser with JavaScript does); reload: it reloads the page every --refresh')
+        parser.add_argument('--refresh', type=float, default=30,
+                            help='seconds between the refreshes of a display (reload mode) and between the chances '
+                                 'to browse the history or status (both modes)')
+        parser.add_argument('--history-rate', type=float, default=0.05,
+                            help='probability a display browses the temperature history after refresh')
+        parser.add_argument('--status-rate', type=float, default=0.02,
+                            help='probability a display checks the system status after refresh')
+        parser.add_argument('--workers', type=int, default=15,
+                            help='number of the worker threads of the WSGI server (see threads of mod_wsgi)')
+        parser.add_argument('--latency', type=float, default=20, help='latency of the backend (milliseconds)')
+        parser.add_argument('--jitter', type=float, default=10, help='max random extra latency (milliseconds)')
+        parser.add_argument('--failure-rate', type=float, default=0.0,
+                            help='fraction (0..1) of the backend requests failing with 503')
+        parser.add_argument('--bundle', action='store_true',
+                            help='the stub serves the bundles, so the main page is queried with one call')
+        parser.add_argument('--fixtures', help='JSON file with the responses replayed by the stub (see benchmark)')
+        parser.add_argument('--json', action='store_true', help='print the results as JSON')
+
+    def handle(self, *args, **options):
+        # note: (re)configures the logging, hence first
+        application = get_wsgi_application()
+        stub = StubBackend(fixtures=load_fixtures(options['fixtures']) if options['fixtures'] else None,
+                           latency=options['latency'] / 1000, jitter=options['jitter'] / 1000,
+                           failure_rate=options['failure_rate'],
+                           bundle_path=STUB_BUNDLE_PATH if options['bundle'] else None)
+        failed = check_fixtures(stub.fixtures)
+        if failed:
+            self.stderr.write(f'The responses of {", ".join(sorted(failed))} are presented as unavailable '
+                              f'(not decoded to the beans), consider --fixtures')
+        stub.start()
+        if options['verbosity'] < 2:
+            logging.getLogger('bhs-info').setLevel(logging.WARNING)
+
+        with TemporaryDirectory(prefix='bhs-loadtest-') as history_dir:
+            redirect_backend(stub, history_dir)
+            server = PooledWSGIServer(application, workers=options['workers'])
+            server.start()
+            reports = {kind: LatencyReport(kind) for kind in (KIND_INDEX, KIND_LIVE, KIND_HISTORY, KIND_STATUS)}
+            stop = Event()
+            try:
+                started_at = time.perf_counter()
+                displays = [Thread(target=self._display, name=f'bhs-display-{_i}', daemon=True,
+                                   args=(_i, f'http://127.0.0.1:{server.port}', reports, options, stop))
+                            for _i in range(options['displays'])]
+                for display in displays:
+                    display.start()
+                stop.wait(options['duration'])
+                stop.set()
+                for display in displays:
+                    display.join()
+                elapsed = time.perf_counter() - started_at
+            finally:
+                server.stop()
+                stub.stop()
+
+        backend_calls, backend_failures = stub.counters()
+        summaries = {kind: report.summary(elapsed) for kind, report in reports.items()}
+        requests_made = sum(summary['count'] for summary in summaries.values())
+        self._report({
+            'displays': options['displays'],
+            'mode': options['mode'],
+            'duration': elapsed,
+            'requests': requests_made,
+            'backend_calls': backend_calls,
+            'backend_failures': backend_failures,
+            'backend_calls_per_request': backend_calls / requests_made if requests_made else float('nan'),
+            'workers': server.stats.summary(),
+            'views': summaries
+        }, options['json'])
+
+    @staticmethod
+    def _event_fields(event: str) -> dict:
+        """
+        :param event: the Server-Sent Event
+        :return: the values of its fields by name (the last one, if repeated)
+        """
+        fields = {}
+        for line in event.splitlines():
+            name, _, value = line.partition(':')
+            if name:
+                fields[name] = value[1:] if value.startswith(' ') else value
+        return fields
+
+    @staticmethod
+    def _display(display_id: int, base_url: str, reports: dict, options: dict, stop: Event):
+        """
+        One wall display: keeps the main page up-to-date, either receiving its live updates (reconnecting
+        as told by the server, with the id of the last event, as EventSource does) or reloading the page
+        periodically (revalidating it with the ETag, as the browser does); now and then it browses a few days
+        of the temperature history or checks the system status
+        """
+        rnd = random.Random(display_id)
+        session = requests.Session()
+        session.headers['Host'] = allowed_host()
+        etags = {}
+        last_event_id = None
+
+        def _get(kind: str, path: str, params: dict = None):
+            url = base_url + path
+            headers = {'If-None-Match': etags[(url, str(params))]} if (url, str(params)) in etags else {}
+            started_at = time.perf_counter()
+            try:
+                response = session.get(url, params=params, headers=headers, timeout=60)
+            except requests.RequestException:
+                reports[kind].add(time.perf_counter() - started_at, failed=True)
+                return
+            reports[kind].add(time.perf_counter() - started_at, failed=response.status_code not in (200, 304))
+            if 'ETag' in response.headers:
+                etags[(url, str(params))] = response.headers['ETag']
+
+        def _live() -> float:
+            """
+            :return: seconds after which to reconnect
+            """
+            nonlocal last_event_id
+            headers = {'Last-Event-ID': last_event_id} if last_event_id else {}
+            started_at = time.perf_counter()
+            try:
+                response = session.get(base_url + reverse('index_live'), headers=headers, timeout=60)
+            except requests.RequestException:
+                reports[KIND_LIVE].add(time.perf_counter() - started_at, failed=True)
+                return DEFAULT_LIVE_RETRY
+            reports[KIND_LIVE].add(time.perf_counter() - started_at, failed=response.status_code != 200)
+            fields = Command._event_fields(response.text)
+            last_event_id = fields.get('id', last_event_id)
+            try:
+                return int(fields['retry']) / 1000
+            except (KeyError, ValueError):
+                return DEFAULT_LIVE_RETRY
+
+        def _browse():
+            if rnd.random() < options['history_rate']:
+                the_date = datetime.today() - timedelta(days=rnd.randint(1, 30))
+                for _day in range(rnd.randint(1, 4)):
+                    _get(KIND_HISTORY, reverse('any_temp'), {
+                        'sensor': restinfo.SENSOR_LOC_EXTERNAL, 'name': 'loadtest',
+                        'date': (the_date - timedelta(days=_day)).strftime(REQUEST_DATE_FORMAT)})
+            if rnd.random() < options['status_rate']:
+                _get(KIND_STATUS, reverse('sys_status'))
+
+        # the displays are not refreshed all at the same moment
+        if stop.wait(rnd.uniform(0, options['refresh'])):
+            return
+        if options['mode'] == MODE_RELOAD:
+            while not stop.is_set():
+                refreshed_at = time.monotonic()
+                _get(KIND_INDEX, reverse('index'))
+                _browse()
+                stop.wait(max(0.0, options['refresh'] - (time.monotonic() - refreshed_at)))
+            return
+
+        _get(KIND_INDEX, reverse('index'))
+        browsed_at = time.monotonic()
+        while not stop.is_set():
+            retry = _live()
+            if time.monotonic() - browsed_at >= options['refresh']:
+                browsed_at = time.monotonic()
+                _browse()
+            stop.wait(retry)
+
+    def _report(self, results: dict, as_json: bool):
+        if as_json:
+            self.stdout.write(json.dumps(results, indent=1))
+            return
+        workers = results['workers']
+        self.stdout.write(f'{results["displays"]} displays ({results["mode"]}), {results["duration"]:.0f} s: '
+                          f'{results["requests"]} requests, {results["backend_calls"]} backend calls '
+                          f'({results["backend_calls_per_request"]:.2f} per request, '
+                          f'{results["backend_failures"]} failed)')
+        self.stdout.write(f'workers: {workers["max_busy"]}/{workers["workers"]} busy at most, '
+                          f'all busy {workers["saturated"] * 100:.1f}% of time, '
+                          f'queue wait p95 {workers["queue_wait_p95"]:.1f} ms, max {workers["queue_wait_max"]:.1f} ms')
+        self.stdout.write(f'{"view":<16}{"n":>6}{"err":>6}{"p50 ms":>10}{"p95 ms":>10}{"p99 ms":>10}{"max ms":>10}')
+        for kind, summary in results['views'].items():
+            self.stdout.write(f'{kind:<16}{summary["count"]:>6}{summary["errors"]:>6}'
+                              f'{summary["p50"]:>10.1f}{summary["p95"]:>10.1f}{summary["p99"]:>10.1f}'
+                              f'{summary["max"]:>10.1f}')
@@ -0,0 +1,149 @@
+from bisect import bisect_left
+from threading import Lock
+import os
+
+# the exposition format of Prometheus (text, version 0.0.4)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names: tuple, values: tuple, *extra: str) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(_pair for _pair in extra if _pair)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+
+    TYPE = None
+
+    def __init__(self, name: str, description: str, labels: tuple = ()):
+        """
+        :param name: the name of the metric, e.g. bhs_cache_events_total
+        :param description: the help text
+        :param labels: the names of the labels; the values are given (in the same order) when the metric is updated
+        """
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self._values = {}
+        self._lock = Lock()
+
+    def _samples(self) -> list:
+        with self._lock:
+            return [(values, self.name, '', value) for values, value in self._values.items()]
+
+    def exposition(self, common: str = '') -> str:
+        """
+        :param common: the label (name="value") added to each sample
+        """
+        lines = [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} {self.TYPE}']
+        lines.extend(f'{name}{_labels(self.labels, values, extra, common)} {_number(value)}'
+                     for values, name, extra, value in sorted(self._samples(), key=lambda _s: _s[0]))
+        return '\n'.join(lines)
+
+
+class Counter(_Metric):
+
+    TYPE = 'counter'
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+
+class Gauge(_Metric):
+
+    TYPE = 'gauge'
+
+    def __init__(self, name: str, description: str, labels: tuple = ()):
+        _Metric.__init__(self, name, description, labels)
+        if not labels:
+            self._values[()] = 0
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def dec(self, *label_values, amount=1):
+        self.inc(*label_values, amount=-amount)
+
+
+class Histogram(_Metric):
+
+    TYPE = 'histogram'
+
+    def __init__(self, name: str, description: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        """
+        :param buckets: the upper bounds (seconds) of the buckets, ascending; +Inf is added implicitly
+        """
+        _Metric.__init__(self, name, description, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, *label_values):
+        with self._lock:
+            counts, total = self._values.get(label_values, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[bisect_left(self.buckets, value)] += 1
+            self._values[label_values] = (counts, total + value)
+
+    def _samples(self) -> list:
+        with self._lock:
+            values = [(label_values, list(counts), total) for label_values, (counts, total) in self._values.items()]
+        samples = []
+        for label_values, counts, total in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                samples.append((label_values, f'{self.name}_bucket',
+                                'le="+Inf"' if bound == float('inf') else f'le="{bound}"', cumulative))
+            samples.append((label_values, f'{self.name}_sum', '', total))
+            samples.append((label_values, f'{self.name}_count', '', cumulative))
+        return samples
+
+
+class MetricsRegistry:
+
+    def __init__(self):
+        """
+        The metrics of this process. Note that with several processes (mod_wsgi) each one has its own metrics
+        and the process answering the scrape reports only its share; hence each sample is labeled with the pid
+        of the process, so that its counters are never mixed with (and seemingly decreased by) the ones
+        of another process. Sum them by pid to get the totals, e.g. sum without (pid) (rate(...)).
+        """
+        self._metrics = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def exposition(self) -> str:
+        """
+        :return: all the metrics in the exposition format of Prometheus
+        """
+        process = f'pid="{os.getpid()}"'
+        return '\n'.join(metric.exposition(process) for metric in self._metrics) + '\n'
+
+
+registry = MetricsRegistry()
+
+backend_latency = registry.register(Histogram(
+    'bhs_backend_request_seconds', 'Time of the calls to the backend (made, not served from the cache)',
+    ('endpoint',)))
+view_latency = registry.register(Histogram(
+    'bhs_view_seconds', 'Time of processing of the requests, by view', ('view',)))
+requests_in_flight = registry.register(Gauge(
+    'bhs_requests_in_flight', 'Number of the requests being processed'))
+cache_events = registry.register(Counter(
+    'bhs_cache_events_total', 'Hits, misses and evictions of the caches', ('cache', 'event')))
+bean_errors = registry.register(Counter(
+    'bhs_bean_errors_total', 'Responses of the backend delivered as error or not-available beans, by reason',
+    ('endpoint', 'reason')))
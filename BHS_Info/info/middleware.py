@@ -0,0 +1,128 @@
+from collections import OrderedDict
+from threading import Lock
+import asyncio
+import gzip
+import hashlib
+import re
+
+from django.utils.cache import patch_vary_headers
+
+try:
+    from asgiref.sync import markcoroutinefunction
+except ImportError:
+    # asgiref < 3.6, see django.utils.deprecation.MiddlewareMixin
+    def markcoroutinefunction(func):
+        func._is_coroutine = asyncio.coroutines._is_coroutine
+        return func
+
+try:
+    import brotli
+except ImportError:
+    # optional; without it the responses are compressed with gzip only
+    brotli = None
+
+ENCODING_BROTLI = 'br'
+ENCODING_GZIP = 'gzip'
+
+
+def _compress(content: bytes, encoding: str) -> bytes:
+    if encoding == ENCODING_BROTLI:
+        return brotli.compress(content, mode=brotli.MODE_TEXT, quality=5)
+    return gzip.compress(content, compresslevel=6)
+
+
+def async_aware(middleware):
+    """
+    Lets Django call the middleware directly from the asynchronous handler (ASGI), without switching to a thread,
+    if the next one in the chain is asynchronous; __call__ then returns the coroutine of __acall__.
+    :param middleware: the instance, just initialized with get_response
+    """
+    if asyncio.iscoroutinefunction(middleware.get_response):
+        markcoroutinefunction(middleware)
+
+
+def accepted_encoding(accept_encoding: str) -> str:
+    """
+    :param accept_encoding: the Accept-Encoding header of the request
+    :return: the best encoding supported by both the client and this application or None
+    """
+    accepted = {}
+    for coding in accept_encoding.split(','):
+        name, _, params = coding.strip().partition(';')
+        quality = re.search(r'q=([0-9.]+)', params)
+        try:
+            accepted[name.strip().lower()] = float(quality.group(1)) if quality else 1.0
+        except ValueError:
+            continue
+    supported = (ENCODING_BROTLI, ENCODING_GZIP) if brotli is not None else (ENCODING_GZIP,)
+    candidates = [_encoding for _encoding in supported if accepted.get(_encoding, accepted.get('*', 0)) > 0]
+    return max(candidates, key=lambda _encoding: accepted.get(_encoding, accepted.get('*', 0)), default=None)
+
+
+class CompressionMiddleware:
+
+    sync_capable = True
+    async_capable = True
+
+    MIN_LENGTH = 200
+    CACHE_SIZE = 64
+    COMPRESSED_TYPES = ('text/', 'application/json', 'image/svg+xml')
+    # the events must reach the browser as they are sent, not when the compressed stream is flushed
+    UNCOMPRESSED_TYPES = ('text/event-stream',)
+
+    def __init__(self, get_response):
+        """
+        Compresses the responses with brotli (if available) or gzip, as accepted by the client.
+        The compressed content is cached by the digest of the content itself (not by the ETag, which leaves out
+        e.g. the current time presented by the page), so the page presenting the same information to several
+        displays is compressed only once.
+        The streamed responses and the Server-Sent Events are never compressed, as they would be buffered.
+        """
+        self.get_response = get_response
+        self._compressed = OrderedDict()
+        self._lock = Lock()
+        async_aware(self)
+
+    def _cached_compress(self, content: bytes, encoding: str) -> bytes:
+        key = (hashlib.md5(content).digest(), encoding)
+        with self._lock:
+            compressed = self._compressed.get(key)
+            if compressed is not None:
+                self._compressed.move_to_end(key)
+                return compressed
+        compressed = _compress(content, encoding)
+        with self._lock:
+            self._compressed[key] = compressed
+            while len(self._compressed) > self.CACHE_SIZE:
+                self._compressed.popitem(last=False)
+        return compressed
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        return self._compressed_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self._compressed_response(request, await self.get_response(request))
+
+    def _compressed_response(self, request, response):
+        content_type = response.get('Content-Type', '')
+        if response.streaming or response.status_code != 200 or response.has_header('Content-Encoding') \
+                or not content_type.startswith(self.COMPRESSED_TYPES) \
+                or content_type.startswith(self.UNCOMPRESSED_TYPES):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if len(response.content) < self.MIN_LENGTH:
+            return response
+        encoding = accepted_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+
+        compressed = self._cached_compress(response.content, encoding)
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = encoding
+        return response
@@ -0,0 +1,148 @@
+from concurrent.futures import TimeoutError
+from threading import Event, Thread
+from types import MappingProxyType
+import hashlib
+import logging
+import time
+
+_log = logging.getLogger('bhs-info')
+
+
+class SnapshotEntry:
+
+    def __init__(self, value, fetched_at: float, valid_until: float, digest: str = None):
+        """
+        :param value: the polled value
+        :param fetched_at: when the value was polled (epoch seconds, comparable across processes)
+        :param valid_until: after that moment (epoch seconds) the value is outdated
+        :param digest: the digest of the value, if already known (see digest)
+        """
+        self.value = value
+        self.fetched_at = fetched_at
+        self.valid_until = valid_until
+        self._digest = digest
+
+    @property
+    def digest(self) -> str:
+        """
+        :return: the digest of the value (string), computed once; the same in all the processes
+        """
+        if self._digest is None:
+            self._digest = hashlib.sha1(self.value.encode()).hexdigest()
+        return self._digest
+
+    def is_valid(self) -> bool:
+        return time.time() <= self.valid_until
+
+
+class SnapshotPoller:
+
+    STALENESS_FACTOR = 3
+    # max seconds between the rounds, so that the changes of the polled items are noticed soon enough
+    MAX_WAIT = 60
+    # max seconds the round waits for the polled values; the items not polled by then are polled again
+    # in the subsequent rounds only after their (hanging) polls end
+    ROUND_TIMEOUT = 30
+
+    def __init__(self, items, executor, publish=None):
+        """
+        Keeps the snapshot of the information polled in background, each item on its own schedule.
+        The snapshot is immutable and replaced as a whole (atomically) after each round of polling,
+        so the readers never wait and never see partially updated state.
+        :param items: callable returning the polled items: (interval in seconds, callable returning the polled value
+                      or None if it is not available) by name; called before each round, so the items may change
+                      (e.g. the graph of today is another item after midnight), the new ones are polled at once
+        :param executor: the pool the items (due at the same time) are polled concurrently with
+        :param publish: optional callable receiving each new snapshot (e.g. to share it with other processes)
+        """
+        self._items = items
+        self._executor = executor
+        self._publish = publish
+        self._snapshot = MappingProxyType({})
+        # the polls not finished within their round, by name
+        self._hanging = {}
+        self._stop = Event()
+        self._thread = None
+
+    @property
+    def snapshot(self) -> MappingProxyType:
+        return self._snapshot
+
+    def get_entry(self, name: str) -> SnapshotEntry:
+        """
+        :return: the polled entry or None if it is not in the snapshot or it is outdated
+                 (not refreshed for a few intervals, e.g. due to the errors)
+        """
+        entry = self._snapshot.get(name)
+        return entry if entry is not None and entry.is_valid() else None
+
+    def get(self, name: str):
+        """
+        :return: the polled value or None (see get_entry)
+        """
+        entry = self.get_entry(name)
+        return entry.value if entry is not None else None
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.is_running():
+            return
+        self._stop.clear()
+        self._thread = Thread(target=self._run, name='bhs-poller', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def poll_once(self, items: dict) -> dict:
+        """
+        Polls given items concurrently and publishes the new snapshot. The items still polled since the previous
+        rounds are skipped. Waits for the values at most ROUND_TIMEOUT seconds.
+        :param items: (interval, poll) by name, see items of the constructor
+        :return: the polled values (only available ones) by name
+        """
+        self._hanging = {name: future for name, future in self._hanging.items() if not future.done()}
+        futures = {name: self._executor.submit(poll) for name, (_interval, poll) in items.items()
+                   if name not in self._hanging}
+        timeout_at = time.monotonic() + self.ROUND_TIMEOUT
+        polled = {}
+        for name, future in futures.items():
+            try:
+                value = future.result(timeout=max(0.0, timeout_at - time.monotonic()))
+            except TimeoutError:
+                if not future.cancel():
+                    self._hanging[name] = future
+                _log.warning(f'Polling {name} did not end in {self.ROUND_TIMEOUT} seconds')
+                continue
+            except Exception as exc:
+                _log.warning(f'Polling {name} failed: {str(exc)}')
+                continue
+            if value is not None:
+                now = time.time()
+                polled[name] = SnapshotEntry(value, now, now + self.STALENESS_FACTOR * items[name][0])
+        if polled:
+            self._snapshot = MappingProxyType({**self._snapshot, **polled})
+            if self._publish is not None:
+                self._publish(self._snapshot)
+        return {name: entry.value for name, entry in polled.items()}
+
+    def _run(self):
+        due_at = {}
+        while not self._stop.is_set():
+            now = time.monotonic()
+            next_at = now + self.MAX_WAIT
+            try:
+                items = self._items()
+                due_at = {name: due_at.get(name, 0.0) for name in items}
+                due = {name: items[name] for name, at in due_at.items() if at <= now}
+                for name, (interval, _poll) in due.items():
+                    due_at[name] = now + interval
+                if due:
+                    self.poll_once(due)
+                next_at = min(due_at.values(), default=next_at)
+            except Exception:
+                # the thread goes on, the next round starts after MAX_WAIT
+                _log.exception('Polling round failed')
+            self._stop.wait(min(self.MAX_WAIT, max(0.0, next_at - time.monotonic())))
@@ -0,0 +1,160 @@
+from contextlib import asynccontextmanager
+from weakref import WeakKeyDictionary
+import asyncio
+import time
+
+import requests
+
+try:
+    import httpx
+except ImportError:
+    # optional; without it the asynchronous views query the backend the same way the synchronous ones do
+    httpx = None
+
+from . import restinfo
+from .bundle import bundle_params
+from .restconfig import RestEndPoint
+from .restresilience import DeadlineExceeded, current_deadline, report_timeout
+from .timing import backend_phase, timed
+from .metrics import backend_latency
+
+# the clients by event loop: the connections of the client can't be used by another loop
+_clients = WeakKeyDictionary()
+
+
+def is_available() -> bool:
+    """
+    :return: True if the backend can be queried asynchronously (httpx is installed)
+    """
+    return httpx is not None
+
+
+def _client():
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        pool_size = restinfo.rest_configuration.get_pool_size()
+        client = _clients[loop] = httpx.AsyncClient(transport=httpx.AsyncHTTPTransport(
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            retries=restinfo.rest_configuration.get_retries()))
+    return client
+
+
+def _query_params(params):
+    """
+    :return: the parameters encoded the way requests does: None values skipped, the others as str
+    """
+    if params is None:
+        return None
+    return {_name: [str(_v) for _v in _value] if isinstance(_value, (list, tuple)) else str(_value)
+            for _name, _value in params.items() if _value is not None}
+
+
+async def _fetch(endpoint: RestEndPoint, params=None):
+    """
+    Asynchronous counterpart of RestBackend._fetch: respects the timeouts of the endpoint, the deadline of the current
+    request and the circuits of the host and the endpoint. The failures are raised as the exceptions of requests,
+    so they are reported by the rest-client exactly as the failures of the synchronous calls.
+    """
+    timeout = restinfo.rest_configuration.get_timeout(endpoint.name)
+    connect_timeout, read_timeout = timeout.connect, timeout.read
+    deadline = current_deadline()
+    if deadline is not None:
+        if deadline.expired():
+            raise DeadlineExceeded(f'No time left to query {endpoint.get_url()}')
+        connect_timeout = min(connect_timeout, deadline.remaining())
+        read_timeout = min(read_timeout, deadline.remaining())
+    cut_by_deadline = connect_timeout < timeout.connect or read_timeout < timeout.read
+
+    host_circuit = restinfo.circuit_breakers.get(endpoint.get_host_id())
+    endpoint_circuit = restinfo.circuit_breakers.get(endpoint.name)
+    host_circuit.before_call()
+    endpoint_circuit.before_call()
+    started_at = time.perf_counter()
+    try:
+        with timed(backend_phase(endpoint.name)):
+            response = await _client().get(endpoint.get_url(), params=_query_params(params),
+                                           timeout=httpx.Timeout(read_timeout, connect=connect_timeout))
+    except httpx.TimeoutException as exc:
+        report_timeout(host_circuit, endpoint_circuit, connecting=isinstance(exc, httpx.ConnectTimeout),
+                       cut_by_deadline=cut_by_deadline)
+        raise requests.Timeout(f'Timeout of {endpoint.get_url()}: {str(exc)}') from exc
+    except httpx.TransportError as exc:
+        host_circuit.on_failure()
+        endpoint_circuit.on_failure()
+        raise requests.ConnectionError(f'Connection to {endpoint.get_url()} failed: {str(exc)}') from exc
+    finally:
+        backend_latency.observe(time.perf_counter() - started_at, endpoint.name)
+    host_circuit.on_success()
+
+    if response.status_code >= 400:
+        if response.status_code >= 500:
+            endpoint_circuit.on_failure()
+        raise requests.HTTPError(f'{response.status_code} {response.reason_phrase} for url: {response.url}',
+                                 response=response)
+    endpoint_circuit.on_success()
+    return response
+
+
+def _is_served_locally(endpoint: RestEndPoint, params, cache_key: str) -> bool:
+    """
+    :return: True if the rest-client won't query the backend: the response (or the graph) is in the snapshot
+             of the poller or in the process-wide caches
+    """
+    return restinfo.snapshot_entry(endpoint.name if params is None else cache_key) is not None \
+        or restinfo.response_cache.contains(endpoint.name, cache_key) \
+        or restinfo.svg_cache.contains(cache_key, restinfo.rest_configuration.get_cache_policy(endpoint.name).ttl)
+
+
+async def _bundled(pending: dict) -> dict:
+    """
+    Queries the backend for the pending calls without parameters with one call, if the backend serves the bundles
+    (see RestBackend._prefetch_bundle)
+    :param pending: the calls (endpoint, params) by cache key
+    :return: the outcomes of the calls delivered by the bundle, by cache key
+    """
+    bundle = restinfo.rest_configuration.get_bundle_endpoint()
+    endpoints = [endpoint for endpoint, params in pending.values() if params is None]
+    if bundle is None or len(endpoints) < 2 or not restinfo.bundle_support.is_supported():
+        return {}
+
+    try:
+        response = await _fetch(bundle, bundle_params(endpoints))
+        outcomes = restinfo.bundled_outcomes(response.content, endpoints)
+    except (requests.RequestException, ValueError) as exc:
+        restinfo.bundle_failed(bundle, exc)
+        return {}
+    return {restinfo.RestBackend._cache_key(endpoint): outcomes[endpoint.name]
+            for endpoint in endpoints if endpoint.name in outcomes}
+
+
+@asynccontextmanager
+async def prefetched(calls):
+    """
+    Queries the backend concurrently, on the event loop, for all the given calls that can't be served locally;
+    the ones without parameters are bundled into one call, if the backend serves the bundles.
+    Within the block, the (synchronous) rest-clients take the outcomes of these calls instead of querying the backend,
+    provided they run in the copy of the context of the block (as sync_to_async does).
+    Without httpx nothing is queried ahead, the rest-clients query the backend as usual.
+    :param calls: tuples (endpoint, params) to GET
+    """
+    pending = {}
+    if is_available():
+        for endpoint, params in calls:
+            cache_key = restinfo.RestBackend._cache_key(endpoint, params)
+            if cache_key not in pending and not _is_served_locally(endpoint, params, cache_key):
+                pending[cache_key] = (endpoint, params)
+
+    bundled = await _bundled(pending) if pending else {}
+    unbundled = [_key for _key in pending if _key not in bundled]
+    outcomes = await asyncio.gather(*[_fetch(*pending[_key]) for _key in unbundled], return_exceptions=True)
+    for outcome in outcomes:
+        if isinstance(outcome, BaseException) and not isinstance(outcome, Exception):
+            # e.g. cancelled, the request is abandoned
+            raise outcome
+
+    token = restinfo._prefetched_responses.set({**bundled, **dict(zip(unbundled, outcomes))})
+    try:
+        yield
+    finally:
+        restinfo._prefetched_responses.reset(token)
@@ -0,0 +1,389 @@
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import date
+from pathlib import Path
+from threading import Lock, local
+import logging
+import sqlite3
+import time
+
+from .metrics import cache_events
+from .restconfig import CachePolicy
+
+_log = logging.getLogger('bhs-info')
+
+
+class CacheEntry:
+
+    def __init__(self, value, fetched_at: float):
+        self.value = value
+        self.fetched_at = fetched_at
+
+    def age(self, now: float) -> float:
+        return now - self.fetched_at
+
+
+class ResponseCache:
+
+    REFRESH_WORKERS = 4
+
+    def __init__(self, policy_provider):
+        """
+        Process-wide cache of the responses from backend, shared by all the requests handled by the process.
+        Each endpoint has its own partition, limited in size (least recently used entries are evicted first).
+        The stale entries (older than TTL) are still served, while being refreshed in background
+        (stale-while-revalidate), unless they are older than max-stale.
+        :param policy_provider: callable returning CachePolicy for given endpoint name
+        """
+        self._policy_provider = policy_provider
+        self._partitions = {}
+        self._refreshing = set()
+        self._lock = Lock()
+        self._refresh_executor = ThreadPoolExecutor(max_workers=self.REFRESH_WORKERS,
+                                                    thread_name_prefix='bhs-cache-refresh')
+
+    def _partition(self, endpoint_name: str) -> OrderedDict:
+        partition = self._partitions.get(endpoint_name)
+        if partition is None:
+            partition = self._partitions[endpoint_name] = OrderedDict()
+        return partition
+
+    def _store(self, endpoint_name: str, key: str, value, policy: CachePolicy):
+        with self._lock:
+            partition = self._partition(endpoint_name)
+            partition[key] = CacheEntry(value, time.monotonic())
+            partition.move_to_end(key)
+            while len(partition) > policy.max_size:
+                partition.popitem(last=False)
+                cache_events.inc('response', 'eviction')
+
+    def _refresh(self, endpoint_name: str, key: str, fetch, policy: CachePolicy):
+        try:
+            self._store(endpoint_name, key, fetch(), policy)
+        except Exception as exc:
+            # the stale entry remains in place, the next request will try again
+            _log.warning(f'Background refresh of {key} failed: {str(exc)}')
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def get(self, endpoint_name: str, key: str, fetch):
+        """
+        Returns the cached value or fetches it if there's nothing (usable) in cache.
+        The exceptions raised by fetch are not cached, they are passed to the caller.
+        :param endpoint_name: the name of the endpoint, defines the cache policy
+        :param key: the key of the value, unique across all endpoints (URL with parameters)
+        :param fetch: callable returning the value
+        :return: the value
+        """
+        policy = self._policy_provider(endpoint_name)
+        if policy.ttl <= 0:
+            return fetch()
+
+        now = time.monotonic()
+        with self._lock:
+            partition = self._partition(endpoint_name)
+            entry = partition.get(key)
+            if entry is not None:
+                partition.move_to_end(key)
+                age = entry.age(now)
+                if age > policy.ttl and age <= policy.ttl + policy.max_stale and key not in self._refreshing:
+                    self._refreshing.add(key)
+                    self._refresh_executor.submit(self._refresh, endpoint_name, key, fetch, policy)
+                if age > policy.ttl + policy.max_stale:
+                    entry = None
+
+        if entry is not None:
+            cache_events.inc('response', 'hit' if entry.age(now) <= policy.ttl else 'stale-hit')
+            return entry.value
+
+        cache_events.inc('response', 'miss')
+        value = fetch()
+        self._store(endpoint_name, key, value, policy)
+        return value
+
+    def put(self, endpoint_name: str, key: str, value):
+        """
+        Stores the value fetched otherwise (e.g. as the part of the bundle), as if it was fetched by get
+        """
+        policy = self._policy_provider(endpoint_name)
+        if policy.ttl > 0:
+            self._store(endpoint_name, key, value, policy)
+
+    def contains(self, endpoint_name: str, key: str) -> bool:
+        """
+        :return: True if get would serve the value from the cache (fresh or stale); neither counted nor refreshed
+        """
+        policy = self._policy_provider(endpoint_name)
+        if policy.ttl <= 0:
+            return False
+        with self._lock:
+            entry = self._partition(endpoint_name).get(key)
+            return entry is not None and entry.age(time.monotonic()) <= policy.ttl + policy.max_stale
+
+    def clear(self):
+        with self._lock:
+            self._partitions.clear()
+
+
+class BeanCache:
+
+    def __init__(self, max_entries: int):
+        """
+        The beans decoded from the responses of backend, by the content of the response (the least recently used
+        ones are evicted first). The content served from the caches is the very same for many requests, so it is
+        decoded once; the hash of the content object is computed once as well, so the lookup is cheap.
+        Note that the beans are shared by the requests, they must not be modified.
+        :param max_entries: max number of the beans kept; 0 disables caching
+        """
+        self.max_entries = max_entries
+        self._beans = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, content, decode):
+        """
+        :param content: the response of backend (str or bytes)
+        :param decode: callable converting the content to the bean; its exceptions are passed to the caller
+        :return: the bean
+        """
+        if self.max_entries <= 0:
+            return decode(content)
+        with self._lock:
+            bean = self._beans.get(content)
+            if bean is not None:
+                self._beans.move_to_end(content)
+                cache_events.inc('bean', 'hit')
+                return bean
+
+        cache_events.inc('bean', 'miss')
+        bean = decode(content)
+        with self._lock:
+            self._beans[content] = bean
+            while len(self._beans) > self.max_entries:
+                self._beans.popitem(last=False)
+                cache_events.inc('bean', 'eviction')
+        return bean
+
+    def clear(self):
+        with self._lock:
+            self._beans.clear()
+
+
+class SingleFlight:
+
+    def __init__(self):
+        """
+        Coalesces identical concurrent calls: while the call for given key is in flight,
+        other callers asking for the same key wait for its outcome instead of making their own call.
+        """
+        self._in_flight = {}
+        self._lock = Lock()
+
+    def do(self, key: str, call, timeout: float = None):
+        """
+        :param key: identifies the call (URL with parameters)
+        :param call: callable making the call, executed only if no call with the same key is in flight
+        :param timeout: max time (seconds) of waiting for the call made by other caller
+        :return: the result of the call; the exception raised by the call is raised for all the callers
+        :raise concurrent.futures.TimeoutError: if the call made by other caller did not end on time
+        """
+        with self._lock:
+            future = self._in_flight.get(key)
+            is_owner = future is None
+            if is_owner:
+                future = self._in_flight[key] = Future()
+
+        if not is_owner:
+            return future.result(timeout=timeout)
+
+        try:
+            future.set_result(call())
+        except Exception as exc:
+            future.set_exception(exc)
+        finally:
+            if not future.done():
+                # interrupted (e.g. SystemExit of the thread): the waiters get CancelledError at once
+                future.cancel()
+            with self._lock:
+                del self._in_flight[key]
+        return future.result()
+
+
+class SVGCache:
+
+    def __init__(self, max_bytes: int):
+        """
+        Process-wide cache of the graphs (SVG strings, ready to be embedded into the page), limited by their total size;
+        the least recently used graphs are evicted first.
+        Each graph is stored with the version of the data it presents (e.g. the timestamp of the latest reading);
+        the graph is outdated as soon as the version changes or when it gets older than TTL.
+        If the outdated graph can't be rendered again, it is still served (better than no graph at all).
+        :param max_bytes: max total length of the cached graphs
+        """
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = Lock()
+
+    def _evict(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= len(entry.value[0])
+
+    def get(self, key: str, version, ttl: float, render):
+        """
+        Returns the cached graph if it is up-to-date, otherwise renders (and caches) it.
+        :param key: identifies the graph (URL with parameters)
+        :param version: the version of the data presented by the graph; None if not known (then only TTL applies)
+        :param ttl: seconds after which the graph is outdated; 0 disables caching
+        :param render: callable returning the graph or None if it is not available (not cached then)
+        :return: the graph (the outdated one, if it can't be rendered again) or None
+        """
+        if ttl <= 0:
+            return render()
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                svg, entry_version = entry.value
+                if entry_version == version and entry.age(now) <= ttl:
+                    self._entries.move_to_end(key)
+                    cache_events.inc('svg', 'hit')
+                    return svg
+
+        cache_events.inc('svg', 'miss')
+        svg = render()
+        if svg is None:
+            if entry is not None:
+                cache_events.inc('svg', 'stale-hit')
+                return entry.value[0]
+            return None
+        if len(svg) > self.max_bytes:
+            return svg
+
+        with self._lock:
+            self._evict(key)
+            self._entries[key] = CacheEntry((svg, version), now)
+            self._bytes += len(svg)
+            while self._bytes > self.max_bytes:
+                self._evict(next(iter(self._entries)))
+                cache_events.inc('svg', 'eviction')
+        return svg
+
+    def contains(self, key: str, ttl: float) -> bool:
+        """
+        :return: True if the graph of any version is cached and not older than TTL; not counted
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            return ttl > 0 and entry is not None and entry.age(time.monotonic()) <= ttl
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+class HistoryCache:
+
+    FILE_NAME = 'history.sqlite'
+
+    def __init__(self, directory: str):
+        """
+        Persistent (on-disk, SQLite) cache of the information about the days that are over.
+        Such information never changes, so it is kept forever and shared by all the processes.
+        If the cache can't be opened, it is silently disabled (nothing is found, nothing is stored).
+        :param directory: where the database file is kept; created if needed
+        """
+        self.path = Path(directory).joinpath(self.FILE_NAME)
+        self._local = local()
+        self._disabled = False
+
+    def _connection(self):
+        if self._disabled:
+            return None
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                connection = sqlite3.connect(self.path, timeout=5)
+                connection.execute('PRAGMA journal_mode=WAL')
+                connection.execute('CREATE TABLE IF NOT EXISTS history ('
+                                   'sensor_location TEXT, the_date TEXT, kind TEXT, content TEXT, '
+                                   'PRIMARY KEY (sensor_location, the_date, kind))')
+                connection.commit()
+            except (OSError, sqlite3.Error) as err:
+                _log.warning(f'History cache {self.path} is disabled: {str(err)}')
+                self._disabled = True
+                return None
+            self._local.connection = connection
+        return connection
+
+    def get(self, sensor_location: str, the_date: date, kind: str):
+        """
+        :return: the cached content or None if not found
+        """
+        connection = self._connection()
+        if connection is None:
+            return None
+        try:
+            row = connection.execute(
+                'SELECT content FROM history WHERE sensor_location = ? AND the_date = ? AND kind = ?',
+                (sensor_location, the_date.isoformat(), kind)).fetchone()
+        except sqlite3.Error as err:
+            _log.warning(f'Reading history cache failed: {str(err)}')
+            return None
+        cache_events.inc('history', 'hit' if row else 'miss')
+        return row[0] if row else None
+
+    def put(self, sensor_location: str, the_date: date, kind: str, content: str):
+        connection = self._connection()
+        if connection is None:
+            return
+        try:
+            with connection:
+                connection.execute('INSERT OR REPLACE INTO history VALUES (?, ?, ?, ?)',
+                                   (sensor_location, the_date.isoformat(), kind, content))
+        except sqlite3.Error as err:
+            _log.warning(f'Writing history cache failed: {str(err)}')
+
+
+class Prefetcher:
+
+    def __init__(self, workers: int, max_pending: int):
+        """
+        Runs the prefetching tasks in background. The tasks are deduplicated (by key) and their number is bounded:
+        when too many are waiting (the backend does not keep up), the oldest ones are cancelled.
+        :param workers: number of tasks executed at the same time
+        :param max_pending: max number of tasks waiting for execution
+        """
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bhs-prefetch')
+        self._scheduled = OrderedDict()
+        self._lock = Lock()
+
+    def _run(self, key: str, task):
+        try:
+            task()
+        except Exception as exc:
+            _log.warning(f'Prefetching {key} failed: {str(exc)}')
+        finally:
+            with self._lock:
+                self._scheduled.pop(key, None)
+
+    def schedule(self, key: str, task) -> bool:
+        """
+        :param key: identifies the task; the task is not scheduled if the one with the same key is already there
+        :param task: callable to be executed in background
+        :return: True if scheduled
+        """
+        with self._lock:
+            if key in self._scheduled:
+                return False
+            pending = [_key for _key, _future in self._scheduled.items() if not _future.running()]
+            for _key in pending[:max(0, len(pending) - self.max_pending + 1)]:
+                if self._scheduled[_key].cancel():
+                    del self._scheduled[_key]
+            self._scheduled[key] = self._executor.submit(self._run, key, task)
+            return True
@@ -1,26 +1,123 @@
-from configparser import ConfigParser
+from configparser import ConfigParser, Error
+from threading import Lock
+from types import MappingProxyType
+import logging
+import os
 import sys
+import time
 
+_log = logging.getLogger('bhs-info')
 
-class RestEndPoint:
 
-    def __init__(self, _host: str, _port: str, _path: str):
-        self.host = _host
-        self.port = _port
-        self.path = _path
-        if not self.path:
-            self.path = ''
-        elif not self.path.startswith('/'):
-            self.path = '/'+self.path
+class _Immutable:
+
+    __slots__ = ()
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f'{type(self).__name__} is immutable')
+
+    def __delattr__(self, name):
+        raise AttributeError(f'{type(self).__name__} is immutable')
+
+
+class RestEndPoint(_Immutable):
+
+    __slots__ = ('host', 'port', 'path', 'name', '_url', '_host_id')
+
+    def __init__(self, _host: str, _port: str, _path: str, _name: str = None):
+        """
+        The endpoint of the backend; immutable, the URL is built once
+        """
+        path = '' if not _path else _path if _path.startswith('/') else '/'+_path
+        object.__setattr__(self, 'host', _host)
+        object.__setattr__(self, 'port', _port)
+        object.__setattr__(self, 'path', path)
+        object.__setattr__(self, 'name', _name if _name else _path)
+        object.__setattr__(self, '_url', f'http://{_host}:{_port}{path}' if _host and _port else None)
+        object.__setattr__(self, '_host_id', f'{_host}:{_port}')
 
     def get_url(self):
-        if not self.host or not self.port:
-            return None
+        return self._url
+
+    def get_host_id(self):
+        return self._host_id
+
+
+class Timeout(_Immutable):
+
+    __slots__ = ('connect', 'read')
+
+    def __init__(self, _connect: float, _read: float):
+        """
+        Timeouts of the call to an endpoint, in seconds
+        :param _connect: max time of establishing the connection
+        :param _read: max time of waiting for the response
+        """
+        object.__setattr__(self, 'connect', _connect)
+        object.__setattr__(self, 'read', _read)
+
+
+class CachePolicy(_Immutable):
+
+    __slots__ = ('ttl', 'max_stale', 'max_size')
+
+    def __init__(self, _ttl: float, _max_stale: float, _max_size: int):
+        """
+        Describes how the responses of an endpoint are cached
+        :param _ttl: seconds after which the response is stale and is refreshed; 0 disables caching
+        :param _max_stale: seconds after which the stale response is not served anymore
+        :param _max_size: max number of cached responses (for different parameters) of the endpoint
+        """
+        object.__setattr__(self, 'ttl', _ttl)
+        object.__setattr__(self, 'max_stale', _max_stale)
+        object.__setattr__(self, 'max_size', _max_size)
+
+
+class EndpointPolicy(_Immutable):
+
+    __slots__ = ('timeout', 'cache', 'priority')
+
+    def __init__(self, _timeout: Timeout, _cache: CachePolicy, _priority: int):
+        """
+        Everything configured for an endpoint, besides its URL
+        :param _timeout: the timeouts of the calls
+        :param _cache: how the responses are cached
+        :param _priority: the calls to the endpoints of higher priority are made first, if made at once (fan-out)
+        """
+        object.__setattr__(self, 'timeout', _timeout)
+        object.__setattr__(self, 'cache', _cache)
+        object.__setattr__(self, 'priority', _priority)
+
+
+class EndpointRegistry(_Immutable):
+
+    __slots__ = ('endpoints', 'policies', 'default')
 
-        return f'http://{self.host}:{self.port}{self.path}'
+    def __init__(self, endpoints: dict, policies: dict, default: EndpointPolicy):
+        """
+        The endpoints configured in [REST] and their policies, by name; never changed, replaced as a whole on reload
+        :param default: the policy of the endpoints not configured in [REST]
+        """
+        object.__setattr__(self, 'endpoints', MappingProxyType(dict(endpoints)))
+        object.__setattr__(self, 'policies', MappingProxyType(dict(policies)))
+        object.__setattr__(self, 'default', default)
 
 
-class RestConfig(ConfigParser):
+class ConfigSnapshot(_Immutable):
+
+    __slots__ = ('settings', 'registry')
+
+    def __init__(self, settings: ConfigParser, registry: EndpointRegistry):
+        """
+        The parsed configuration: the settings and the registry built of them. Replaced as a whole on reload
+        (or modification), so the readers always see the settings and the registry of the same configuration;
+        the settings are never modified once in the snapshot.
+        """
+        object.__setattr__(self, 'settings', settings)
+        object.__setattr__(self, 'registry', registry)
+
+
+class RestConfig:
 
     CONFIG_FILE = '/etc/bhs/web-info/web-info.ini'
     CONFIG_FILE_DEV = './info/test/web-info.ini'
@@ -50,107 +147,418 @@ class RestConfig(ConfigParser):
     OPTION_GRAPH_TEMPERATURE = 'graph-temperature'
     OPTION_PROGRESS_BAR = 'progress-bar'
     OPTION_HISTORY_TEMP_DAILY = 'history-temperature-daily'
+    OPTION_BUNDLE = 'bundle'
+    OPTION_POOL_SIZE = 'pool-size'
+    OPTION_RETRIES = 'retries'
+    OPTION_RETRY_BACKOFF = 'retry-backoff'
+    OPTION_CIRCUIT_FAILURES = 'circuit-failures'
+    OPTION_CIRCUIT_COOLDOWN = 'circuit-cooldown'
+
+    # the options of [REST], which are not the paths of the endpoints
+    RESERVED_REST_OPTIONS = (OPTION_HOST, OPTION_PORT, OPTION_POOL_SIZE, OPTION_RETRIES, OPTION_RETRY_BACKOFF,
+                             OPTION_CIRCUIT_FAILURES, OPTION_CIRCUIT_COOLDOWN)
+
+    DEFAULT_POOL_SIZE = 16
+    DEFAULT_RETRIES = 1
+    DEFAULT_RETRY_BACKOFF = 0.1
+    DEFAULT_CIRCUIT_FAILURES = 3
+    DEFAULT_CIRCUIT_COOLDOWN = 30
+
+    # the endpoints delivering the current state, without any parameters
+    CURRENT_STATE_OPTIONS = (
+        OPTION_CURRENT_TEMP, OPTION_CURRENT_CESSPIT, OPTION_CURRENT_CESSPIT_PREDICTION, OPTION_CURRENT_CESSPIT_LOG,
+        OPTION_CURRENT_PRESSURE, OPTION_CURRENT_HUMIDITY_IN, OPTION_CURRENT_AIR_QUALITY, OPTION_CURRENT_DAYLIGHT,
+        OPTION_CURRENT_RAIN, OPTION_CURRENT_SOIL_MOISTURE, OPTION_CURRENT_SOLAR_PLANT, OPTION_CURRENT_PRECIPITATION,
+        OPTION_CURRENT_WIND, OPTION_CURRENT_WATER_TANK, OPTION_SYSTEM_STATUS
+    )
+
+    SECTION_POLLER = 'POLLER'
+
+    OPTION_ENABLED = 'enabled'
+    SUFFIX_INTERVAL = '-interval'
+    OPTION_SHARED_STORE = 'shared-store'
+    OPTION_POLLER_WORKERS = 'workers'
+
+    DEFAULT_POLL_INTERVAL = 15
+    DEFAULT_POLLER_WORKERS = 4
+
+    SECTION_RENDER = 'RENDER'
+
+    OPTION_PROGRESS_BAR_RENDERER = 'progress-bar'
+
+    RENDERER_LOCAL = 'local'
+    RENDERER_REMOTE = 'remote'
+
+    SECTION_CACHE = 'CACHE'
+
+    OPTION_DEFAULT = 'default'
+    SUFFIX_TTL = '-ttl'
+    SUFFIX_MAX_STALE = '-max-stale'
+    SUFFIX_MAX_SIZE = '-max-size'
+
+    DEFAULT_CACHE_TTL = 20
+    DEFAULT_CACHE_MAX_STALE = 300
+    DEFAULT_CACHE_MAX_SIZE = 16
+    OPTION_SVG_MAX_BYTES = 'svg-max-bytes'
+    DEFAULT_SVG_MAX_BYTES = 4 * 1024 * 1024
+    OPTION_HISTORY_DIR = 'history-dir'
+    DEFAULT_HISTORY_DIR = '/var/cache/bhs/web-info'
+    OPTION_PREFETCH_WORKERS = 'prefetch-workers'
+    OPTION_PREFETCH_MAX_PENDING = 'prefetch-max-pending'
+    DEFAULT_PREFETCH_WORKERS = 2
+    DEFAULT_PREFETCH_MAX_PENDING = 8
+    OPTION_BEAN_MAX_ENTRIES = 'bean-max-entries'
+    DEFAULT_BEAN_MAX_ENTRIES = 128
+    OPTION_FRAGMENT_MAX_ENTRIES = 'fragment-max-entries'
+    DEFAULT_FRAGMENT_MAX_ENTRIES = 64
+
+    SECTION_LIVE = 'LIVE'
+
+    OPTION_LIVE_INTERVAL = 'interval'
+    OPTION_LIVE_MAX_DURATION = 'max-duration'
+
+    DEFAULT_LIVE_INTERVAL = 10
+    DEFAULT_LIVE_MAX_DURATION = 600
+
+    SECTION_TIMEOUT = 'TIMEOUT'
+
+    SUFFIX_CONNECT = '-connect'
+    SUFFIX_READ = '-read'
+    OPTION_PAGE_DEADLINE = 'page-deadline'
+
+    DEFAULT_TIMEOUT_CONNECT = 3.05
+    DEFAULT_TIMEOUT_READ = 10
+    DEFAULT_PAGE_DEADLINE = 15
+
+    SECTION_PRIORITY = 'PRIORITY'
+
+    DEFAULT_PRIORITY = 0
+
+    # how often (seconds) the configuration file is checked for modifications
+    RELOAD_CHECK_INTERVAL = 2.0
 
     def __init__(self):
-        ConfigParser.__init__(self)
-        self.read(self.CONFIG_FILE if not sys.gettrace() else self.CONFIG_FILE_DEV)
+        """
+        The configuration (web-info.ini), parsed into the snapshot (see ConfigSnapshot): the settings and the registry
+        of the endpoints and their policies. The snapshot is replaced when the file is modified, so the changes
+        of [REST], [CACHE], [TIMEOUT] and [PRIORITY] apply without restart. The other settings are reloaded as well,
+        but most of them are read only at startup (e.g. the size of the pool of connections). The values set
+        programmatically are lost on reload.
+        The invalid configuration (e.g. not a number where expected) is not reloaded, the former one stays in use;
+        at startup (with no former one) the endpoints with invalid policies get the default policy.
+        """
+        self._lock = Lock()
+        self._next_check = 0.0
+        self.path = self.CONFIG_FILE if not sys.gettrace() else self.CONFIG_FILE_DEV
+        self._mtime = self._file_mtime()
+        settings = ConfigParser()
+        settings.read(self.path)
+        self._snapshot = ConfigSnapshot(settings, self._build_registry(settings, strict=False))
+
+    def get(self, section: str, option: str, **kwargs) -> str:
+        return self._snapshot.settings.get(section, option, **kwargs)
+
+    def getint(self, section: str, option: str, **kwargs) -> int:
+        return self._snapshot.settings.getint(section, option, **kwargs)
+
+    def getfloat(self, section: str, option: str, **kwargs) -> float:
+        return self._snapshot.settings.getfloat(section, option, **kwargs)
+
+    def getboolean(self, section: str, option: str, **kwargs) -> bool:
+        return self._snapshot.settings.getboolean(section, option, **kwargs)
+
+    def has_section(self, section: str) -> bool:
+        return self._snapshot.settings.has_section(section)
+
+    def has_option(self, section: str, option: str) -> bool:
+        return self._snapshot.settings.has_option(section, option)
+
+    def set(self, section: str, option: str, value: str = None):
+        """
+        Modifies the setting, until the configuration file is reloaded
+        """
+        self._modify(lambda settings: settings.set(section, option, value))
+
+    def remove_option(self, section: str, option: str) -> bool:
+        """
+        Removes the setting, until the configuration file is reloaded
+        :return: True if the setting existed
+        """
+        return self._modify(lambda settings: settings.remove_option(section, option))
+
+    def _modify(self, modification):
+        """
+        Replaces the snapshot with the modified copy of its settings
+        :param modification: callable modifying given settings
+        :return: the outcome of the modification
+        """
+        with self._lock:
+            current = self._snapshot.settings
+            settings = ConfigParser()
+            settings.read_dict({_section: {_option: current.get(_section, _option, raw=True)
+                                           for _option in current.options(_section)}
+                                for _section in current.sections()})
+            settings.read_dict({settings.default_section: dict(current.items(current.default_section, raw=True))})
+            outcome = modification(settings)
+            self._snapshot = ConfigSnapshot(settings, self._build_registry(settings))
+        return outcome
+
+    def _file_mtime(self):
+        try:
+            return os.stat(self.path).st_mtime
+        except OSError:
+            return None
+
+    def _reload_if_modified(self):
+        mtime = self._file_mtime()
+        if mtime is None or mtime == self._mtime:
+            return
+        with self._lock:
+            if mtime == self._mtime:
+                return
+            # the modification is handled once, even if the configuration is invalid (the former one is kept then)
+            self._mtime = mtime
+            settings = ConfigParser()
+            try:
+                settings.read(self.path)
+                registry = self._build_registry(settings)
+            except (Error, ValueError) as err:
+                _log.warning(f'Invalid configuration {self.path}, not reloaded: {str(err)}')
+                return
+            self._snapshot = ConfigSnapshot(settings, registry)
+            _log.info(f'Configuration {self.path} reloaded')
+
+    def snapshot(self) -> ConfigSnapshot:
+        """
+        :return: the current configuration; reloaded if the configuration file has been modified
+        """
+        now = time.monotonic()
+        if now >= self._next_check:
+            self._next_check = now + self.RELOAD_CHECK_INTERVAL
+            self._reload_if_modified()
+        return self._snapshot
+
+    def registry(self) -> EndpointRegistry:
+        """
+        :return: the endpoints and their policies; reloaded if the configuration file has been modified
+        """
+        return self.snapshot().registry
+
+    def _build_registry(self, settings: ConfigParser, strict: bool = True) -> EndpointRegistry:
+        """
+        :param strict: if False, the invalid policies are replaced by the default one (or by the built-in one,
+                       if the default one is invalid as well); otherwise ValueError is raised
+        """
+        endpoints = {}
+        if settings.has_section(self.SECTION_REST):
+            host = settings.get(section=self.SECTION_REST, option=self.OPTION_HOST, fallback=None)
+            port = settings.get(section=self.SECTION_REST, option=self.OPTION_PORT, fallback=None)
+            endpoints = {option: RestEndPoint(_host=host, _port=port, _path=settings.get(self.SECTION_REST, option),
+                                              _name=option)
+                         for option in settings.options(self.SECTION_REST) if option not in self.RESERVED_REST_OPTIONS}
+
+        def _policy(endpoint_name: str, fallback: EndpointPolicy) -> EndpointPolicy:
+            try:
+                return self._build_policy(settings, endpoint_name)
+            except ValueError as err:
+                if strict:
+                    raise
+                _log.warning(f'Invalid configuration of {endpoint_name} in {self.path}, not used: {str(err)}')
+                return fallback
+
+        # the options default-* of the sections, the built-in values if they are missing (or invalid)
+        default = _policy(self.OPTION_DEFAULT, self._build_policy(ConfigParser(), self.OPTION_DEFAULT))
+        return EndpointRegistry(endpoints, {name: _policy(name, default) for name in endpoints}, default)
+
+    def _build_policy(self, parser: ConfigParser, endpoint_name: str) -> EndpointPolicy:
+        def _policy(section: str, suffix: str, fallback, conv=float):
+            return self._endpoint_policy(section, endpoint_name, suffix, fallback, conv, parser=parser)
+
+        return EndpointPolicy(
+            _timeout=Timeout(_connect=_policy(self.SECTION_TIMEOUT, self.SUFFIX_CONNECT, self.DEFAULT_TIMEOUT_CONNECT),
+                             _read=_policy(self.SECTION_TIMEOUT, self.SUFFIX_READ, self.DEFAULT_TIMEOUT_READ)),
+            _cache=CachePolicy(_ttl=_policy(self.SECTION_CACHE, self.SUFFIX_TTL, self.DEFAULT_CACHE_TTL),
+                               _max_stale=_policy(self.SECTION_CACHE, self.SUFFIX_MAX_STALE,
+                                                  self.DEFAULT_CACHE_MAX_STALE),
+                               _max_size=_policy(self.SECTION_CACHE, self.SUFFIX_MAX_SIZE, self.DEFAULT_CACHE_MAX_SIZE,
+                                                 conv=int)),
+            _priority=_policy(self.SECTION_PRIORITY, '', self.DEFAULT_PRIORITY, conv=int))
+
+    def _endpoint(self, option: str) -> RestEndPoint:
+        endpoint = self.registry().endpoints.get(option)
+        if endpoint is None:
+            # not configured, reported as usual
+            self.get(section=self.SECTION_REST, option=option)
+        return endpoint
+
+    def get_policy(self, endpoint_name: str) -> EndpointPolicy:
+        """
+        :return: the policy of the endpoint; the endpoints not configured in [REST] get the default one
+        """
+        registry = self.registry()
+        return registry.policies.get(endpoint_name, registry.default)
+
+    def _endpoint_policy(self, section: str, endpoint_name: str, suffix: str, fallback, conv=float,
+                         parser: ConfigParser = None):
+        """
+        Reads the per-endpoint setting <endpoint_name><suffix> from given section.
+        If not defined, the value of default<suffix> is taken and if even this one is missing, the fallback.
+        :param parser: the configuration to read, this one if not given
+        """
+        parser = parser if parser is not None else self
+        return conv(parser.get(section=section, option=endpoint_name + suffix,
+                               fallback=parser.get(section=section, option=self.OPTION_DEFAULT + suffix,
+                                                   fallback=fallback)))
+
+    def get_pool_size(self) -> int:
+        return self.getint(section=self.SECTION_REST, option=self.OPTION_POOL_SIZE, fallback=self.DEFAULT_POOL_SIZE)
+
+    def get_retries(self) -> int:
+        return self.getint(section=self.SECTION_REST, option=self.OPTION_RETRIES, fallback=self.DEFAULT_RETRIES)
+
+    def get_retry_backoff(self) -> float:
+        return self.getfloat(section=self.SECTION_REST, option=self.OPTION_RETRY_BACKOFF,
+                             fallback=self.DEFAULT_RETRY_BACKOFF)
+
+    def get_circuit_failures(self) -> int:
+        return self.getint(section=self.SECTION_REST, option=self.OPTION_CIRCUIT_FAILURES,
+                           fallback=self.DEFAULT_CIRCUIT_FAILURES)
+
+    def get_circuit_cooldown(self) -> float:
+        return self.getfloat(section=self.SECTION_REST, option=self.OPTION_CIRCUIT_COOLDOWN,
+                             fallback=self.DEFAULT_CIRCUIT_COOLDOWN)
+
+    def is_poller_enabled(self) -> bool:
+        return self.getboolean(section=self.SECTION_POLLER, option=self.OPTION_ENABLED, fallback=False)
+
+    def get_polled_endpoints(self) -> list:
+        """
+        :return: the endpoints of the current state, which are configured
+        """
+        endpoints = self.registry().endpoints
+        return [endpoints[option] for option in self.CURRENT_STATE_OPTIONS if option in endpoints]
+
+    def get_shared_store_path(self) -> str:
+        return self.get(section=self.SECTION_POLLER, option=self.OPTION_SHARED_STORE, fallback='')
+
+    def get_poller_workers(self) -> int:
+        return self.getint(section=self.SECTION_POLLER, option=self.OPTION_POLLER_WORKERS,
+                           fallback=self.DEFAULT_POLLER_WORKERS)
+
+    def get_poll_interval(self, endpoint_name: str) -> float:
+        return self._endpoint_policy(self.SECTION_POLLER, endpoint_name, self.SUFFIX_INTERVAL,
+                                     self.DEFAULT_POLL_INTERVAL)
+
+    def get_progress_bar_renderer(self) -> str:
+        return self.get(section=self.SECTION_RENDER, option=self.OPTION_PROGRESS_BAR_RENDERER,
+                        fallback=self.RENDERER_LOCAL)
+
+    def get_timeout(self, endpoint_name: str) -> Timeout:
+        return self.get_policy(endpoint_name).timeout
+
+    def get_page_deadline(self) -> float:
+        return self.getfloat(section=self.SECTION_TIMEOUT, option=self.OPTION_PAGE_DEADLINE,
+                             fallback=self.DEFAULT_PAGE_DEADLINE)
+
+    def get_svg_cache_max_bytes(self) -> int:
+        return self.getint(section=self.SECTION_CACHE, option=self.OPTION_SVG_MAX_BYTES,
+                           fallback=self.DEFAULT_SVG_MAX_BYTES)
+
+    def get_history_cache_dir(self) -> str:
+        return self.get(section=self.SECTION_CACHE, option=self.OPTION_HISTORY_DIR, fallback=self.DEFAULT_HISTORY_DIR)
+
+    def get_prefetch_workers(self) -> int:
+        return self.getint(section=self.SECTION_CACHE, option=self.OPTION_PREFETCH_WORKERS,
+                           fallback=self.DEFAULT_PREFETCH_WORKERS)
+
+    def get_prefetch_max_pending(self) -> int:
+        return self.getint(section=self.SECTION_CACHE, option=self.OPTION_PREFETCH_MAX_PENDING,
+                           fallback=self.DEFAULT_PREFETCH_MAX_PENDING)
+
+    def get_bean_cache_max_entries(self) -> int:
+        return self.getint(section=self.SECTION_CACHE, option=self.OPTION_BEAN_MAX_ENTRIES,
+                           fallback=self.DEFAULT_BEAN_MAX_ENTRIES)
+
+    def get_fragment_cache_max_entries(self) -> int:
+        return self.getint(section=self.SECTION_CACHE, option=self.OPTION_FRAGMENT_MAX_ENTRIES,
+                           fallback=self.DEFAULT_FRAGMENT_MAX_ENTRIES)
+
+    def get_cache_policy(self, endpoint_name: str) -> CachePolicy:
+        return self.get_policy(endpoint_name).cache
+
+    def get_priority(self, endpoint_name: str) -> int:
+        return self.get_policy(endpoint_name).priority
 
     def get_current_temperature_endpoint(self) -> RestEndPoint:
-        return RestEndPoint(_host=self.get(section=self.SECTION_REST, option=self.OPTION_HOST),
-                            _port=self.get(section=self.SECTION_REST, option=self.OPTION_PORT),
-                            _path=self.get(section=self.SECTION_REST, option=self.OPTION_CURRENT_TEMP))
+        return self._endpoint(self.OPTION_CURRENT_TEMP)
 
     def get_current_pressure_endpoint(self) -> RestEndPoint:
-        return RestEndPoint(_host=self.get(section=self.SECTION_REST, option=self.OPTION_HOST),
-                            _port=self.get(section=self.SECTION_REST, option=self.OPTION_PORT),
-                            _path=self.get(section=self.SECTION_REST, option=self.OPTION_CURRENT_PRESSURE))
+        return self._endpoint(self.OPTION_CURRENT_PRESSURE)
 
     def get_current_humidity_in_endpoint(self) -> RestEndPoint:
-        return RestEndPoint(_host=self.get(section=self.SECTION_REST, option=self.OPTION_HOST),
-                            _port=self.get(section=self.SECTION_REST, option=self.OPTION_PORT),
-                            _path=self.get(section=self.SECTION_REST, option=self.OPTION_CURRENT_HUMIDITY_IN))
+        return self._endpoint(self.OPTION_CURRENT_HUMIDITY_IN)
 
     def get_current_air_quality_endpoint(self) -> RestEndPoint:
-        return RestEndPoint(_host=self.get(section=self.SECTION_REST, option=self.OPTION_HOST),
-                            _port=self.get(section=self.SECTION_REST, option=self.OPTION_PORT),
-                            _path=self.get(section=self.SECTION_REST, option=self.OPTION_CURRENT_AIR_QUALITY))
+        return self._endpoint(self.OPTION_CURRENT_AIR_QUALITY)
 
     def get_current_cesspit_level_endpoint(self) -> RestEndPoint:
-        return RestEndPoint(_host=self.get(section=self.SECTION_REST, option=self.OPTION_HOST),
-                            _port=self.get(section=self.SECTION_REST, option=self.OPTION_PORT),
-                            _path=self.get(section=self.SECTION_REST, option=self.OPTION_CURRENT_CESSPIT))
+        return self._endpoint(self.OPTION_CURRENT_CESSPIT)
 
     def get_current_daylight_endpoint(self) -> RestEndPoint:
-        return RestEndPoint(_host=self.get(section=self.SECTION_REST, option=self.OPTION_HOST),
-                            _port=self.get(section=self.SECTION_REST, option=self.OPTION_PORT),
-                            _path=self.get(section=self.SECTION_REST, option=self.OPTION_CURRENT_DAYLIGHT))
+        return self._endpoint(self.OPTION_CURRENT_DAYLIGHT)
 
     def get_current_soil_moisture_endpoint(self) -> RestEndPoint:
-        return RestEndPoint(_host=self.get(section=self.SECTION_REST, option=self.OPTION_HOST),
-                            _port=self.get(section=self.SECTION_REST, option=self.OPTION_PORT),
-                            _path=self.get(section=self.SECTION_REST, option=self.OPTION_CURRENT_SOIL_MOISTURE))
+        return self._endpoint(self.OPTION_CURRENT_SOIL_MOISTURE)
 
     def get_current_solar_plant_endpoint(self) -> RestEndPoint:
-        return RestEndPoint(_host=self.get(section=self.SECTION_REST, option=self.OPTION_HOST),
-                            _port=self.get(section=self.SECTION_REST, option=self.OPTION_PORT),
-                            _path=self.get(section=self.SECTION_REST, option=self.OPTION_CURRENT_SOLAR_PLANT))
+        return self._endpoint(self.OPTION_CURRENT_SOLAR_PLANT)
 
     def get_current_precipitation_endpoint(self) -> RestEndPoint:
-        return RestEndPoint(_host=self.get(section=self.SECTION_REST, option=self.OPTION_HOST),
-                            _port=self.get(section=self.SECTION_REST, option=self.OPTION_PORT),
-                            _path=self.get(section=self.SECTION_REST, option=self.OPTION_CURRENT_PRECIPITATION))
+        return self._endpoint(self.OPTION_CURRENT_PRECIPITATION)
 
     def get_current_wind_endpoint(self) -> RestEndPoint:
-        return RestEndPoint(_host=self.get(section=self.SECTION_REST, option=self.OPTION_HOST),
-                            _port=self.get(section=self.SECTION_REST, option=self.OPTION_PORT),
-                            _path=self.get(section=self.SECTION_REST, option=self.OPTION_CURRENT_WIND))
+        return self._endpoint(self.OPTION_CURRENT_WIND)
 
     def get_current_water_tank_endpoint(self) -> RestEndPoint:
-        return RestEndPoint(_host=self.get(section=self.SECTION_REST, option=self.OPTION_HOST),
-                            _port=self.get(section=self.SECTION_REST, option=self.OPTION_PORT),
-                            _path=self.get(section=self.SECTION_REST, option=self.OPTION_CURRENT_WATER_TANK))
+        return self._endpoint(self.OPTION_CURRENT_WATER_TANK)
 
     def get_graph_temperature_endpoint(self) -> RestEndPoint:
-        return RestEndPoint(_host=self.get(section=self.SECTION_REST, option=self.OPTION_HOST),
-                            _port=self.get(section=self.SECTION_REST, option=self.OPTION_PORT),
-                            _path=self.get(section=self.SECTION_REST, option=self.OPTION_GRAPH_TEMPERATURE))
+        return self._endpoint(self.OPTION_GRAPH_TEMPERATURE)
 
     def get_progress_bar_endpoint(self) -> RestEndPoint:
-        return RestEndPoint(_host=self.get(section=self.SECTION_REST, option=self.OPTION_HOST),
-                            _port=self.get(section=self.SECTION_REST, option=self.OPTION_PORT),
-                            _path=self.get(section=self.SECTION_REST, option=self.OPTION_PROGRESS_BAR))
+        return self._endpoint(self.OPTION_PROGRESS_BAR)
 
     def get_history_temperature_daily_endpoint(self) -> RestEndPoint:
-        return RestEndPoint(_host=self.get(section=self.SECTION_REST, option=self.OPTION_HOST),
-                            _port=self.get(section=self.SECTION_REST, option=self.OPTION_PORT),
-                            _path=self.get(section=self.SECTION_REST, option=self.OPTION_HISTORY_TEMP_DAILY))
+        return self._endpoint(self.OPTION_HISTORY_TEMP_DAILY)
 
     def get_current_cesspit_prediction_endpoint(self) -> RestEndPoint:
-        return RestEndPoint(_host=self.get(section=self.SECTION_REST, option=self.OPTION_HOST),
-                            _port=self.get(section=self.SECTION_REST, option=self.OPTION_PORT),
-                            _path=self.get(section=self.SECTION_REST, option=self.OPTION_CURRENT_CESSPIT_PREDICTION))
+        return self._endpoint(self.OPTION_CURRENT_CESSPIT_PREDICTION)
 
     def get_current_cesspit_log_endpoint(self) -> RestEndPoint:
-        return RestEndPoint(_host=self.get(section=self.SECTION_REST, option=self.OPTION_HOST),
-                            _port=self.get(section=self.SECTION_REST, option=self.OPTION_PORT),
-                            _path=self.get(section=self.SECTION_REST, option=self.OPTION_CURRENT_CESSPIT_LOG))
+        return self._endpoint(self.OPTION_CURRENT_CESSPIT_LOG)
 
     def get_graph_cesspit_today(self) -> RestEndPoint:
-        return RestEndPoint(_host=self.get(section=self.SECTION_REST, option=self.OPTION_HOST),
-                            _port=self.get(section=self.SECTION_REST, option=self.OPTION_PORT),
-                            _path=self.get(section=self.SECTION_REST, option=self.OPTION_GRAPH_CESSPIT_TODAY))
+        return self._endpoint(self.OPTION_GRAPH_CESSPIT_TODAY)
 
     def get_graph_cesspit_week(self) -> RestEndPoint:
-        return RestEndPoint(_host=self.get(section=self.SECTION_REST, option=self.OPTION_HOST),
-                            _port=self.get(section=self.SECTION_REST, option=self.OPTION_PORT),
-                            _path=self.get(section=self.SECTION_REST, option=self.OPTION_GRAPH_CESSPIT_WEEK))
+        return self._endpoint(self.OPTION_GRAPH_CESSPIT_WEEK)
 
     def get_graph_cesspit_prediction(self) -> RestEndPoint:
-        return RestEndPoint(_host=self.get(section=self.SECTION_REST, option=self.OPTION_HOST),
-                            _port=self.get(section=self.SECTION_REST, option=self.OPTION_PORT),
-                            _path=self.get(section=self.SECTION_REST, option=self.OPTION_GRAPH_CESSPIT_PREDICTION))
+        return self._endpoint(self.OPTION_GRAPH_CESSPIT_PREDICTION)
 
     def get_system_status_endpoint(self) -> RestEndPoint:
-        return RestEndPoint(_host=self.get(section=self.SECTION_REST, option=self.OPTION_HOST),
-                            _port=self.get(section=self.SECTION_REST, option=self.OPTION_PORT),
-                            _path=self.get(section=self.SECTION_REST, option=self.OPTION_SYSTEM_STATUS))
+        return self._endpoint(self.OPTION_SYSTEM_STATUS)
+
+    def get_bundle_endpoint(self) -> RestEndPoint:
+        """
+        :return: the endpoint serving many endpoints with one call or None if not configured (not supported)
+        """
+        return self.registry().endpoints.get(self.OPTION_BUNDLE)
+
+    def get_live_interval(self) -> float:
+        return self.getfloat(section=self.SECTION_LIVE, option=self.OPTION_LIVE_INTERVAL,
+                             fallback=self.DEFAULT_LIVE_INTERVAL)
+
+    def get_live_max_duration(self) -> float:
+        return self.getfloat(section=self.SECTION_LIVE, option=self.OPTION_LIVE_MAX_DURATION,
+                             fallback=self.DEFAULT_LIVE_MAX_DURATION)
@@ -1,11 +1,84 @@
+import hashlib
+import json
+import logging
 import requests
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError, wait
+from contextvars import ContextVar, copy_context
+from threading import Lock
+
 from .restconfig import *
+from .restcache import BeanCache, HistoryCache, Prefetcher, ResponseCache, SingleFlight, SVGCache
+from .restsession import RestSession
+from .poller import SnapshotPoller
+from .sharedstore import SharedSnapshotStore
+from .svgrender import is_supported_colormap, minify_svg, render_progress_bar
+from .fragments import FragmentCache
+from .bundle import BundleSupport, bundle_params, split_bundle
+from .restresilience import CircuitBreaker, CircuitBreakers, DeadlineExceeded, current_deadline, report_timeout, \
+    with_deadline
+from .timing import backend_phase, timed
+from .metrics import backend_latency, bean_errors
 from core.bean import *
 
 from django.utils.safestring import mark_safe
 
+try:
+    import orjson as json_parser
+except ImportError:
+    try:
+        import ujson as json_parser
+    except ImportError:
+        # optional; without them the responses are parsed with json (slower)
+        json_parser = json
+
+_log = logging.getLogger('bhs-info')
+
 rest_configuration = RestConfig()
 
+# kept-alive, pooled connections to the backend, shared by all the clients (RestBackend and derived classes)
+rest_session = RestSession(pool_size=rest_configuration.get_pool_size(),
+                           retries=rest_configuration.get_retries(),
+                           retry_backoff=rest_configuration.get_retry_backoff())
+
+# the pool used to query the backend concurrently (fan-out); shared by all the requests handled by the process
+FAN_OUT_WORKERS = 16
+fan_out_executor = ThreadPoolExecutor(max_workers=FAN_OUT_WORKERS, thread_name_prefix='bhs-fan-out')
+
+# the responses shared by all the requests handled by the process (see [CACHE] section of the configuration)
+response_cache = ResponseCache(rest_configuration.get_cache_policy)
+
+# the graphs, post-processed and ready to be embedded into the page
+svg_cache = SVGCache(max_bytes=rest_configuration.get_svg_cache_max_bytes())
+
+# the beans decoded from the responses, shared by all the requests
+bean_cache = BeanCache(max_entries=rest_configuration.get_bean_cache_max_entries())
+
+# the rendered tiles of the pages, shared by all the requests
+fragment_cache = FragmentCache(max_entries=rest_configuration.get_fragment_cache_max_entries())
+
+# the information about the days that are over, kept on disk forever
+history_cache = HistoryCache(directory=rest_configuration.get_history_cache_dir())
+
+# background prefetching of the information the user is likely to ask for soon
+prefetcher = Prefetcher(workers=rest_configuration.get_prefetch_workers(),
+                        max_pending=rest_configuration.get_prefetch_max_pending())
+
+# identical calls made at the same time by different requests end up as one call to the backend
+single_flight = SingleFlight()
+
+# circuits of the backend host and each of its endpoints; the open ones are not queried
+circuit_breakers = CircuitBreakers(failure_threshold=rest_configuration.get_circuit_failures(),
+                                   cooldown=rest_configuration.get_circuit_cooldown())
+
+# if the backend does not serve the bundles (404), the endpoints are queried one by one for that many seconds
+BUNDLE_RETRY_AFTER = 300
+bundle_support = BundleSupport(retry_after=BUNDLE_RETRY_AFTER)
+
+# the outcomes (responses or exceptions) of the calls made ahead by the asynchronous view, by cache key
+# (see restasync.prefetched); the clients take them instead of querying the backend again
+_prefetched_responses = ContextVar('bhs_prefetched_responses', default=None)
+
 # sensor locations
 SENSOR_LOC_EXTERNAL = 'External'
 SENSOR_LOC_BUNKER = 'Bunker'
@@ -21,53 +94,334 @@ SENSOR_LOC_RPICOPPER = 'RPiCopper'
 SENSOR_LOC_GARDEN = 'Garden'
 SENSOR_LOC_GRASS = 'Grass'
 
+# titles of the graphs
+GRAPH_TITLE_EXTERNAL = 'Temperatura zewnętrzna - czujnik pieca'
+GRAPH_TITLE_OFFICE = 'Temperatura w biurze'
+
+
+def is_closed_day(the_date: datetime) -> bool:
+    """
+    :return: True if the day is over, so the information about it does not change anymore
+    """
+    return the_date is not None and the_date.date() < datetime.today().date()
+
+
+def _decode(content):
+    with timed('json_to_bean'):
+        return json_to_bean(json_parser.loads(content))
+
+
+def _to_bean(content):
+    """
+    :param content: the JSON response of the backend (str or bytes)
+    :return: the bean (see core.bean.json_to_bean); the same content is decoded only once (see bean_cache)
+    """
+    return bean_cache.get(content, _decode)
+
+
+def bundled_outcomes(content, endpoints: list) -> dict:
+    """
+    Splits the bundle into the outcomes of the calls to the bundled endpoints, as if each one was queried on its own:
+    the response or HTTPError (the circuits of the endpoints are updated accordingly)
+    :param content: the bundle
+    :param endpoints: the bundled endpoints
+    :return: the outcomes by endpoint name; the endpoints missing in the bundle are skipped
+    :raise ValueError: if the bundle is not valid
+    """
+    outcomes = {}
+    for name, response in split_bundle(content, endpoints).items():
+        if response.status_code >= 500:
+            circuit_breakers.get(name).on_failure()
+        elif response.status_code < 400:
+            circuit_breakers.get(name).on_success()
+        outcomes[name] = requests.HTTPError(f'{response.status_code} Error for url: {response.url}') \
+            if response.status_code >= 400 else response
+    return outcomes
+
+
+def bundle_failed(bundle: RestEndPoint, exc: Exception):
+    """
+    Reports the failure of the bundle; the bundled endpoints are queried one by one instead
+    """
+    response = getattr(exc, 'response', None)
+    if response is not None and response.status_code == 404:
+        _log.warning(f'{bundle.get_url()} is not served, the endpoints are queried one by one '
+                     f'for {BUNDLE_RETRY_AFTER} s')
+        bundle_support.mark_unsupported()
+    else:
+        _log.warning(f'Bundle {bundle.get_url()} failed: {str(exc)}')
+
 
 class RestBackend:
 
+    # if the responses are kept in the process-wide response_cache
+    _cache_responses = True
+
     def __init__(self):
         self._responses = {}
+        self._responses_lock = Lock()
 
-    def _get(self, _url: str, params=None):
+    @staticmethod
+    def _fetch(endpoint: RestEndPoint, params=None):
         """
-        Performs GET for given URL. The result is cached.
-        Note: subsequent calls with the same URL will result in only one call!
-        :param _url: the url to GET
-        :return: response (from requests)
+        Queries the backend, respecting the timeouts of the endpoint and the deadline of the current request (if any).
+        The call is not made if the circuit of the host or the endpoint is open. Only the connection errors are
+        the failures of the host; the timeouts shortened by the deadline are not failures at all (see report_timeout).
         """
-        cache_key = _url + (str(params) if params is not None else '')
-        response = self._responses.get(cache_key)
-        if not response:
-            response = requests.get(_url, params=params)
+        timeout = rest_configuration.get_timeout(endpoint.name)
+        connect_timeout, read_timeout = timeout.connect, timeout.read
+        deadline = current_deadline()
+        if deadline is not None:
+            if deadline.expired():
+                raise DeadlineExceeded(f'No time left to query {endpoint.get_url()}')
+            connect_timeout = min(connect_timeout, deadline.remaining())
+            read_timeout = min(read_timeout, deadline.remaining())
+        cut_by_deadline = connect_timeout < timeout.connect or read_timeout < timeout.read
+
+        host_circuit = circuit_breakers.get(endpoint.get_host_id())
+        endpoint_circuit = circuit_breakers.get(endpoint.name)
+        host_circuit.before_call()
+        endpoint_circuit.before_call()
+        started_at = time.perf_counter()
+        try:
+            response = rest_session.get(endpoint.get_url(), params=params, timeout=(connect_timeout, read_timeout))
+        except requests.Timeout as exc:
+            report_timeout(host_circuit, endpoint_circuit, connecting=isinstance(exc, requests.ConnectTimeout),
+                           cut_by_deadline=cut_by_deadline)
+            raise
+        except requests.ConnectionError:
+            host_circuit.on_failure()
+            endpoint_circuit.on_failure()
+            raise
+        finally:
+            backend_latency.observe(time.perf_counter() - started_at, endpoint.name)
+        host_circuit.on_success()
+
+        try:
             response.raise_for_status()
-            self._responses[cache_key] = response
+        except requests.HTTPError:
+            if response.status_code >= 500:
+                endpoint_circuit.on_failure()
+            raise
+        endpoint_circuit.on_success()
         return response
 
+    @staticmethod
+    def _coalesced_fetch(endpoint: RestEndPoint, params, cache_key: str):
+        """
+        Queries the backend unless the very same call is already in flight; then waits for its outcome
+        """
+        deadline = current_deadline()
+        try:
+            return single_flight.do(cache_key, lambda: RestBackend._fetch(endpoint, params),
+                                    timeout=deadline.remaining() if deadline is not None else None)
+        except TimeoutError:
+            raise DeadlineExceeded(f'No response from {endpoint.get_url()} on time')
+
+    @staticmethod
+    def _prefetched_or_fetch(endpoint: RestEndPoint, params, cache_key: str):
+        """
+        Delivers the outcome of the call already made by the asynchronous view, if any; queries the backend otherwise
+        """
+        prefetched = _prefetched_responses.get()
+        if prefetched is not None and cache_key in prefetched:
+            outcome = prefetched[cache_key]
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+        return RestBackend._coalesced_fetch(endpoint, params, cache_key)
+
+    @staticmethod
+    def _cache_key(endpoint: RestEndPoint, params=None) -> str:
+        return endpoint.get_url() + (str(params) if params is not None else '')
+
+    def _get(self, endpoint: RestEndPoint, params=None):
+        """
+        Performs GET for given endpoint. The result is cached.
+        Note: subsequent calls with the same URL will result in only one call!
+        The method is thread-safe: if the same URL is being queried by another thread (see _prefetch),
+        the call waits for the outcome instead of issuing another request.
+        The successful responses are additionally kept in the process-wide response_cache.
+        If the deadline of the current request passes, DeadlineExceeded is raised.
+        :param endpoint: the endpoint to GET
+        :param params: the parameters of GET
+        :return: response (from requests)
+        """
+        # the time of waiting, no matter if the response is served from the cache or fetched
+        with timed(backend_phase(endpoint.name)):
+            _url = endpoint.get_url()
+            cache_key = self._cache_key(endpoint, params)
+            with self._responses_lock:
+                future = self._responses.get(cache_key)
+                is_owner = future is None
+                if is_owner:
+                    future = Future()
+                    self._responses[cache_key] = future
+
+            if is_owner:
+                try:
+                    future.set_result(
+                        response_cache.get(endpoint.name, cache_key,
+                                           lambda: self._prefetched_or_fetch(endpoint, params, cache_key))
+                        if self._cache_responses else self._prefetched_or_fetch(endpoint, params, cache_key))
+                except Exception as exc:
+                    # the failure is remembered as well, the caller(s) will get the very same exception
+                    future.set_exception(exc)
+                finally:
+                    if not future.done():
+                        # interrupted (e.g. SystemExit of the thread): the waiters get CancelledError at once,
+                        # instead of waiting until the deadline
+                        future.cancel()
+
+            deadline = current_deadline()
+            try:
+                return future.result(timeout=deadline.remaining() if deadline is not None else None)
+            except TimeoutError:
+                raise DeadlineExceeded(f'No response from {_url} on time')
+
+    def _prefetch(self, *calls):
+        """
+        Queries the backend concurrently (fan-out) for all given (endpoint, params) pairs and waits until all are done.
+        The responses (or errors) end up in the cache, so that the subsequent calls to _get are served immediately.
+        No exception is raised, the errors are reported by the methods reading the responses, as usual.
+        The calls are made in the context of the caller, so they respect the deadline of the current request.
+        The calls to the endpoints of higher priority (see [PRIORITY]) are submitted first.
+        :param calls: tuples (endpoint, params) to GET
+        """
+        deadline = current_deadline()
+        calls = sorted(calls, key=lambda _call: rest_configuration.get_priority(_call[0].name), reverse=True)
+        wait([fan_out_executor.submit(copy_context().run, self._get, endpoint, params) for endpoint, params in calls],
+             timeout=deadline.remaining() if deadline is not None else None)
+
+    def _resolve(self, cache_key: str, outcome):
+        """
+        Records the outcome (response or exception) of the call made otherwise (e.g. as the part of the bundle),
+        unless the call is already made or in flight
+        """
+        future = Future()
+        if isinstance(outcome, Exception):
+            future.set_exception(outcome)
+        else:
+            future.set_result(outcome)
+        with self._responses_lock:
+            self._responses.setdefault(cache_key, future)
+
+    def _prefetch_bundle(self, *endpoints: RestEndPoint) -> list:
+        """
+        Queries the backend for all the endpoints (without parameters) with one call, if the backend serves
+        the bundles (see [REST] bundle). The parts of the bundle end up in the caches, as if each endpoint was queried.
+        The endpoints served from the snapshot of the background poller, from the cache or already queried
+        by the asynchronous view are not bundled.
+        :return: the endpoints not delivered by the bundle (all, if the bundle is not available)
+        """
+        prefetched = _prefetched_responses.get() or {}
+        endpoints = [endpoint for endpoint in endpoints if snapshot_entry(endpoint.name) is None
+                     and self._cache_key(endpoint) not in prefetched
+                     and not response_cache.contains(endpoint.name, self._cache_key(endpoint))]
+        bundle = rest_configuration.get_bundle_endpoint()
+        if bundle is None or len(endpoints) < 2 or not bundle_support.is_supported():
+            return endpoints
+
+        params = bundle_params(endpoints)
+        try:
+            with timed(backend_phase(bundle.name)):
+                response = self._coalesced_fetch(bundle, params, self._cache_key(bundle, params))
+                outcomes = bundled_outcomes(response.content, endpoints)
+        except (requests.RequestException, ValueError) as exc:
+            bundle_failed(bundle, exc)
+            return endpoints
+
+        for endpoint in endpoints:
+            outcome = outcomes.get(endpoint.name)
+            if outcome is None:
+                continue
+            if not isinstance(outcome, Exception) and self._cache_responses:
+                response_cache.put(endpoint.name, self._cache_key(endpoint), outcome)
+            self._resolve(self._cache_key(endpoint), outcome)
+        return [endpoint for endpoint in endpoints if endpoint.name not in outcomes]
+
     # def _get_json(self, _url: str, params=None):
     #     response = self._get(_url, params)
     #     return response.json() if response.status_code == 200 else None
 
     def _safe_json_get(self, endpoint: RestEndPoint, params=None):
         try:
-            get_response = self._get(endpoint.get_url(), params)
-            bean_response = json_to_bean(get_response.json()) \
-                if get_response.status_code == 200 \
-                else ErrorJsonBean(f'Response code {get_response.status_code}')
+            get_response = self._get(endpoint, params)
+            if get_response.status_code == 200:
+                # note: the raw content, the parser decodes it faster than the response does
+                bean_response = _to_bean(get_response.content)
+            else:
+                bean_response = ErrorJsonBean(f'Response code {get_response.status_code}')
+                bean_errors.inc(endpoint.name, 'status')
         except ValueError as err:
             bean_response = ErrorJsonBean(repr(err))
+            bean_errors.inc(endpoint.name, 'invalid-json')
         except requests.Timeout:
             bean_response = NotAvailableJsonBean()
+            bean_errors.inc(endpoint.name, 'not-available')
         except requests.ConnectionError as err:
             bean_response = ErrorJsonBean(f'Connection issue: {str(err)}')
+            bean_errors.inc(endpoint.name, 'connection')
         except requests.HTTPError as err:
             bean_response = ErrorJsonBean(f'HTTP Error: {str(err)}')
+            bean_errors.inc(endpoint.name, 'http')
         except Exception as exc:
             bean_response = ErrorJsonBean(f'Unknown exception: {str(exc)}')
+            bean_errors.inc(endpoint.name, 'unknown')
+
+        return bean_response
 
+    def _persistent_json_get(self, sensor_location: str, the_date: datetime, kind: str,
+                             endpoint: RestEndPoint, params=None):
+        """
+        Same as _safe_json_get, but the successful response is kept forever in history_cache.
+        Use only for the information about the days that are over (see is_closed_day).
+        """
+        content = history_cache.get(sensor_location, the_date.date(), kind)
+        if content is not None:
+            try:
+                return _to_bean(content)
+            except Exception as exc:
+                _log.warning(f'Invalid content of history cache {sensor_location}/{the_date}/{kind}: {str(exc)}')
+
+        bean_response = self._safe_json_get(endpoint, params)
+        if bean_response.has_succeeded():
+            history_cache.put(sensor_location, the_date.date(), kind, self._get(endpoint, params).text)
         return bean_response
 
+    def _current_json_get(self, endpoint: RestEndPoint):
+        """
+        Same as _safe_json_get (without parameters), but served from the snapshot of the background poller,
+        if it is running (in this or other process) and has up-to-date information
+        """
+        entry = snapshot_entry(endpoint.name)
+        if entry is None:
+            return self._safe_json_get(endpoint)
+
+        # the snapshot keeps the raw responses, each one is converted to bean once
+        decoded = _snapshot_beans.get(endpoint.name)
+        if decoded is None or decoded[0] != entry.fetched_at:
+            try:
+                decoded = (entry.fetched_at, _to_bean(entry.value))
+            except Exception as exc:
+                return ErrorJsonBean(f'Invalid snapshot of {endpoint.name}: {str(exc)}')
+            _snapshot_beans[endpoint.name] = decoded
+        return decoded[1]
+
+    def prefetch(self, *endpoints: RestEndPoint):
+        """
+        Fan-out: concurrently queries all provided endpoints, so that the page waits only for the slowest one.
+        The endpoints served from the snapshot of the background poller are skipped.
+        :param endpoints: the endpoints to be queried (without parameters)
+        """
+        self._prefetch(*[(endpoint, None) for endpoint in endpoints if snapshot_entry(endpoint.name) is None])
+
 
 class SVGGraph(RestBackend):
 
+    # the graphs are cached (post-processed) in the svg_cache instead
+    _cache_responses = False
+
     def __init__(self):
         RestBackend.__init__(self)
 
@@ -77,17 +431,51 @@ class SVGGraph(RestBackend):
            f'<svg width="1pt" height="1pt" viewBox="0 0 1 1" xmlns="http://www.w3.org/2000/svg" version="1.1"></svg>'
         )
 
-    def _svg(self, _url: str, params: dict) -> str:
+    def _render_svg(self, endpoint: RestEndPoint, params: dict):
         response = None
         try:
-            response = self._get(_url, params)
+            response = self._get(endpoint, params)
         finally:
             if response is None or response.status_code != 200:
-                return SVGGraph._empty_svg()
+                return None
         _xml = response.text
         # wipe-away the comments, just leave the plain XML, which can be later pasted into web page
         _xml = _xml[_xml.index('<svg'):] if _xml.find('<svg') > 0 else ''
-        return mark_safe(_xml)
+        # the graphs are embedded inline, each byte saved here is saved in every page sent
+        return mark_safe(minify_svg(_xml))
+
+    def _svg(self, endpoint: RestEndPoint, params: dict, version=None) -> str:
+        """
+        Delivers the graph from the backend, cached in svg_cache for the TTL of the endpoint (see [CACHE])
+        :param endpoint: the endpoint rendering the graph
+        :param params: the parameters of the graph
+        :param version: the version of the data presented by the graph, if changed the graph is fetched again
+        :return: the SVG, ready to be embedded into the page (empty one if not available)
+        """
+        with timed(f'svg.{endpoint.name}'):
+            cache_key = self._cache_key(endpoint, params)
+            entry = snapshot_entry(cache_key)
+            if entry is not None:
+                return mark_safe(entry.value)
+
+            svg = svg_cache.get(cache_key, version,
+                                rest_configuration.get_cache_policy(endpoint.name).ttl,
+                                lambda: self._render_svg(endpoint, params))
+            return svg if svg is not None else SVGGraph._empty_svg()
+
+    def _persistent_svg(self, sensor_location: str, the_date: datetime, kind: str,
+                        endpoint: RestEndPoint, params: dict) -> str:
+        """
+        Same as _svg, but the graph is kept forever in history_cache.
+        Use only for the graphs of the days that are over (see is_closed_day).
+        """
+        svg = history_cache.get(sensor_location, the_date.date(), kind)
+        if svg is None:
+            svg = self._render_svg(endpoint, params)
+            if svg is None:
+                return SVGGraph._empty_svg()
+            history_cache.put(sensor_location, the_date.date(), kind, svg)
+        return mark_safe(svg)
 
 
 class ProgressBar(SVGGraph):
@@ -95,45 +483,121 @@ class ProgressBar(SVGGraph):
     def __init__(self):
         SVGGraph.__init__(self)
 
+    @staticmethod
+    def _progress_bar_params(percentage: int, size=None, show_border: bool = False,
+                             color: str = None, colormap: str = None) -> dict:
+        return ProgressBarRESTInterface(progress=percentage,
+                                        size=size,
+                                        show_border=show_border,
+                                        color=color, colormap=colormap).params_for_get()
+
+    @staticmethod
+    def _is_rendered_locally(colormap: str = None, **_kwargs) -> bool:
+        return rest_configuration.get_progress_bar_renderer() == RestConfig.RENDERER_LOCAL \
+            and is_supported_colormap(colormap)
+
     def get_progress_bar(self, percentage: int, size=None, show_border: bool = False,
                          color: str = None, colormap: str = None) -> str:
-        return self._svg(rest_configuration.get_progress_bar_endpoint().get_url(),
-                         ProgressBarRESTInterface(progress=percentage,
-                                                  size=size,
-                                                  show_border=show_border,
-                                                  color=color, colormap=colormap).params_for_get())
+        if self._is_rendered_locally(colormap=colormap):
+            return mark_safe(render_progress_bar(percentage=round(float(percentage), 1),
+                                                 size=tuple(size) if size else None,
+                                                 show_border=show_border, color=color, colormap=colormap))
+        return self._svg(rest_configuration.get_progress_bar_endpoint(),
+                         self._progress_bar_params(percentage=percentage, size=size, show_border=show_border,
+                                                   color=color, colormap=colormap))
+
+    def get_progress_bars(self, *bars: dict) -> list:
+        """
+        Renders many progress bars at once; the ones not rendered locally are queried concurrently.
+        :param bars: each one is a dictionary with the arguments of get_progress_bar
+        :return: list of SVGs, in the order of the provided bars
+        """
+        endpoint = rest_configuration.get_progress_bar_endpoint()
+        self._prefetch(*[(endpoint, self._progress_bar_params(**bar))
+                         for bar in bars if not self._is_rendered_locally(**bar)])
+        return [self.get_progress_bar(**bar) for bar in bars]
 
 
 class TemperatureGraph(SVGGraph):
 
-    def __init__(self):
+    def __init__(self, information=None):
+        """
+        :param information: the TemperatureInfo of the page, the latest readings (the versions of the graphs of today)
+                            are taken from it; if not given, the graph queries them on its own
+        """
         SVGGraph.__init__(self)
+        self._information = information
+
+    HISTORY_KIND = 'graph'
+
+    @staticmethod
+    def daily_graph_request(sensor_location: str, graph_title: str, the_date=None) -> tuple:
+        """
+        :return: the endpoint and the parameters of the daily graph
+        """
+        return rest_configuration.get_graph_temperature_endpoint(), TemperatureGraphRESTInterface(
+            sensor_location=sensor_location,
+            the_date=the_date,
+            graph_title=graph_title,
+            style=TemperatureGraphRESTInterface.STYLE_FILLBETWEEN).params_for_get()
 
     def get_temp_daily_graph(self, sensor_location: str, graph_title: str, the_date=None) -> str:
-        return self._svg(rest_configuration.get_graph_temperature_endpoint().get_url(),
-                         TemperatureGraphRESTInterface(
-                             sensor_location=sensor_location,
-                             the_date=the_date,
-                             graph_title=graph_title,
-                             style=TemperatureGraphRESTInterface.STYLE_FILLBETWEEN).params_for_get())
+        endpoint, params = self.daily_graph_request(sensor_location, graph_title, the_date)
+        if is_closed_day(the_date):
+            return self._persistent_svg(sensor_location, the_date, f'{self.HISTORY_KIND}:{graph_title}',
+                                        endpoint, params)
+        return self._svg(endpoint, params, version=self._graph_version(sensor_location, the_date))
+
+    def _graph_version(self, sensor_location: str, the_date=None):
+        """
+        The graph of today changes with every new reading, so the timestamp of the latest one is the version.
+        The graph of the day in the past is versioned by its date.
+        """
+        if the_date is not None and the_date.date() != datetime.today().date():
+            return the_date.date()
+        if self._information is None:
+            self._information = TemperatureInfo()
+        reading = self._information.get_temp(sensor_location)
+        return reading.timestamp if reading.has_succeeded() else None
 
 
 class CesspitGraph(SVGGraph):
 
-    def __init__(self):
+    def __init__(self, information=None):
+        """
+        :param information: the MainPageInfo (or derived) of the page, the level of the cesspit (the version
+                            of the graphs) is taken from it; if not given, the graph queries it on its own
+        """
         SVGGraph.__init__(self)
+        self._information = information
+
+    def _graph_version(self):
+        """
+        All the cesspit graphs change with a new reading of the level, so its timestamp is the version
+        """
+        if self._information is None:
+            self._information = MainPageInfo()
+        level = self._information.get_cesspit_level()
+        return level.original_reading.timestamp if level.has_succeeded() else None
+
+    @staticmethod
+    def graph_requests() -> tuple:
+        """
+        :return: the endpoints and the parameters of the graphs: today usage, last week usage and prediction
+        """
+        return ((rest_configuration.get_graph_cesspit_today(), {}),
+                (rest_configuration.get_graph_cesspit_week(),
+                 CesspitHistoryRESTInterface(days_in_past=7).params_for_get()),
+                (rest_configuration.get_graph_cesspit_prediction(), {}))
 
     def get_today_usage_graph(self) -> str:
-        return self._svg(rest_configuration.get_graph_cesspit_today().get_url(), {})
+        return self._svg(*self.graph_requests()[0], version=self._graph_version())
 
     def get_last_week_usage_graph(self) -> str:
-        return self._svg(
-            rest_configuration.get_graph_cesspit_week().get_url(),
-            CesspitHistoryRESTInterface(days_in_past=7).params_for_get()
-        )
+        return self._svg(*self.graph_requests()[1], version=self._graph_version())
 
     def get_prediction_graph(self) -> str:
-        return self._svg(rest_configuration.get_graph_cesspit_prediction().get_url(), {})
+        return self._svg(*self.graph_requests()[2], version=self._graph_version())
 
 
 class TemperatureInfo(RestBackend):
@@ -145,7 +609,7 @@ class TemperatureInfo(RestBackend):
     def _get_temp(self, location: str) -> TemperatureReadingJson:
         _temp = self.temperatures.get(location)
         if not _temp:
-            all_temps = self._safe_json_get(rest_configuration.get_current_temperature_endpoint())
+            all_temps = self._current_json_get(rest_configuration.get_current_temperature_endpoint())
             # expected list
             if type(all_temps) == list:
                 for t in all_temps:
@@ -218,44 +682,70 @@ class MainPageInfo(TemperatureInfo):
         """
         TemperatureInfo.__init__(self)
 
+    @staticmethod
+    def main_page_endpoints() -> tuple:
+        """
+        :return: the endpoints queried for the main page
+        """
+        return (rest_configuration.get_current_temperature_endpoint(),
+                rest_configuration.get_current_cesspit_level_endpoint(),
+                rest_configuration.get_current_cesspit_prediction_endpoint(),
+                rest_configuration.get_current_humidity_in_endpoint(),
+                rest_configuration.get_current_air_quality_endpoint(),
+                rest_configuration.get_current_pressure_endpoint(),
+                rest_configuration.get_current_daylight_endpoint(),
+                rest_configuration.get_current_solar_plant_endpoint(),
+                rest_configuration.get_current_precipitation_endpoint(),
+                rest_configuration.get_current_wind_endpoint(),
+                rest_configuration.get_current_water_tank_endpoint(),
+                rest_configuration.get_system_status_endpoint(),
+                rest_configuration.get_current_soil_moisture_endpoint())
+
+    def prefetch_main_page(self):
+        """
+        Queries the backend for everything that is needed by the main page: with one call if the backend
+        serves the bundles, otherwise (or for the endpoints missing in the bundle) concurrently.
+        """
+        self.prefetch(*self._prefetch_bundle(*self.main_page_endpoints()))
+
     def get_cesspit_level(self) -> CesspitInterpretedReadingJson:
-        return self._safe_json_get(rest_configuration.get_current_cesspit_level_endpoint())
+        return self._current_json_get(rest_configuration.get_current_cesspit_level_endpoint())
 
     def get_humidity_in(self) -> ValueTendencyJson:
-        return self._safe_json_get(rest_configuration.get_current_humidity_in_endpoint())
+        return self._current_json_get(rest_configuration.get_current_humidity_in_endpoint())
 
     def get_pressure(self) -> ValueTendencyJson:
-        return self._safe_json_get(rest_configuration.get_current_pressure_endpoint())
+        return self._current_json_get(rest_configuration.get_current_pressure_endpoint())
 
     def get_air_quality(self) -> AirQualityInterpretedReadingJson:
-        return self._safe_json_get(rest_configuration.get_current_air_quality_endpoint())
+        return self._current_json_get(rest_configuration.get_current_air_quality_endpoint())
 
     def get_daylight(self) -> DaylightInterpretedReadingJson:
-        return self._safe_json_get(rest_configuration.get_current_daylight_endpoint())
+        return self._current_json_get(rest_configuration.get_current_daylight_endpoint())
 
     def get_soil_moisture(self) -> list:
-        return self._safe_json_get(rest_configuration.get_current_soil_moisture_endpoint())
+        return self._current_json_get(rest_configuration.get_current_soil_moisture_endpoint())
 
     def get_solar_plant(self) -> SolarPlantInterpretedReadingJson:
-        return self._safe_json_get(rest_configuration.get_current_solar_plant_endpoint())
+        return self._current_json_get(rest_configuration.get_current_solar_plant_endpoint())
 
     def get_precipitation(self) -> PrecipitationObservationsReadingJson:
-        return self._safe_json_get(rest_configuration.get_current_precipitation_endpoint())
+        return self._current_json_get(rest_configuration.get_current_precipitation_endpoint())
 
     def get_wind(self) -> WindObservationsReadingJson:
-        return self._safe_json_get(rest_configuration.get_current_wind_endpoint())
+        return self._current_json_get(rest_configuration.get_current_wind_endpoint())
 
     def get_water_tank(self) -> WaterLevelReadingJson:
-        return self._safe_json_get(rest_configuration.get_current_water_tank_endpoint())
+        return self._current_json_get(rest_configuration.get_current_water_tank_endpoint())
 
     def get_cesspit_prediction(self) -> CesspitPredictionJson:
-        return self._safe_json_get(rest_configuration.get_current_cesspit_prediction_endpoint())
+        return self._current_json_get(rest_configuration.get_current_cesspit_prediction_endpoint())
 
     def get_system_status(self) -> SystemStatusJson:
-        return self._safe_json_get(rest_configuration.get_system_status_endpoint())
+        return self._current_json_get(rest_configuration.get_system_status_endpoint())
 
     def get_cesspit_log(self) -> ServiceLogJson:
-        return self._safe_json_get(rest_configuration.get_current_cesspit_log_endpoint())
+        return self._current_json_get(rest_configuration.get_current_cesspit_log_endpoint())
 
 
 class TemperatureDailyStatistics(RestBackend):
@@ -263,12 +753,16 @@ class TemperatureDailyStatistics(RestBackend):
     def __init__(self):
         RestBackend.__init__(self)
 
+    HISTORY_KIND = 'statistics'
+
     def get_daily_statistics(self, sensor_location: str, the_date: datetime) -> TemperatureDailyStatistics:
-        return self._safe_json_get(
-            rest_configuration.get_history_temperature_daily_endpoint(),
-            params=TemperatureStatisticsRESTInterface(
-                sensor_location=sensor_location,
-                the_date=the_date).params_for_get())
+        endpoint = rest_configuration.get_history_temperature_daily_endpoint()
+        params = TemperatureStatisticsRESTInterface(
+            sensor_location=sensor_location,
+            the_date=the_date).params_for_get()
+        if is_closed_day(the_date):
+            return self._persistent_json_get(sensor_location, the_date, self.HISTORY_KIND, endpoint, params)
+        return self._safe_json_get(endpoint, params=params)
 
 
 class CesspitInfo(MainPageInfo):
@@ -288,4 +782,122 @@ class SystemStatusInfo(MainPageInfo):
         Creates new object responsible for delivering information for page with system status.
         In order to not duplicate code, this derives from MainPageInfo
         """
-        MainPageInfo.__init__(self)
\ No newline at end of file
+        MainPageInfo.__init__(self)
+
+
+def prefetch_temperature_history(sensor_location: str, *dates: datetime):
+    """
+    Schedules background prefetching of the daily statistics and graph of given days (the future ones are skipped),
+    so that they are served from the cache when asked for.
+    """
+    for the_date in dates:
+        if the_date.date() > datetime.today().date():
+            continue
+        prefetcher.schedule(
+            f'temperature-history:{sensor_location}:{the_date.date()}',
+            lambda _date=the_date: (
+                TemperatureDailyStatistics().get_daily_statistics(sensor_location=sensor_location, the_date=_date),
+                TemperatureGraph().get_temp_daily_graph(sensor_location=sensor_location, graph_title=None,
+                                                        the_date=_date)))
+
+
+class _PolledBackend(SVGGraph):
+
+    def poll_json(self, endpoint: RestEndPoint):
+        """
+        :return: the raw (JSON) response of the endpoint or None if the backend did not deliver proper information
+        """
+        bean_response = self._safe_json_get(endpoint)
+        if type(bean_response) != list and not bean_response.has_succeeded():
+            return None
+        return self._get(endpoint).text
+
+    def poll_svg(self, endpoint: RestEndPoint, params: dict):
+        """
+        :return: the graph ready to be embedded into the page or None if it is not available
+        """
+        return self._render_svg(endpoint, params)
+
+
+def _polled_items() -> dict:
+    """
+    Called before each round of polling, so the graphs of today are the ones of the current day
+    :return: the interval of polling and the polling function by the name of the item in the snapshot:
+             the name of the endpoint for the current state, the cache key for the graphs
+    """
+    items = {
+        endpoint.name: (rest_configuration.get_poll_interval(endpoint.name),
+                        lambda _endpoint=endpoint: _PolledBackend().poll_json(_endpoint))
+        for endpoint in rest_configuration.get_polled_endpoints()
+    }
+    graphs = [TemperatureGraph.daily_graph_request(SENSOR_LOC_EXTERNAL, GRAPH_TITLE_EXTERNAL),
+              TemperatureGraph.daily_graph_request(SENSOR_LOC_OFFICE, GRAPH_TITLE_OFFICE),
+              *CesspitGraph.graph_requests()]
+    items.update({
+        RestBackend._cache_key(endpoint, params): (rest_configuration.get_poll_interval(endpoint.name),
+                                                   lambda _endpoint=endpoint, _params=params:
+                                                   _PolledBackend().poll_svg(_endpoint, _params))
+        for endpoint, params in graphs
+    })
+    return items
+
+
+# the current state (and the graphs of the main pages) polled in background
+# if enabled, see [POLLER] section of the configuration; polled by its own pool, so that the (slow) rounds
+# never hold the threads of fan_out_executor the requests wait for
+shared_store = SharedSnapshotStore(rest_configuration.get_shared_store_path()) \
+    if rest_configuration.get_shared_store_path() else None
+snapshot_poller = SnapshotPoller(
+    items=_polled_items,
+    executor=ThreadPoolExecutor(max_workers=rest_configuration.get_poller_workers(), thread_name_prefix='bhs-poll'),
+    publish=shared_store.write if shared_store is not None else None)
+# the beans decoded from the snapshot: (fetched_at, bean) by the name of the endpoint
+_snapshot_beans = {}
+
+SNAPSHOT_ELECTION_INTERVAL = 10
+_poller_start_lock = Lock()
+_poller_started = False
+
+
+def snapshot_entry(name: str):
+    """
+    :return: the up-to-date entry of the snapshot, polled by this process or read from the shared one; None if missing
+    """
+    if snapshot_poller.is_running():
+        return snapshot_poller.get_entry(name)
+    if shared_store is not None and rest_configuration.is_poller_enabled():
+        return shared_store.get_entry(name)
+    return None
+
+
+def snapshot_version(calls) -> str:
+    """
+    :param calls: tuples (endpoint, params) of the information presented by the page
+    :return: the digest of the values of all the given calls in the snapshot (see _polled_items), the same in all
+             the processes; None if any of them is not in the snapshot
+    """
+    digests = []
+    for endpoint, params in calls:
+        entry = snapshot_entry(endpoint.name if params is None else RestBackend._cache_key(endpoint, params))
+        if entry is None:
+            return None
+        digests.append(entry.digest)
+    return hashlib.md5(' '.join(digests).encode()).hexdigest()
+
+
+def start_snapshot_poller():
+    """
+    Starts polling (once, the subsequent calls do nothing); if the snapshot is shared, only the elected process polls
+    (the others read the shared snapshot)
+    """
+    global _poller_started
+    if not rest_configuration.is_poller_enabled():
+        return
+    with _poller_start_lock:
+        if _poller_started:
+            return
+        _poller_started = True
+    if shared_store is None:
+        snapshot_poller.start()
+    else:
+        shared_store.run_election(snapshot_poller.start, interval=SNAPSHOT_ELECTION_INTERVAL)
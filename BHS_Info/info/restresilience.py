@@ -0,0 +1,192 @@
+from contextvars import ContextVar
+from datetime import datetime
+from functools import wraps
+from threading import Lock
+import asyncio
+import logging
+import time
+
+import requests
+
+_log = logging.getLogger('bhs-info')
+
+
+class DeadlineExceeded(requests.Timeout):
+    """
+    Raised instead of querying backend when the time granted for rendering the page is over.
+    Being requests.Timeout, it is reported by the rest-client as NotAvailableJsonBean.
+    """
+    pass
+
+
+class Deadline:
+
+    def __init__(self, seconds: float):
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+
+_current_deadline = ContextVar('bhs_deadline', default=None)
+
+
+def current_deadline() -> Deadline:
+    """
+    :return: the deadline of the request being processed or None if there's no limit
+    """
+    return _current_deadline.get()
+
+
+def with_deadline(seconds):
+    """
+    Decorator of the view: all the calls to backend made while processing the request must end before the deadline.
+    Note that the threads querying backend on behalf of the view must run in the copy of the view's context.
+    The asynchronous views (coroutine functions) are supported as well.
+    :param seconds: callable returning the number of seconds granted for the view
+    """
+    def decorator(view):
+        if asyncio.iscoroutinefunction(view):
+            @wraps(view)
+            async def _async_view(*args, **kwargs):
+                token = _current_deadline.set(Deadline(seconds()))
+                try:
+                    return await view(*args, **kwargs)
+                finally:
+                    _current_deadline.reset(token)
+            return _async_view
+
+        @wraps(view)
+        def _view(*args, **kwargs):
+            token = _current_deadline.set(Deadline(seconds()))
+            try:
+                return view(*args, **kwargs)
+            finally:
+                _current_deadline.reset(token)
+        return _view
+    return decorator
+
+
+class CircuitOpen(requests.ConnectionError):
+    """
+    Raised instead of querying backend when the circuit is open (the backend is considered unavailable).
+    Being requests.ConnectionError, it is reported by the rest-client as ErrorJsonBean.
+    """
+    pass
+
+
+class CircuitBreaker:
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, name: str, failure_threshold: int, cooldown: float):
+        """
+        Stops calling the failing backend: after failure_threshold consecutive failures the circuit opens
+        and the calls fail immediately. After cooldown seconds one probe call is let through (half-open state);
+        its success closes the circuit, its failure opens it again.
+        :param name: identifies the circuit (endpoint or host)
+        :param failure_threshold: number of consecutive failures opening the circuit
+        :param cooldown: seconds after which the open circuit lets the probe call through
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = None
+        self._changed_at = datetime.now()
+        self._lock = Lock()
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    @property
+    def changed_at(self) -> datetime:
+        """
+        :return: the time the circuit got into its current state (or was created)
+        """
+        return self._changed_at
+
+    @property
+    def failures(self) -> int:
+        return self._failures
+
+    def _set_state(self, state: str):
+        if state != self._state:
+            _log.warning(f'Circuit {self.name}: {self._state} -> {state}')
+            self._state = state
+            self._changed_at = datetime.now()
+
+    def before_call(self):
+        """
+        :raise CircuitOpen: if the call is not allowed
+        """
+        with self._lock:
+            if self._state == self.CLOSED:
+                return
+            if time.monotonic() - self._opened_at >= self.cooldown:
+                # this very call is the probe; if its outcome is never reported, another probe goes after cooldown
+                self._opened_at = time.monotonic()
+                self._set_state(self.HALF_OPEN)
+                return
+            raise CircuitOpen(f'Circuit {self.name} is {self._state}')
+
+    def on_success(self):
+        with self._lock:
+            self._failures = 0
+            self._set_state(self.CLOSED)
+
+    def on_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                self._set_state(self.OPEN)
+
+
+class CircuitBreakers:
+
+    def __init__(self, failure_threshold: int, cooldown: float):
+        """
+        Registry of the circuit breakers, created on demand.
+        """
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._breakers = {}
+        self._lock = Lock()
+
+    def get(self, name: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(name)
+            if breaker is None:
+                breaker = self._breakers[name] = CircuitBreaker(name, self.failure_threshold, self.cooldown)
+            return breaker
+
+    def states(self) -> dict:
+        """
+        :return: the state of each known circuit, by name
+        """
+        with self._lock:
+            return {name: breaker.state for name, breaker in self._breakers.items()}
+
+
+def report_timeout(host_circuit: CircuitBreaker, endpoint_circuit: CircuitBreaker, connecting: bool,
+                   cut_by_deadline: bool):
+    """
+    Reports the call, which has timed out, to the circuits. The timeout shortened to the time left for the request
+    says nothing about the backend (the page is late), so it is not counted at all. Otherwise only the timeout
+    of connecting is the failure of the host, the slow response is the failure of the endpoint only.
+    :param connecting: True if the connection was not established on time
+    :param cut_by_deadline: True if the timeout was shorter than configured, due to the deadline of the request
+    """
+    if cut_by_deadline:
+        return
+    if connecting:
+        host_circuit.on_failure()
+    endpoint_circuit.on_failure()
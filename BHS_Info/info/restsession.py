@@ -0,0 +1,69 @@
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import MaxRetryError, ReadTimeoutError, ResponseError
+from urllib3.util.retry import Retry
+from threading import local
+
+from .restresilience import current_deadline
+
+
+class DeadlineRetry(Retry):
+    """
+    The retries (and the backoff between them) of the call made on behalf of the request with the deadline:
+    the call is not repeated if the deadline would pass before the repetition, so the time left is not wasted
+    on waiting and the failure is reported at once
+    """
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        retry = super().increment(method=method, url=url, response=response, error=error, _pool=_pool,
+                                  _stacktrace=_stacktrace)
+        deadline = current_deadline()
+        if deadline is not None and retry.get_backoff_time() >= deadline.remaining():
+            raise MaxRetryError(_pool, url, error or ResponseError('no time left to retry')) from error
+        return retry
+
+
+class RestSession:
+
+    RETRY_ON_STATUS = (502, 503, 504)
+
+    def __init__(self, pool_size: int, retries: int, retry_backoff: float):
+        """
+        Persistent HTTP client of the backend: the connections are pooled and kept alive between the requests.
+        The pool (adapter) is shared by all the threads, but each thread gets its own requests.Session,
+        as the session itself (cookies, settings) is not guaranteed to be thread-safe.
+        :param pool_size: max number of kept-alive connections to the backend host
+        :param retries: how many times a failed GET (connection error or 502/503/504) is repeated,
+                        unless the deadline of the current request (if any) would pass in the meantime
+        :param retry_backoff: backoff factor (seconds) between the retries
+        """
+        self._adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=pool_size,
+            max_retries=DeadlineRetry(total=retries, connect=retries, read=0, backoff_factor=retry_backoff,
+                              status_forcelist=self.RETRY_ON_STATUS, raise_on_status=False))
+        self._local = local()
+
+    def _session(self) -> requests.Session:
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            session.mount('http://', self._adapter)
+            session.mount('https://', self._adapter)
+            self._local.session = session
+        return session
+
+    def get(self, _url: str, params=None, **kwargs) -> requests.Response:
+        """
+        :raise requests.ReadTimeout: if the response did not come on time; with the retries configured, requests
+                                     reports it as ConnectionError (retries exceeded), so it is raised as it should be
+        """
+        try:
+            return self._session().get(_url, params=params, **kwargs)
+        except requests.ConnectionError as err:
+            if isinstance(getattr(err.args[0] if err.args else None, 'reason', None), ReadTimeoutError):
+                raise requests.ReadTimeout(*err.args, request=err.request, response=err.response) from err
+            raise
+
+    def close(self):
+        self._adapter.close()
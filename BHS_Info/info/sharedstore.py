@@ -0,0 +1,183 @@
+from pathlib import Path
+from threading import Event, Lock, Thread
+import fcntl
+import json
+import logging
+import os
+import tempfile
+import time
+
+from .poller import SnapshotEntry
+
+_log = logging.getLogger('bhs-info')
+
+
+class SharedSnapshotStore:
+
+    LOCK_SUFFIX = '.lock'
+    VALUES_SUFFIX = '.values'
+    CHECK_INTERVAL = 0.5
+
+    def __init__(self, path: str):
+        """
+        The snapshot of the polled information, shared by all the processes of the web application (mod_wsgi).
+        Only one process (the writer, elected by holding the exclusive lock of the file) polls the backend
+        and writes the snapshot; the others only read it.
+        The snapshot (the index of the entries, the values are kept in the files of the directory <path>.values)
+        is written to the temporary file, which then replaces the previous one (atomically),
+        so the readers never see a half-written snapshot. Each snapshot has the version incremented by the writer;
+        the readers load the file only if it has changed and keep the loaded snapshot in memory.
+        :param path: the file with the snapshot; the directory is created if needed
+        """
+        self.path = Path(path)
+        self._values_dir = self.path.with_name(self.path.name + self.VALUES_SUFFIX)
+        self._lock_file = None
+        self._version = 0
+        self._written_digests = set()
+        self._loaded = {}
+        self._values = {}
+        self._loaded_version = None
+        self._loaded_file_id = None
+        self._checked_at = 0.0
+        self._read_lock = Lock()
+        self._elected = Event()
+
+    def is_writer(self) -> bool:
+        return self._elected.is_set()
+
+    def try_become_writer(self) -> bool:
+        if self.is_writer():
+            return True
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            lock_file = open(self.path.with_name(self.path.name + self.LOCK_SUFFIX), 'a')
+        except OSError as err:
+            _log.warning(f'Shared snapshot {self.path} is not available: {str(err)}')
+            return False
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        # the lock is held as long as the process lives (the file is not closed)
+        self._lock_file = lock_file
+        self._elected.set()
+        _log.info(f'Process {os.getpid()} writes the shared snapshot {self.path}')
+        return True
+
+    def run_election(self, on_elected, interval: float):
+        """
+        Tries to become the writer now and then (every interval seconds) in background,
+        so that another process takes over when the writer dies.
+        :param on_elected: called once, when this process becomes the writer
+        """
+        def _elect():
+            while not self.try_become_writer():
+                time.sleep(interval)
+            on_elected()
+        Thread(target=_elect, name='bhs-snapshot-election', daemon=True).start()
+
+    @staticmethod
+    def _write_file(path: Path, content: str):
+        """
+        Writes the file atomically: the temporary file replaces the target one; removed if anything fails
+        """
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=path.name)
+        try:
+            with os.fdopen(fd, 'w') as tmp_file:
+                tmp_file.write(content)
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def write(self, snapshot):
+        """
+        Replaces the shared snapshot; the values must be strings.
+        Each value is kept in its own file, named by the digest of the value and written only if there's no such file;
+        so the values not changed since the previous round (e.g. the graphs) are not written again, only the index
+        of the entries is. The files not referenced by this or the previous index are removed.
+        :param snapshot: SnapshotEntry by name
+        """
+        self._version += 1
+        entries = {}
+        try:
+            self._values_dir.mkdir(parents=True, exist_ok=True)
+            for name, entry in snapshot.items():
+                digest = entry.digest
+                if not self._values_dir.joinpath(digest).exists():
+                    self._write_file(self._values_dir.joinpath(digest), entry.value)
+                entries[name] = [digest, entry.fetched_at, entry.valid_until]
+            self._write_file(self.path, json.dumps({
+                'version': self._version,
+                'writer': os.getpid(),
+                'entries': entries
+            }))
+            referenced = {digest for digest, _fetched_at, _valid_until in entries.values()}
+            for value_file in self._values_dir.iterdir():
+                if value_file.name not in referenced and value_file.name not in self._written_digests:
+                    value_file.unlink()
+            self._written_digests = referenced
+        except OSError as err:
+            _log.warning(f'Writing shared snapshot {self.path} failed: {str(err)}')
+
+    def _reload(self):
+        now = time.monotonic()
+        if now - self._checked_at < self.CHECK_INTERVAL:
+            return
+        with self._read_lock:
+            self._checked_at = now
+            try:
+                stat = os.stat(self.path)
+            except OSError:
+                return
+            file_id = (stat.st_ino, stat.st_mtime_ns)
+            if file_id == self._loaded_file_id:
+                return
+            try:
+                with open(self.path) as snapshot_file:
+                    content = json.load(snapshot_file)
+            except (OSError, ValueError) as err:
+                _log.warning(f'Reading shared snapshot {self.path} failed: {str(err)}')
+                return
+            self._loaded = {name: tuple(entry) for name, entry in content['entries'].items()}
+            # the values already read are kept, as long as they are referenced
+            self._values = {digest: self._values[digest] for digest, _fetched_at, _valid_until
+                            in self._loaded.values() if digest in self._values}
+            self._loaded_version = content['version']
+            self._loaded_file_id = file_id
+
+    def _value(self, digest: str):
+        value = self._values.get(digest)
+        if value is None:
+            try:
+                value = self._values_dir.joinpath(digest).read_text()
+            except OSError:
+                # e.g. replaced by the writer meanwhile, the next index refers to the new one
+                return None
+            self._values[digest] = value
+        return value
+
+    @property
+    def version(self):
+        self._reload()
+        return self._loaded_version
+
+    def get_entry(self, name: str) -> SnapshotEntry:
+        """
+        :return: the entry of the shared snapshot or None if it is not there or it is outdated
+        """
+        self._reload()
+        loaded = self._loaded.get(name)
+        if loaded is None:
+            return None
+        digest, fetched_at, valid_until = loaded
+        entry = SnapshotEntry(None, fetched_at, valid_until, digest=digest)
+        if not entry.is_valid():
+            return None
+        entry.value = self._value(digest)
+        return entry if entry.value is not None else None
@@ -0,0 +1,37 @@
+// updates the main page in place with the values pushed by the server (see views.index_live)
+(function () {
+    var RELOAD_INTERVAL_MS = 30000;
+    var body = document.body;
+
+    if (!window.EventSource) {
+        // the old way: reload the whole page
+        setTimeout(function () { window.location.reload(); }, RELOAD_INTERVAL_MS);
+        return;
+    }
+
+    function update(values) {
+        Object.keys(values).forEach(function (key) {
+            var value = values[key];
+            document.querySelectorAll('[data-live-text="' + key + '"]').forEach(function (element) {
+                element.textContent = value;
+            });
+            document.querySelectorAll('[data-live-html="' + key + '"]').forEach(function (element) {
+                element.innerHTML = value;
+            });
+            document.querySelectorAll('[data-live-icon="' + key + '"]').forEach(function (element) {
+                element.src = body.dataset.static + value;
+            });
+            // the links to the information about the current day follow the change of the date
+            document.querySelectorAll('[data-live-date="' + key + '"]').forEach(function (element) {
+                var url = new URL(element.href);
+                url.searchParams.set('date', value);
+                element.href = url.toString();
+            });
+        });
+    }
+
+    var source = new EventSource(body.dataset.live);
+    source.onmessage = function (event) {
+        update(JSON.parse(event.data));
+    };
+})();
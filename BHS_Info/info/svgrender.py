@@ -0,0 +1,115 @@
+from functools import lru_cache
+import re
+
+# the colormaps (as defined by matplotlib, after ColorBrewer) used by the pages, as equally spaced anchor colors
+_COLORMAPS = {
+    'RdYlGn': ('#a50026', '#d73027', '#f46d43', '#fdae61', '#fee08b', '#ffffbf',
+               '#d9ef8b', '#a6d96a', '#66bd63', '#1a9850', '#006837'),
+    'Greens': ('#f7fcf5', '#e5f5e0', '#c7e9c0', '#a1d99b', '#74c476', '#41ab5d', '#238b45', '#006d2c', '#00441b'),
+}
+
+DEFAULT_SIZE = (4, 0.32)
+DEFAULT_COLOR = '#1f77b4'
+TRACK_COLOR = '#e9ecef'
+BORDER_COLOR = '#6c757d'
+POINTS_PER_INCH = 72
+
+
+def _anchors(colormap: str):
+    if colormap.endswith('_r'):
+        anchors = _COLORMAPS.get(colormap[:-2])
+        return tuple(reversed(anchors)) if anchors else None
+    return _COLORMAPS.get(colormap)
+
+
+def is_supported_colormap(colormap: str) -> bool:
+    return colormap is None or _anchors(colormap) is not None
+
+
+def colormap_color(colormap: str, value: float) -> str:
+    """
+    Linear interpolation of the colormap
+    :param colormap: name of the colormap, with optional suffix _r for reversed one
+    :param value: the point of the colormap, 0..1
+    :return: the color as #rrggbb
+    """
+    anchors = _anchors(colormap)
+    value = min(1.0, max(0.0, value))
+    position = value * (len(anchors) - 1)
+    index = min(int(position), len(anchors) - 2)
+    fraction = position - index
+    lower, upper = anchors[index], anchors[index + 1]
+    rgb = [round(int(lower[i:i + 2], 16) * (1 - fraction) + int(upper[i:i + 2], 16) * fraction) for i in (1, 3, 5)]
+    return '#' + ''.join(f'{c:02x}' for c in rgb)
+
+
+@lru_cache(maxsize=1024)
+def render_progress_bar(percentage: float, size: tuple = None, show_border: bool = False,
+                        color: str = None, colormap: str = None) -> str:
+    """
+    Renders horizontal progress bar as SVG, the local equivalent of the graph/progress endpoint of the backend.
+    The bar is filled up to the percentage, with the color taken from the colormap at that percentage
+    (or the provided color).
+    :param percentage: the fill of the bar, 0..100
+    :param size: (width, height) in inches
+    :param show_border: if the border is drawn around the bar
+    :param color: the color of the bar, used if no colormap is given
+    :param colormap: name of the colormap, e.g. RdYlGn_r or Greens
+    :return: the SVG document, ready to be embedded into the page
+    """
+    width, height = size if size else DEFAULT_SIZE
+    width, height = width * POINTS_PER_INCH, height * POINTS_PER_INCH
+    fill = min(100.0, max(0.0, percentage)) / 100
+    bar_color = colormap_color(colormap, fill) if colormap else color if color else DEFAULT_COLOR
+    border = f'<rect x="0.5" y="0.5" width="{width - 1:.2f}" height="{height - 1:.2f}" fill="none" ' \
+             f'stroke="{BORDER_COLOR}" stroke-width="1"/>' if show_border else ''
+    return f'<svg width="{width:.2f}pt" height="{height:.2f}pt" viewBox="0 0 {width:.2f} {height:.2f}" ' \
+           f'xmlns="http://www.w3.org/2000/svg" version="1.1">' \
+           f'<rect x="0" y="0" width="{width:.2f}" height="{height:.2f}" fill="{TRACK_COLOR}"/>' \
+           f'<rect x="0" y="0" width="{width * fill:.2f}" height="{height:.2f}" fill="{bar_color}"/>' \
+           f'{border}</svg>'
+
+
+_SVG_COMMENT = re.compile(r'<!--.*?-->', re.DOTALL)
+_SVG_METADATA = re.compile(r'<metadata\b.*?</metadata>|<metadata\b[^>]*/>', re.DOTALL)
+_SVG_STYLE = re.compile(r'<style\b[^>]*>(.*?)</style>', re.DOTALL)
+# only the coordinates and the sizes are rounded; e.g. the scale of the transforms or the ids must stay as they are
+_SVG_GEOMETRY_ATTRIBUTE = re.compile(
+    r'(\s(?:d|points|x|y|x1|y1|x2|y2|cx|cy|r|rx|ry|width|height|viewBox|stroke-width)=)"([^"]*)"')
+_SVG_LONG_DECIMAL = re.compile(r'-?\d+\.\d{3,}')
+_SVG_EMPTY_DEFS = re.compile(r'<defs>\s*</defs>')
+_SVG_WHITESPACE_BETWEEN_TAGS = re.compile(r'>\s+<')
+
+
+def _round_decimal(number: str, precision: int) -> str:
+    rounded = f'{float(number):.{precision}f}'.rstrip('0').rstrip('.')
+    return '0' if rounded == '-0' else rounded
+
+
+def minify_svg(svg: str, precision: int = 2) -> str:
+    """
+    Shrinks the SVG (as generated by matplotlib) without changing its look:
+    strips the comments and the metadata, rounds the numbers of the geometry attributes (coordinates, sizes),
+    drops the repeated style blocks and the whitespace between the tags.
+    :param svg: the SVG document, without XML prolog
+    :param precision: number of decimal places kept; 2 is 1/100 of the point, far below the resolution of the screen
+    :return: the minified SVG
+    """
+    svg = _SVG_COMMENT.sub('', svg)
+    svg = _SVG_METADATA.sub('', svg)
+
+    styles = set()
+
+    def _dedupe_style(match):
+        style = ' '.join(match.group(1).split())
+        if style in styles:
+            return ''
+        styles.add(style)
+        return match.group(0).replace(match.group(1), style)
+
+    svg = _SVG_EMPTY_DEFS.sub('', _SVG_STYLE.sub(_dedupe_style, svg))
+    svg = _SVG_GEOMETRY_ATTRIBUTE.sub(
+        lambda match: match.group(1) + '"' + _SVG_LONG_DECIMAL.sub(
+            lambda number: _round_decimal(number.group(0), precision), match.group(2)) + '"',
+        svg)
+    return _SVG_WHITESPACE_BETWEEN_TAGS.sub('><', svg).strip()
@@ -1,3 +1,1210 @@
-from django.test import TestCase
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from tempfile import TemporaryDirectory
+from threading import Barrier, Event
+from unittest import mock, skipUnless
+import asyncio
+import gzip
+import json
+import os
+import socket
+import time
 
-# Create your tests here.
+import requests
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse, StreamingHttpResponse
+from django.template import loader
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.urls import resolve
+
+from .bundle import PART_BODY, PART_CONTENT_TYPE, PART_STATUS, BundleShim, split_bundle
+from .fragments import FragmentCache, template_variables
+from .live import LiveFeed, live_event
+from .metrics import CONTENT_TYPE, Counter, Gauge, Histogram, MetricsRegistry
+from .middleware import ENCODING_GZIP, CompressionMiddleware
+from .poller import SnapshotEntry, SnapshotPoller
+from .restcache import BeanCache, HistoryCache, Prefetcher, ResponseCache, SingleFlight, SVGCache
+from .restconfig import CachePolicy, RestConfig, RestEndPoint
+from .restinfo import ProgressBar, RestBackend, bundled_outcomes, circuit_breakers, is_closed_day, \
+    prefetch_temperature_history
+from .restresilience import CircuitBreaker, CircuitOpen, DeadlineExceeded, current_deadline, report_timeout, \
+    with_deadline
+from .restsession import RestSession
+from .sharedstore import SharedSnapshotStore
+from .svgrender import colormap_color, is_supported_colormap, minify_svg, render_progress_bar
+from .timing import TimingMiddleware, timed
+from . import restasync, restinfo, views
+
+
+def _wait_until(condition, timeout: float = 2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def _test_endpoints(prefix: str, *names: str) -> list:
+    return [RestEndPoint(_host='backend', _port='1', _path=f'/{_name}', _name=f'test-{prefix}-{_name}')
+            for _name in names]
+
+
+class _UncachedBackend(RestBackend):
+    # the responses are not shared with the other tests through the process-wide cache
+    _cache_responses = False
+
+
+class FanOutTest(SimpleTestCase):
+
+    def test_endpoints_are_queried_concurrently(self):
+        endpoints = _test_endpoints('fan-out', 'a', 'b', 'c')
+        # each call waits until all of them are in flight, so the calls made one by one would break the barrier
+        barrier = Barrier(len(endpoints), timeout=2)
+        calls = []
+
+        def _fetch(endpoint, params=None):
+            barrier.wait()
+            calls.append(endpoint.name)
+            return endpoint.name
+
+        with mock.patch.object(RestBackend, '_fetch', side_effect=_fetch):
+            backend = _UncachedBackend()
+            backend._prefetch(*[(endpoint, None) for endpoint in endpoints])
+            self.assertEqual([backend._get(endpoint) for endpoint in endpoints], [e.name for e in endpoints])
+        self.assertEqual(sorted(calls), [e.name for e in endpoints])
+
+    def test_failure_is_reported_by_the_reader(self):
+        ok, failing = _test_endpoints('fan-out-failure', 'ok', 'failing')
+
+        def _fetch(endpoint, params=None):
+            if endpoint is failing:
+                raise requests.ConnectionError('down')
+            return endpoint.name
+
+        with mock.patch.object(RestBackend, '_fetch', side_effect=_fetch) as fetch:
+            backend = _UncachedBackend()
+            backend._prefetch((ok, None), (failing, None))
+            self.assertEqual(backend._get(ok), ok.name)
+            self.assertRaises(requests.ConnectionError, backend._get, failing)
+        self.assertEqual(fetch.call_count, 2)
+
+
+class RestSessionTest(SimpleTestCase):
+
+    def _server(self) -> str:
+        """
+        :return: URL of the server accepting the connections (by the backlog of the socket), but never responding
+        """
+        server = socket.socket()
+        self.addCleanup(server.close)
+        server.bind(('127.0.0.1', 0))
+        server.listen(4)
+        return f'http://127.0.0.1:{server.getsockname()[1]}/'
+
+    @staticmethod
+    def _refusing() -> str:
+        """
+        :return: URL no one listens at
+        """
+        with socket.socket() as closed:
+            closed.bind(('127.0.0.1', 0))
+            return f'http://127.0.0.1:{closed.getsockname()[1]}/'
+
+    def test_read_timeout_is_raised_as_such(self):
+        session = RestSession(pool_size=1, retries=2, retry_backoff=0)
+        self.addCleanup(session.close)
+        with self.assertRaises(requests.ReadTimeout):
+            session.get(self._server(), timeout=(1, 0.1))
+
+    def test_connection_error_is_not_converted(self):
+        session = RestSession(pool_size=1, retries=0, retry_backoff=0)
+        self.addCleanup(session.close)
+        with self.assertRaises(requests.ConnectionError) as raised:
+            session.get(self._refusing(), timeout=(1, 1))
+        self.assertNotIsInstance(raised.exception, requests.Timeout)
+
+    def test_no_retries_beyond_deadline(self):
+        # without the deadline, the backoff between the retries would take 2 + 4 seconds
+        session = RestSession(pool_size=1, retries=3, retry_backoff=1)
+        self.addCleanup(session.close)
+        _url = self._refusing()
+        started_at = time.monotonic()
+        self.assertRaises(requests.ConnectionError, with_deadline(lambda: 0.5)(session.get), _url, timeout=(1, 1))
+        self.assertLess(time.monotonic() - started_at, 1)
+
+
+class DeadlineTest(SimpleTestCase):
+
+    def test_deadline_of_the_view(self):
+        remaining = with_deadline(lambda: 5)(lambda: current_deadline().remaining())()
+        self.assertTrue(4 < remaining <= 5)
+        self.assertIsNone(current_deadline())
+
+    def test_deadline_of_the_asynchronous_view(self):
+        async def _view():
+            await asyncio.sleep(0)
+            return current_deadline().remaining()
+
+        remaining = asyncio.run(with_deadline(lambda: 5)(_view)())
+        self.assertTrue(4 < remaining <= 5)
+        self.assertIsNone(current_deadline())
+
+    def test_backend_is_not_queried_after_deadline(self):
+        endpoint, = _test_endpoints('deadline', 'expired')
+        with mock.patch('info.restinfo.rest_session') as session:
+            self.assertRaises(DeadlineExceeded, with_deadline(lambda: 0)(RestBackend._fetch), endpoint)
+        session.get.assert_not_called()
+
+    def test_timeouts_are_cut_by_deadline(self):
+        endpoint, = _test_endpoints('deadline', 'cut')
+        with mock.patch('info.restinfo.rest_session') as session:
+            with_deadline(lambda: 0.5)(RestBackend._fetch)(endpoint)
+        connect_timeout, read_timeout = session.get.call_args.kwargs['timeout']
+        self.assertLessEqual(connect_timeout, 0.5)
+        self.assertLessEqual(read_timeout, 0.5)
+
+    def test_fan_out_ends_with_deadline(self):
+        slow, = _test_endpoints('deadline', 'slow')
+        release = Event()
+        self.addCleanup(release.set)
+
+        def _fetch(endpoint, params=None):
+            # the deadline of the view is seen by the threads of the fan-out
+            self.assertIsNotNone(current_deadline())
+            release.wait(2)
+            return endpoint.name
+
+        backend = _UncachedBackend()
+        started_at = time.monotonic()
+        with mock.patch.object(RestBackend, '_fetch', side_effect=_fetch):
+            with_deadline(lambda: 0.2)(backend._prefetch)((slow, None))
+            self.assertLess(time.monotonic() - started_at, 1)
+            self.assertRaises(DeadlineExceeded, with_deadline(lambda: 0.1)(backend._get), slow)
+
+
+class ProgressBarTest(SimpleTestCase):
+
+    def test_fill(self):
+        svg = render_progress_bar(25, size=(4, 0.5), color='#123456')
+        self.assertIn('viewBox="0 0 288.00 36.00"', svg)
+        self.assertIn('width="72.00" height="36.00" fill="#123456"', svg)
+        self.assertNotIn('stroke=', svg)
+
+    def test_fill_is_limited(self):
+        self.assertIn('width="0.00" height', render_progress_bar(-10))
+        self.assertIn('width="288.00" height', render_progress_bar(120))
+
+    def test_border(self):
+        self.assertIn('stroke=', render_progress_bar(50, show_border=True))
+
+    def test_colormap(self):
+        self.assertEqual(colormap_color('RdYlGn', 0), '#a50026')
+        self.assertEqual(colormap_color('RdYlGn', 1), '#006837')
+        self.assertEqual(colormap_color('RdYlGn', 0.5), '#ffffbf')
+        self.assertEqual(colormap_color('RdYlGn_r', 0), '#006837')
+        self.assertIn('fill="#006837"', render_progress_bar(100, colormap='RdYlGn'))
+
+    def test_unsupported_colormap_is_rendered_remotely(self):
+        self.assertTrue(is_supported_colormap(None))
+        self.assertTrue(is_supported_colormap('Greens_r'))
+        self.assertFalse(is_supported_colormap('viridis'))
+        with mock.patch.object(ProgressBar, '_svg', return_value='remote') as remote:
+            self.assertEqual(ProgressBar().get_progress_bar(50, colormap='viridis'), 'remote')
+            self.assertIn('<svg', ProgressBar().get_progress_bar(50, colormap='Greens'))
+        remote.assert_called_once()
+
+
+class ResponseCacheTest(SimpleTestCase):
+
+    def _cache(self, ttl: float, max_stale: float = 60, max_size: int = 4) -> ResponseCache:
+        return ResponseCache(lambda _name: CachePolicy(_ttl=ttl, _max_stale=max_stale, _max_size=max_size))
+
+    def test_fresh_value_is_fetched_once(self):
+        cache = self._cache(ttl=60)
+        fetched = []
+        for _i in range(3):
+            self.assertEqual(cache.get('endpoint', 'key', lambda: fetched.append(1) or 'value'), 'value')
+        self.assertEqual(len(fetched), 1)
+
+    def test_no_caching_if_ttl_is_zero(self):
+        cache = self._cache(ttl=0)
+        fetched = []
+        cache.get('endpoint', 'key', lambda: fetched.append(1))
+        cache.get('endpoint', 'key', lambda: fetched.append(1))
+        self.assertEqual(len(fetched), 2)
+        self.assertFalse(cache.contains('endpoint', 'key'))
+
+    def test_least_recently_used_is_evicted(self):
+        cache = self._cache(ttl=60, max_size=2)
+        cache.put('endpoint', 'a', 1)
+        cache.put('endpoint', 'b', 2)
+        cache.get('endpoint', 'a', lambda: self.fail('a is cached'))
+        cache.put('endpoint', 'c', 3)
+        self.assertTrue(cache.contains('endpoint', 'a'))
+        self.assertFalse(cache.contains('endpoint', 'b'))
+        self.assertTrue(cache.contains('endpoint', 'c'))
+
+    def test_stale_value_is_served_while_refreshed(self):
+        cache = self._cache(ttl=0.05)
+        cache.get('endpoint', 'key', lambda: 'old')
+        time.sleep(0.1)
+        self.assertEqual(cache.get('endpoint', 'key', lambda: 'new'), 'old')
+        _wait_until(lambda: cache.get('endpoint', 'key', lambda: 'newer') == 'new')
+        self.assertEqual(cache.get('endpoint', 'key', lambda: 'newer'), 'new')
+
+    def test_too_stale_value_is_fetched(self):
+        cache = self._cache(ttl=0.01, max_stale=0.01)
+        cache.get('endpoint', 'key', lambda: 'old')
+        time.sleep(0.05)
+        self.assertEqual(cache.get('endpoint', 'key', lambda: 'new'), 'new')
+
+    def test_exception_is_not_cached(self):
+        cache = self._cache(ttl=60)
+
+        def _failing():
+            raise requests.ConnectionError('down')
+        self.assertRaises(requests.ConnectionError, cache.get, 'endpoint', 'key', _failing)
+        self.assertEqual(cache.get('endpoint', 'key', lambda: 'value'), 'value')
+
+
+class BeanCacheTest(SimpleTestCase):
+
+    def test_same_content_is_decoded_once(self):
+        cache = BeanCache(max_entries=2)
+        decoded = []
+
+        def _decode(content):
+            decoded.append(content)
+            return json.loads(content)
+        first = cache.get('{"a": 1}', _decode)
+        self.assertIs(cache.get('{"a": 1}', _decode), first)
+        self.assertEqual(decoded, ['{"a": 1}'])
+
+    def test_least_recently_used_is_evicted(self):
+        cache = BeanCache(max_entries=1)
+        decoded = []
+        cache.get('1', lambda _c: decoded.append(_c) or _c)
+        cache.get('2', lambda _c: decoded.append(_c) or _c)
+        cache.get('1', lambda _c: decoded.append(_c) or _c)
+        self.assertEqual(decoded, ['1', '2', '1'])
+
+    def test_disabled(self):
+        cache = BeanCache(max_entries=0)
+        decoded = []
+        cache.get('1', lambda _c: decoded.append(_c) or _c)
+        cache.get('1', lambda _c: decoded.append(_c) or _c)
+        self.assertEqual(len(decoded), 2)
+
+
+class SVGCacheTest(SimpleTestCase):
+
+    def test_graph_is_rendered_again_for_new_version(self):
+        cache = SVGCache(max_bytes=1024)
+        self.assertEqual(cache.get('graph', 1, 60, lambda: '<svg>1</svg>'), '<svg>1</svg>')
+        self.assertEqual(cache.get('graph', 1, 60, lambda: self.fail('up-to-date')), '<svg>1</svg>')
+        self.assertEqual(cache.get('graph', 2, 60, lambda: '<svg>2</svg>'), '<svg>2</svg>')
+
+    def test_outdated_graph_is_kept_if_not_rendered(self):
+        cache = SVGCache(max_bytes=1024)
+        cache.get('graph', 1, 60, lambda: '<svg>1</svg>')
+        self.assertEqual(cache.get('graph', 2, 60, lambda: None), '<svg>1</svg>')
+        self.assertEqual(cache.get('graph', 2, 60, lambda: '<svg>2</svg>'), '<svg>2</svg>')
+
+    def test_graph_not_rendered_is_not_cached(self):
+        cache = SVGCache(max_bytes=1024)
+        self.assertIsNone(cache.get('graph', 1, 60, lambda: None))
+        self.assertFalse(cache.contains('graph', 60))
+
+    def test_size_is_limited(self):
+        cache = SVGCache(max_bytes=20)
+        cache.get('a', 1, 60, lambda: 'a' * 10)
+        cache.get('b', 1, 60, lambda: 'b' * 10)
+        cache.get('c', 1, 60, lambda: 'c' * 10)
+        self.assertFalse(cache.contains('a', 60))
+        self.assertTrue(cache.contains('b', 60))
+        self.assertTrue(cache.contains('c', 60))
+        # too big to be cached at all, but served
+        self.assertEqual(cache.get('d', 1, 60, lambda: 'd' * 30), 'd' * 30)
+        self.assertFalse(cache.contains('d', 60))
+
+
+@override_settings(TEMPLATES=[{
+    'BACKEND': 'django.template.backends.django.DjangoTemplates',
+    'OPTIONS': {'loaders': [('django.template.loaders.locmem.Loader', {
+        'value.html': '{{ value|default:fallback }}',
+        'tags.html': '{% if shown %}{% for item in items %}{{ item }}{% endfor %}{% endif %}',
+    })]},
+}])
+class FragmentCacheTest(SimpleTestCase):
+
+    def setUp(self):
+        self.cache = FragmentCache(max_entries=2)
+        patcher = mock.patch('info.fragments.cache_events')
+        self.addCleanup(patcher.stop)
+        self.cache_events = patcher.start()
+
+    def _events(self) -> tuple:
+        events = [_call.args[1] for _call in self.cache_events.inc.call_args_list]
+        return tuple(events.count(_event) for _event in ('hit', 'miss', 'eviction'))
+
+    def test_variables(self):
+        self.assertEqual(template_variables(loader.get_template('value.html')), ('fallback', 'value'))
+        # the arguments of the tags as well (and the loop variable, harmless)
+        self.assertEqual(template_variables(loader.get_template('tags.html')), ('item', 'items', 'shown'))
+
+    def test_cached_by_values(self):
+        self.assertEqual(self.cache.render('value.html', {'value': 'a', 'fallback': 'b', 'unrelated': 1}), 'a')
+        self.assertEqual(self.cache.render('value.html', {'value': 'a', 'fallback': 'b', 'unrelated': 2}), 'a')
+        self.assertEqual(self.cache.render('value.html', {'value': '', 'fallback': 'b'}), 'b')
+        self.assertEqual(self._events(), (1, 2, 0))
+
+    def test_tag_arguments_are_keyed(self):
+        self.assertEqual(self.cache.render('tags.html', {'shown': True, 'items': ('a', 'b')}), 'ab')
+        self.assertEqual(self.cache.render('tags.html', {'shown': False, 'items': ('a', 'b')}), '')
+        self.assertEqual(self.cache.render('tags.html', {'shown': True, 'items': ('c',)}), 'c')
+
+    def test_unhashable_not_cached(self):
+        self.assertEqual(self.cache.render('tags.html', {'shown': True, 'items': ['a']}), 'a')
+        self.assertEqual(self.cache.render('tags.html', {'shown': True, 'items': ['b']}), 'b')
+        self.assertEqual(self._events(), (0, 0, 0))
+
+    def test_eviction(self):
+        for value in ('a', 'b', 'c', 'a'):
+            self.cache.render('value.html', {'value': value, 'fallback': ''})
+        self.assertEqual(self._events(), (0, 4, 2))
+
+
+class HistoryCacheTest(SimpleTestCase):
+
+    def setUp(self):
+        directory = TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def test_content_is_kept(self):
+        the_date = date(2021, 3, 1)
+        HistoryCache(self.directory).put('External', the_date, 'statistics', '{"min": 1}')
+        # kept on disk, so visible to other instances (processes) as well
+        cache = HistoryCache(self.directory)
+        self.assertEqual(cache.get('External', the_date, 'statistics'), '{"min": 1}')
+        self.assertIsNone(cache.get('External', the_date, 'graph'))
+        self.assertIsNone(cache.get('Office', the_date, 'statistics'))
+        self.assertIsNone(cache.get('External', date(2021, 3, 2), 'statistics'))
+
+    def test_content_is_replaced(self):
+        cache = HistoryCache(self.directory)
+        cache.put('External', date(2021, 3, 1), 'graph', '<svg/>')
+        cache.put('External', date(2021, 3, 1), 'graph', '<svg></svg>')
+        self.assertEqual(cache.get('External', date(2021, 3, 1), 'graph'), '<svg></svg>')
+
+    def test_disabled_if_not_opened(self):
+        not_directory = os.path.join(self.directory, 'file')
+        with open(not_directory, 'w'):
+            pass
+        cache = HistoryCache(not_directory)
+        cache.put('External', date(2021, 3, 1), 'graph', '<svg/>')
+        self.assertIsNone(cache.get('External', date(2021, 3, 1), 'graph'))
+
+    def test_only_closed_days(self):
+        self.assertTrue(is_closed_day(datetime.now() - timedelta(days=1)))
+        self.assertFalse(is_closed_day(datetime.now()))
+        self.assertFalse(is_closed_day(None))
+
+
+class PrefetcherTest(SimpleTestCase):
+
+    def setUp(self):
+        self.release = Event()
+        self.addCleanup(self.release.set)
+        self.prefetcher = Prefetcher(workers=1, max_pending=2)
+        self.done = []
+        # keeps the only worker busy, so the tasks scheduled next are pending
+        self.prefetcher.schedule('busy', lambda: self.release.wait(2))
+
+    def _task(self, key: str):
+        return lambda: self.done.append(key)
+
+    def test_same_task_is_scheduled_once(self):
+        self.assertTrue(self.prefetcher.schedule('a', self._task('a')))
+        self.assertFalse(self.prefetcher.schedule('a', self._task('a')))
+        self.release.set()
+        _wait_until(lambda: self.done)
+        self.assertEqual(self.done, ['a'])
+
+    def test_oldest_pending_tasks_are_cancelled(self):
+        for key in 'abc':
+            self.prefetcher.schedule(key, self._task(key))
+        self.release.set()
+        _wait_until(lambda: len(self.done) == 2)
+        time.sleep(0.05)
+        self.assertEqual(self.done, ['b', 'c'])
+
+    def test_task_is_scheduled_again_after_failure(self):
+        def _failing():
+            raise requests.ConnectionError('down')
+
+        self.release.set()
+        self.prefetcher.schedule('a', _failing)
+        _wait_until(lambda: self.prefetcher.schedule('a', self._task('a')))
+        _wait_until(lambda: self.done)
+        self.assertEqual(self.done, ['a'])
+
+    def test_future_days_are_not_prefetched(self):
+        today = datetime.now()
+        with mock.patch('info.restinfo.prefetcher') as prefetcher:
+            prefetch_temperature_history('External', today - timedelta(days=1), today, today + timedelta(days=1))
+        self.assertEqual([_call.args[0] for _call in prefetcher.schedule.call_args_list],
+                         [f'temperature-history:External:{(today - timedelta(days=1)).date()}',
+                          f'temperature-history:External:{today.date()}'])
+
+
+class SingleFlightTest(SimpleTestCase):
+
+    def test_concurrent_calls_are_coalesced(self):
+        single_flight = SingleFlight()
+        started, release = Event(), Event()
+        calls = []
+
+        def _call():
+            calls.append(1)
+            started.set()
+            release.wait(2)
+            return 'result'
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            owner = executor.submit(single_flight.do, 'key', _call)
+            started.wait(2)
+            waiter = executor.submit(single_flight.do, 'key', _call)
+            time.sleep(0.05)
+            release.set()
+            self.assertEqual(owner.result(2), 'result')
+            self.assertEqual(waiter.result(2), 'result')
+        self.assertEqual(len(calls), 1)
+
+    def test_exception_is_raised_for_all_callers(self):
+        single_flight = SingleFlight()
+        started, release = Event(), Event()
+
+        def _call():
+            started.set()
+            release.wait(2)
+            raise requests.ConnectionError('down')
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            owner = executor.submit(single_flight.do, 'key', _call)
+            started.wait(2)
+            waiter = executor.submit(single_flight.do, 'key', _call)
+            time.sleep(0.05)
+            release.set()
+            self.assertRaises(requests.ConnectionError, owner.result, 2)
+            self.assertRaises(requests.ConnectionError, waiter.result, 2)
+
+    def test_calls_after_the_end_are_made_again(self):
+        single_flight = SingleFlight()
+        calls = []
+        single_flight.do('key', lambda: calls.append(1))
+        single_flight.do('key', lambda: calls.append(1))
+        self.assertEqual(len(calls), 2)
+
+
+class SnapshotPollerTest(SimpleTestCase):
+
+    def setUp(self):
+        executor = ThreadPoolExecutor(max_workers=2)
+        self.addCleanup(executor.shutdown, wait=False)
+        self.published = []
+        self.poller = SnapshotPoller(items=dict, executor=executor, publish=self.published.append)
+        self.addCleanup(self.poller.stop)
+
+    def test_available_values_are_published(self):
+        def _failing():
+            raise requests.ConnectionError('down')
+
+        polled = self.poller.poll_once({'a': (10, lambda: 'A'), 'b': (10, lambda: None), 'c': (10, _failing)})
+        self.assertEqual(polled, {'a': 'A'})
+        self.assertEqual(self.poller.get('a'), 'A')
+        self.assertIsNone(self.poller.get('b'))
+        self.assertEqual(len(self.published), 1)
+        self.assertEqual(sorted(self.published[0]), ['a'])
+
+    def test_outdated_entry_is_not_served(self):
+        now = time.time()
+        self.assertTrue(SnapshotEntry('A', now, now + 1).is_valid())
+        self.assertFalse(SnapshotEntry('A', now - 2, now - 1).is_valid())
+
+    def test_hanging_poll_does_not_block(self):
+        release = Event()
+        self.addCleanup(release.set)
+        calls = []
+
+        def _hanging():
+            calls.append(1)
+            release.wait(2)
+            return 'late'
+
+        self.poller.ROUND_TIMEOUT = 0.1
+        self.assertEqual(self.poller.poll_once({'a': (10, _hanging), 'b': (10, lambda: 'B')}), {'b': 'B'})
+        # polled again only once the hanging poll ends
+        self.poller.poll_once({'a': (10, _hanging)})
+        self.assertEqual(len(calls), 1)
+        release.set()
+        _wait_until(lambda: self.poller.poll_once({'a': (10, lambda: 'A')}))
+        self.assertEqual(self.poller.get('a'), 'A')
+
+    def test_polling_goes_on_after_failure(self):
+        rounds = []
+
+        def _items():
+            rounds.append(1)
+            if len(rounds) == 1:
+                raise ValueError('invalid configuration')
+            return {'a': (10, lambda: 'A')}
+
+        self.poller._items = _items
+        self.poller.MAX_WAIT = 0.05
+        self.poller.start()
+        _wait_until(lambda: self.poller.get('a'))
+        self.assertEqual(self.poller.get('a'), 'A')
+        self.assertTrue(self.poller.is_running())
+
+
+class SharedSnapshotStoreTest(SimpleTestCase):
+
+    def setUp(self):
+        directory = TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'snapshot.json')
+
+    def _store(self) -> SharedSnapshotStore:
+        store = SharedSnapshotStore(self.path)
+        store.CHECK_INTERVAL = 0
+        self.addCleanup(lambda: store._lock_file is not None and store._lock_file.close())
+        return store
+
+    @staticmethod
+    def _snapshot(**values) -> dict:
+        now = time.time()
+        return {name: SnapshotEntry(value, now, now + 60) for name, value in values.items()}
+
+    def _value_files(self) -> int:
+        return len(os.listdir(self.path + SharedSnapshotStore.VALUES_SUFFIX))
+
+    def test_snapshot_is_shared(self):
+        writer, reader = self._store(), self._store()
+        self.assertIsNone(reader.get_entry('a'))
+        writer.write(self._snapshot(a='A', b='B'))
+        self.assertEqual(reader.get_entry('a').value, 'A')
+        self.assertEqual(reader.version, 1)
+        writer.write(self._snapshot(a='A2'))
+        self.assertEqual(reader.get_entry('a').value, 'A2')
+        self.assertIsNone(reader.get_entry('b'))
+        self.assertEqual(reader.version, 2)
+
+    def test_outdated_entry_is_not_served(self):
+        writer, reader = self._store(), self._store()
+        writer.write({'a': SnapshotEntry('A', time.time() - 2, time.time() - 1)})
+        self.assertIsNone(reader.get_entry('a'))
+
+    def test_unreferenced_values_are_removed(self):
+        writer = self._store()
+        writer.write(self._snapshot(a='A', b='B'))
+        writer.write(self._snapshot(a='A', b='B'))
+        self.assertEqual(self._value_files(), 2)
+        writer.write(self._snapshot(a='A', b='B2'))
+        # the values of the previous snapshot may be still read by the processes reading the previous index
+        self.assertEqual(self._value_files(), 3)
+        writer.write(self._snapshot(a='A', b='B2'))
+        self.assertEqual(self._value_files(), 2)
+
+    def test_only_one_writer(self):
+        first, second = self._store(), self._store()
+        self.assertTrue(first.try_become_writer())
+        self.assertFalse(second.try_become_writer())
+        self.assertTrue(first.is_writer())
+        self.assertFalse(second.is_writer())
+
+
+class CircuitBreakerTest(SimpleTestCase):
+
+    def test_opens_after_consecutive_failures(self):
+        circuit = CircuitBreaker('test', failure_threshold=2, cooldown=60)
+        circuit.on_failure()
+        circuit.before_call()
+        self.assertEqual(circuit.state, CircuitBreaker.CLOSED)
+        circuit.on_failure()
+        self.assertEqual(circuit.state, CircuitBreaker.OPEN)
+        self.assertRaises(CircuitOpen, circuit.before_call)
+
+    def test_success_resets_failures(self):
+        circuit = CircuitBreaker('test', failure_threshold=2, cooldown=60)
+        circuit.on_failure()
+        circuit.on_success()
+        circuit.on_failure()
+        self.assertEqual(circuit.state, CircuitBreaker.CLOSED)
+
+    def test_probe_after_cooldown(self):
+        circuit = CircuitBreaker('test', failure_threshold=1, cooldown=0.05)
+        circuit.on_failure()
+        time.sleep(0.1)
+        circuit.before_call()
+        self.assertEqual(circuit.state, CircuitBreaker.HALF_OPEN)
+        # one probe only
+        self.assertRaises(CircuitOpen, circuit.before_call)
+        circuit.on_failure()
+        self.assertEqual(circuit.state, CircuitBreaker.OPEN)
+        time.sleep(0.1)
+        circuit.before_call()
+        circuit.on_success()
+        self.assertEqual(circuit.state, CircuitBreaker.CLOSED)
+        circuit.before_call()
+
+    def test_timeouts(self):
+        host = CircuitBreaker('host', failure_threshold=1, cooldown=60)
+        endpoint = CircuitBreaker('endpoint', failure_threshold=1, cooldown=60)
+        report_timeout(host, endpoint, connecting=True, cut_by_deadline=True)
+        self.assertEqual((host.failures, endpoint.failures), (0, 0))
+        report_timeout(host, endpoint, connecting=False, cut_by_deadline=False)
+        self.assertEqual((host.failures, endpoint.failures), (0, 1))
+        report_timeout(host, endpoint, connecting=True, cut_by_deadline=False)
+        self.assertEqual((host.failures, endpoint.failures), (1, 2))
+
+
+class BundleTest(SimpleTestCase):
+
+    @staticmethod
+    def _endpoints(*names: str) -> list:
+        return _test_endpoints('bundle', *names)
+
+    @staticmethod
+    def _bundle(**statuses) -> str:
+        return json.dumps({f'/{_name}': {PART_STATUS: _status, PART_CONTENT_TYPE: 'application/json',
+                                         PART_BODY: json.dumps({'name': _name})}
+                           for _name, _status in statuses.items()})
+
+    def test_split(self):
+        responses = split_bundle(self._bundle(a=200, b=503), self._endpoints('a', 'b', 'c'))
+        self.assertEqual(sorted(responses), ['test-bundle-a', 'test-bundle-b'])
+        self.assertEqual(responses['test-bundle-a'].status_code, 200)
+        self.assertEqual(json.loads(responses['test-bundle-a'].text), {'name': 'a'})
+        self.assertEqual(responses['test-bundle-a'].url, 'http://backend:1/a')
+        self.assertEqual(responses['test-bundle-b'].status_code, 503)
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, split_bundle, '[]', self._endpoints('a'))
+        self.assertRaises(ValueError, split_bundle, 'not a bundle', self._endpoints('a'))
+
+    def test_malformed_parts(self):
+        for part in ([], 'part', {PART_BODY: '{}'}, {PART_STATUS: 200}, {PART_STATUS: 'ok', PART_BODY: '{}'},
+                     {PART_STATUS: None, PART_BODY: '{}'}, {PART_STATUS: True, PART_BODY: '{}'},
+                     {PART_STATUS: 200, PART_BODY: {'name': 'a'}}):
+            with self.subTest(part=part):
+                self.assertRaises(ValueError, split_bundle, json.dumps({'/a': part}), self._endpoints('a'))
+        responses = split_bundle(json.dumps({'/a': {PART_STATUS: '200', PART_BODY: '{}'}}), self._endpoints('a'))
+        self.assertEqual(responses['test-bundle-a'].status_code, 200)
+
+    def test_shim_passes_allowed_paths_only(self):
+        # nothing listens there, the allowed paths fail to connect
+        shim = BundleShim('http://127.0.0.1:1', '/bundle', ['/a'], workers=2, timeout=1)
+        statuses = []
+
+        def _call(path: str, query_string: str = '') -> bytes:
+            return b''.join(shim({'PATH_INFO': path, 'QUERY_STRING': query_string},
+                                 lambda status, headers: statuses.append(status)))
+        _call('/a')
+        _call('/admin')
+        self.assertEqual([_status.split()[0] for _status in statuses], ['502', '404'])
+        parts = json.loads(_call('/bundle', 'paths=/a,/admin'))
+        self.assertEqual({_path: _part[PART_STATUS] for _path, _part in parts.items()}, {'/a': 502, '/admin': 404})
+
+    def test_outcomes(self):
+        outcomes = bundled_outcomes(self._bundle(ok=200, missing=404, failed=500),
+                                    self._endpoints('ok', 'missing', 'failed'))
+        self.assertEqual(outcomes['test-bundle-ok'].status_code, 200)
+        self.assertIsInstance(outcomes['test-bundle-missing'], requests.HTTPError)
+        self.assertIsInstance(outcomes['test-bundle-failed'], requests.HTTPError)
+        self.assertEqual(circuit_breakers.get('test-bundle-ok').failures, 0)
+        self.assertEqual(circuit_breakers.get('test-bundle-missing').failures, 0)
+        self.assertEqual(circuit_breakers.get('test-bundle-failed').failures, 1)
+
+
+class RestConfigReloadTest(SimpleTestCase):
+
+    def setUp(self):
+        directory = TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'web-info.ini')
+        self.modified_at = time.time()
+        self._write('current-temperature-ttl = 5')
+
+        class _Config(RestConfig):
+            CONFIG_FILE = CONFIG_FILE_DEV = self.path
+            RELOAD_CHECK_INTERVAL = 0
+        self.config_class = _Config
+        self.configuration = _Config()
+
+    def _write(self, cache_option: str):
+        with open(self.path, 'w') as config_file:
+            config_file.write(f'[REST]\nhost = backend\nport = 1\ncurrent-temperature = /current/temperature\n'
+                              f'[CACHE]\n{cache_option}\n')
+        # the modification is noticed by the time of modification, which may be too coarse
+        self.modified_at += 10
+        os.utime(self.path, (self.modified_at, self.modified_at))
+
+    def _ttl(self) -> float:
+        return self.configuration.registry().policies[RestConfig.OPTION_CURRENT_TEMP].cache.ttl
+
+    def test_modification_is_applied(self):
+        self.assertEqual(self._ttl(), 5)
+        self._write('current-temperature-ttl = 7\ndefault-max-size = 3')
+        self.assertEqual(self._ttl(), 7)
+        self.assertEqual(self.configuration.get(RestConfig.SECTION_CACHE, 'default-max-size'), '3')
+
+    def test_invalid_configuration_is_not_applied(self):
+        self.assertEqual(self._ttl(), 5)
+        with self.assertLogs('bhs-info', 'WARNING'):
+            self._write('current-temperature-ttl = abc')
+            self.assertEqual(self._ttl(), 5)
+        # reported once, not each time
+        self.assertEqual(self._ttl(), 5)
+        self.assertEqual(self.configuration.get(RestConfig.SECTION_CACHE, 'current-temperature-ttl'), '5')
+
+    def test_removed_options_are_removed(self):
+        self._write('default-ttl = 9')
+        self.assertEqual(self._ttl(), 9)
+        self.assertFalse(self.configuration.has_option(RestConfig.SECTION_CACHE, 'current-temperature-ttl'))
+
+    def test_invalid_configuration_at_startup_is_degraded(self):
+        self._write('current-temperature-ttl = abc\ndefault-ttl = 9')
+        with self.assertLogs('bhs-info', 'WARNING'):
+            self.configuration = self.config_class()
+        # the invalid endpoint gets the default policy, the others are not affected
+        self.assertEqual(self._ttl(), 9)
+        self.assertEqual(self.configuration.get_policy('not-configured').cache.ttl, 9)
+        self.assertEqual(self.configuration.get_current_temperature_endpoint().path, '/current/temperature')
+
+    def test_default_policy_is_cached(self):
+        self.assertIs(self.configuration.get_policy('not-configured'), self.configuration.get_policy('other'))
+
+    def test_set_is_applied(self):
+        self.configuration.set(RestConfig.SECTION_CACHE, 'current-temperature-ttl', '11')
+        self.assertEqual(self._ttl(), 11)
+        self.assertTrue(self.configuration.remove_option(RestConfig.SECTION_CACHE, 'current-temperature-ttl'))
+        self.assertEqual(self._ttl(), RestConfig.DEFAULT_CACHE_TTL)
+        with self.assertRaises(ValueError):
+            self.configuration.set(RestConfig.SECTION_CACHE, 'current-temperature-ttl', 'abc')
+        self.assertEqual(self._ttl(), RestConfig.DEFAULT_CACHE_TTL)
+
+
+class ConditionalResponseTest(SimpleTestCase):
+
+    def setUp(self):
+        self.built = 0
+        self.rendered = 0
+
+    def _response(self, context: dict, calls=(), **headers) -> HttpResponse:
+        def _build():
+            self.built += 1
+            return context
+
+        def _render(_context: dict):
+            self.rendered += 1
+            return HttpResponse('page')
+        return views._conditional_response(RequestFactory().get('/', **headers), _build, _render, calls)
+
+    def test_not_modified(self):
+        response = self._response({'temperature': '21.0', 'date': '2021-01-01 10:00'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('no-cache', response['Cache-Control'])
+        etag = response['ETag']
+        # the current time is not the information presented
+        response = self._response({'temperature': '21.0', 'date': '2021-01-01 10:01'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(self.rendered, 1)
+
+    def test_modified(self):
+        etag = self._response({'temperature': '21.0'})['ETag']
+        response = self._response({'temperature': '?'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(self.rendered, 2)
+
+    def test_polled_page_is_not_built(self):
+        calls = _test_endpoints('conditional', 'a', 'b')
+        snapshot = {'test-conditional-a': SnapshotEntry('{"a": 1}', 0, 0),
+                    'test-conditional-b': SnapshotEntry('{"b": 1}', 0, 0)}
+        with mock.patch('info.restinfo.snapshot_entry', side_effect=snapshot.get):
+            etag = self._response({'temperature': '21.0'}, [(_c, None) for _c in calls])['ETag']
+            response = self._response({}, [(_c, None) for _c in calls], HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual((self.built, self.rendered), (1, 1))
+
+            snapshot['test-conditional-b'] = SnapshotEntry('{"b": 2}', 0, 0)
+            response = self._response({}, [(_c, None) for _c in calls], HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual((self.built, self.rendered), (2, 2))
+
+            # not all polled, the context is compared
+            del snapshot['test-conditional-b']
+            etag = self._response({'temperature': '21.0'}, [(_c, None) for _c in calls])['ETag']
+            response = self._response({'temperature': '21.0'}, [(_c, None) for _c in calls], HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual((self.built, self.rendered), (4, 3))
+
+
+class ApiTest(SimpleTestCase):
+
+    CONTEXT = {'temp_external': '21.5', 'wind_dir': 'Północ', 'date': '2021-01-01 10:00'}
+
+    def test_context_as_json(self):
+        with mock.patch.object(views, '_index_context', return_value=dict(self.CONTEXT)) as context:
+            response = views.api_index(RequestFactory().get('/api/main'))
+        context.assert_called_once_with(with_graphs=False)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(json.loads(response.content), self.CONTEXT)
+        # compact, not escaped
+        self.assertIn('"wind_dir":"Północ"', response.content.decode())
+
+    def test_not_modified(self):
+        with mock.patch.object(views, '_cesspit_context', return_value=dict(self.CONTEXT)):
+            etag = views.api_cesspit(RequestFactory().get('/api/cesspit'))['ETag']
+            response = views.api_cesspit(RequestFactory().get('/api/cesspit', HTTP_IF_NONE_MATCH=etag))
+        self.assertEqual(response.status_code, 304)
+
+    def test_sensor_is_required(self):
+        with mock.patch.object(views, '_any_temperature_context') as context:
+            response = views.api_any_temperature(RequestFactory().get('/api/temp/any'))
+        self.assertEqual(response.status_code, 400)
+        context.assert_not_called()
+
+
+class MinifySVGTest(SimpleTestCase):
+
+    def test_geometry_is_rounded(self):
+        self.assertEqual(minify_svg('<svg width="460.8pt" height="345.6pt" viewBox="0 0 460.8 345.6">'
+                                    '<path d="M 57.6 307.584 L 414.72 41.472001"/></svg>'),
+                         '<svg width="460.8pt" height="345.6pt" viewBox="0 0 460.8 345.6">'
+                         '<path d="M 57.6 307.58 L 414.72 41.47"/></svg>')
+        self.assertEqual(minify_svg('<rect x="-0.0001" y="10.125" stroke-width="0.8000001"/>'),
+                         '<rect x="0" y="10.12" stroke-width="0.8"/>')
+
+    def test_other_attributes_are_kept(self):
+        svg = '<g id="patch_1.2345" transform="translate(55.245312 0) scale(0.015625 -0.015625)">' \
+              '<use xlink:href="#DejaVuSans-31.5432" x="63.623047"/></g>'
+        self.assertEqual(minify_svg(svg),
+                         '<g id="patch_1.2345" transform="translate(55.245312 0) scale(0.015625 -0.015625)">'
+                         '<use xlink:href="#DejaVuSans-31.5432" x="63.62"/></g>')
+
+    def test_stripped(self):
+        svg = '<svg>\n  <!-- created by matplotlib -->\n  <metadata><rdf:RDF/></metadata>\n  <defs>\n  </defs>\n' \
+              '  <style type="text/css">*{stroke-linejoin:  round}</style>\n' \
+              '  <style type="text/css">*{stroke-linejoin: round}</style>\n</svg>\n'
+        self.assertEqual(minify_svg(svg), '<svg><style type="text/css">*{stroke-linejoin: round}</style></svg>')
+
+
+class CompressionMiddlewareTest(SimpleTestCase):
+
+    CONTENT = 'temperatura zewnętrzna ' * 20
+
+    def _response(self, response, accept_encoding: str = ENCODING_GZIP):
+        middleware = CompressionMiddleware(lambda _request: response)
+        return middleware(RequestFactory().get('/', HTTP_ACCEPT_ENCODING=accept_encoding))
+
+    def test_compressed(self):
+        response = self._response(HttpResponse(self.CONTENT))
+        self.assertEqual(response['Content-Encoding'], ENCODING_GZIP)
+        self.assertEqual(gzip.decompress(response.content).decode(), self.CONTENT)
+        self.assertEqual(response['Content-Length'], str(len(response.content)))
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+    def test_not_accepted(self):
+        self.assertFalse(self._response(HttpResponse(self.CONTENT), 'identity').has_header('Content-Encoding'))
+        self.assertFalse(self._response(HttpResponse(self.CONTENT), 'gzip;q=0').has_header('Content-Encoding'))
+
+    def test_not_compressed(self):
+        for response in (HttpResponse('short'),
+                         HttpResponse(self.CONTENT, content_type='image/png'),
+                         HttpResponse(self.CONTENT, content_type='text/event-stream'),
+                         HttpResponse(self.CONTENT, status=404),
+                         StreamingHttpResponse(iter([self.CONTENT]))):
+            self.assertFalse(self._response(response).has_header('Content-Encoding'), response)
+
+    def test_same_content_is_compressed_once(self):
+        with mock.patch('info.middleware._compress', side_effect=lambda content, _encoding: content[:10]) as compress:
+            middleware = CompressionMiddleware(lambda _request: HttpResponse(self.CONTENT))
+            for _i in range(3):
+                middleware(RequestFactory().get('/', HTTP_ACCEPT_ENCODING=ENCODING_GZIP))
+        self.assertEqual(compress.call_count, 1)
+
+
+class TimingMiddlewareTest(SimpleTestCase):
+
+    @staticmethod
+    def _view(_request):
+        for _i in range(2):
+            with timed('rest.current-temperature'):
+                time.sleep(0.01)
+        with timed('render'):
+            pass
+        return HttpResponse('page')
+
+    def test_server_timing(self):
+        response = TimingMiddleware(self._view)(RequestFactory().get('/'))
+        phases = dict(_metric.split(';', 1) for _metric in response['Server-Timing'].split(', '))
+        self.assertEqual(sorted(phases), ['render', 'rest.current-temperature', 'total'])
+        self.assertTrue(phases['rest.current-temperature'].endswith(';desc="x2"'))
+        self.assertGreaterEqual(float(phases['rest.current-temperature'][4:].split(';')[0]), 20)
+
+    def test_only_slow_requests_are_logged_as_info(self):
+        with self.assertLogs('bhs-info', 'DEBUG') as logs:
+            TimingMiddleware(self._view)(RequestFactory().get('/fast'))
+        self.assertEqual([_record.levelname for _record in logs.records], ['DEBUG'])
+        with mock.patch.object(TimingMiddleware, 'SLOW_REQUEST', 0.01), self.assertLogs('bhs-info', 'INFO') as logs:
+            TimingMiddleware(self._view)(RequestFactory().get('/slow'))
+        self.assertEqual(json.loads(logs.records[0].getMessage()[len('timing '):])['path'], '/slow')
+
+
+class MetricsTest(SimpleTestCase):
+
+    def test_counter(self):
+        counter = Counter('test_events_total', 'Events', ('cache', 'event'))
+        counter.inc('svg', 'hit')
+        counter.inc('svg', 'hit', amount=2)
+        counter.inc('bean', 'miss')
+        self.assertEqual(counter.exposition(),
+                         '# HELP test_events_total Events\n# TYPE test_events_total counter\n'
+                         'test_events_total{cache="bean",event="miss"} 1\n'
+                         'test_events_total{cache="svg",event="hit"} 3')
+
+    def test_gauge(self):
+        gauge = Gauge('test_in_flight', 'In flight')
+        gauge.inc()
+        gauge.inc()
+        gauge.dec()
+        self.assertTrue(gauge.exposition('pid="1"').endswith('\ntest_in_flight{pid="1"} 1'))
+
+    def test_histogram(self):
+        histogram = Histogram('test_seconds', 'Time', ('view',), buckets=(0.1, 1))
+        histogram.observe(0.05, 'index')
+        histogram.observe(0.1, 'index')
+        histogram.observe(5, 'index')
+        self.assertEqual(histogram.exposition().split('\n')[2:],
+                         ['test_seconds_bucket{view="index",le="0.1"} 2',
+                          'test_seconds_bucket{view="index",le="1"} 2',
+                          'test_seconds_bucket{view="index",le="+Inf"} 3',
+                          'test_seconds_sum{view="index"} 5.15',
+                          'test_seconds_count{view="index"} 3'])
+
+    def test_labels_are_escaped(self):
+        counter = Counter('test_errors_total', 'Errors', ('reason',))
+        counter.inc('invalid "bean"\n')
+        self.assertIn('test_errors_total{reason="invalid \\"bean\\"\\n"} 1', counter.exposition())
+
+    def test_samples_are_labeled_with_pid(self):
+        registry = MetricsRegistry()
+        registry.register(Counter('test_events_total', 'Events', ('cache',))).inc('svg')
+        self.assertIn(f'test_events_total{{cache="svg",pid="{os.getpid()}"}} 1\n', registry.exposition())
+
+    def test_view(self):
+        response = views.metrics(RequestFactory().get('/metrics'))
+        self.assertEqual(response['Content-Type'], CONTENT_TYPE)
+        self.assertIn('# TYPE bhs_backend_request_seconds histogram', response.content.decode())
+
+
+class LiveFeedTest(SimpleTestCase):
+
+    def test_values_are_built_once_per_interval(self):
+        built = []
+        feed = LiveFeed(build=lambda: built.append(1) or {'temperature': '21.0'}, interval=60)
+        for _i in range(3):
+            feed.changes()
+        self.assertEqual(len(built), 1)
+
+    def test_only_changes_are_sent(self):
+        values = {'temperature': '21.0', 'pressure': '1013'}
+        feed = LiveFeed(build=lambda: dict(values), interval=0)
+        version, changes = feed.changes()
+        self.assertEqual(changes, values)
+        self.assertEqual(feed.changes(version), (version, {}))
+        values['temperature'] = '21.5'
+        new_version, changes = feed.changes(version)
+        self.assertNotEqual(new_version, version)
+        self.assertEqual(changes, {'temperature': '21.5'})
+        self.assertEqual(feed.changes('unknown')[1], values)
+
+    def test_previous_version_is_served_while_built(self):
+        started, release = Event(), Event()
+        self.addCleanup(release.set)
+        values = {'temperature': '21.0'}
+
+        def _build():
+            if values['temperature'] != '21.0':
+                started.set()
+                release.wait(2)
+            return dict(values)
+
+        feed = LiveFeed(build=_build, interval=0)
+        version, _values = feed.current()
+        values['temperature'] = '21.5'
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            building = executor.submit(feed.current)
+            started.wait(2)
+            self.assertEqual(feed.current(), (version, {'temperature': '21.0'}))
+            release.set()
+            self.assertEqual(building.result(2)[1], {'temperature': '21.5'})
+        self.assertNotEqual(feed.current()[0], version)
+
+    def test_first_version_is_awaited(self):
+        release = Event()
+
+        def _build():
+            release.wait(2)
+            return {'temperature': '21.0'}
+
+        feed = LiveFeed(build=_build, interval=60)
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            currents = [executor.submit(feed.current) for _i in range(2)]
+            time.sleep(0.05)
+            release.set()
+            self.assertEqual(currents[0].result(2), currents[1].result(2))
+
+    def test_event(self):
+        self.assertEqual(live_event('v1', {}, retry=10), 'retry: 10000\nid: v1\n\n')
+        self.assertEqual(live_event('v2', {'a': 1}, retry=0.5), 'retry: 500\nid: v2\ndata: {"a": 1}\n\n')
+
+
+class LiveAsyncTest(SimpleTestCase):
+
+    BUILD_TIME = 0.3
+
+    def setUp(self):
+        self.builds = 0
+
+        def _build():
+            # blocking, as querying the backend is
+            time.sleep(self.BUILD_TIME)
+            self.builds += 1
+            return {'temperature': '21.0', 'build': self.builds // self.builds_per_change}
+        self.builds_per_change = 100
+        patches = (mock.patch.object(views, 'index_feed', LiveFeed(build=_build, interval=0.1)),
+                   mock.patch.object(views.rest_configuration, 'get_live_max_duration', return_value=1.0))
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    async def _live(self, since: str = None) -> dict:
+        headers = {'HTTP_LAST_EVENT_ID': since} if since else {}
+        response = await views.index_live_async(RequestFactory().get('/live', **headers))
+        return dict(_line.split(': ', 1) for _line in response.content.decode().splitlines() if _line)
+
+    async def _ticking(self, coroutine) -> tuple:
+        """
+        :return: the outcome of the coroutine and the longest time the event loop was not responsive meanwhile
+        """
+        task = asyncio.ensure_future(coroutine)
+        longest = 0.0
+        while not task.done():
+            before = time.monotonic()
+            await asyncio.sleep(0.01)
+            longest = max(longest, time.monotonic() - before)
+        return task.result(), longest
+
+    async def test_event_loop_is_responsive_while_holding(self):
+        first, longest = await self._ticking(self._live())
+        self.assertIn('data', first)
+        held_since = time.monotonic()
+        event, longest_held = await self._ticking(self._live(first['id']))
+        # held until max-duration, as nothing changed; the values were built meanwhile (in threads)
+        self.assertGreaterEqual(time.monotonic() - held_since, 1.0)
+        self.assertNotIn('data', event)
+        self.assertEqual(event['id'], first['id'])
+        self.assertGreater(self.builds, 2)
+        self.assertLess(max(longest, longest_held), self.BUILD_TIME / 2)
+
+    async def test_changes_end_holding(self):
+        self.builds_per_change = 2
+        first = await self._live()
+        event = await self._live(first['id'])
+        self.assertIn('data', event)
+        self.assertNotEqual(event['id'], first['id'])
+        self.assertEqual(json.loads(event['data']), {'build': 1})
+
+
+@skipUnless(restasync.is_available(), 'httpx is not installed')
+class RestAsyncTest(SimpleTestCase):
+
+    def setUp(self):
+        self.requests = []
+        self.reply = lambda _request: restasync.httpx.Response(200, json={'temperature': 21.0})
+
+        def _handler(request):
+            self.requests.append(request)
+            return self.reply(request)
+
+        client = restasync.httpx.AsyncClient(transport=restasync.httpx.MockTransport(_handler))
+        patch = mock.patch.object(restasync, '_client', return_value=client)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def _raising(self, exception):
+        def _reply(request):
+            raise exception('failed', request=request)
+        self.reply = _reply
+
+    def test_fetch(self):
+        endpoint, = _test_endpoints('async', 'ok')
+        response = asyncio.run(restasync._fetch(endpoint, {'sensor': 'External', 'date': None}))
+        self.assertEqual(response.json(), {'temperature': 21.0})
+        self.assertEqual(str(self.requests[0].url), 'http://backend:1/ok?sensor=External')
+
+    def test_failures_are_raised_as_by_requests(self):
+        endpoint, = _test_endpoints('async', 'failing')
+        self.reply = lambda _request: restasync.httpx.Response(404)
+        self.assertRaises(requests.HTTPError, asyncio.run, restasync._fetch(endpoint))
+        self.assertEqual(circuit_breakers.get(endpoint.name).failures, 0)
+        self.reply = lambda _request: restasync.httpx.Response(503)
+        self.assertRaises(requests.HTTPError, asyncio.run, restasync._fetch(endpoint))
+        self.assertEqual(circuit_breakers.get(endpoint.name).failures, 1)
+        self._raising(restasync.httpx.ReadTimeout)
+        self.assertRaises(requests.Timeout, asyncio.run, restasync._fetch(endpoint))
+        self._raising(restasync.httpx.ConnectError)
+        with self.assertRaises(requests.ConnectionError) as raised:
+            asyncio.run(restasync._fetch(endpoint))
+        self.assertNotIsInstance(raised.exception, requests.Timeout)
+
+    def test_no_call_after_deadline(self):
+        endpoint, = _test_endpoints('async', 'expired')
+        self.assertRaises(DeadlineExceeded, asyncio.run, with_deadline(lambda: 0)(restasync._fetch)(endpoint))
+        self.assertEqual(self.requests, [])
+
+    def test_prefetched_outcomes_are_taken_by_clients(self):
+        ok, failing = _test_endpoints('async-prefetched', 'ok', 'failing')
+        self.reply = lambda request: restasync.httpx.Response(200 if request.url.path == '/ok' else 500)
+
+        async def _page():
+            async with restasync.prefetched([(ok, None), (failing, None), (ok, None)]):
+                return await sync_to_async(lambda: (
+                    _UncachedBackend()._get(ok).status_code,
+                    self.assertRaises(requests.HTTPError, _UncachedBackend()._get, failing)))()
+
+        with mock.patch.object(RestBackend, '_coalesced_fetch') as fetch:
+            self.assertEqual(asyncio.run(_page())[0], 200)
+        fetch.assert_not_called()
+        self.assertEqual(len(self.requests), 2)
+        self.assertIsNone(restinfo._prefetched_responses.get())
+
+    def test_calls_served_locally_are_not_made(self):
+        endpoint, = _test_endpoints('async-prefetched', 'local')
+
+        async def _prefetched():
+            async with restasync.prefetched([(endpoint, None)]):
+                return restinfo._prefetched_responses.get()
+
+        with mock.patch.object(restasync, '_is_served_locally', return_value=True):
+            self.assertEqual(asyncio.run(_prefetched()), {})
+        self.assertEqual(self.requests, [])
+
+    def test_async_views_are_served_by_asgi(self):
+        self.assertIs(resolve('/', urlconf='info.urls_async').func, views.index_async)
+        self.assertIs(resolve('/live', urlconf='info.urls_async').func, views.index_live_async)
+        self.assertIs(resolve('/api/main', urlconf='info.urls_async').func, views.api_index)
+        self.assertIs(resolve('/', urlconf='info.urls').func, views.index)
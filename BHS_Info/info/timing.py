@@ -0,0 +1,169 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+import asyncio
+import json
+import logging
+import time
+
+from .metrics import requests_in_flight, view_latency
+from .middleware import async_aware
+
+_log = logging.getLogger('bhs-info')
+
+
+class RequestTimings:
+
+    def __init__(self):
+        """
+        The time spent on the phases of processing of one request, e.g. on querying each endpoint.
+        Shared by the threads working on behalf of the request (see RestBackend._prefetch).
+        """
+        self.started_at = time.perf_counter()
+        self._phases = {}
+        self._lock = Lock()
+
+    def add(self, phase: str, seconds: float):
+        with self._lock:
+            total, count = self._phases.get(phase, (0.0, 0))
+            self._phases[phase] = (total + seconds, count + 1)
+
+    def phases(self) -> dict:
+        """
+        :return: (total seconds, number of occurrences) of each phase, by name
+        """
+        with self._lock:
+            return dict(self._phases)
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started_at
+
+
+_current_timings = ContextVar('bhs_timings', default=None)
+
+
+def current_timings() -> RequestTimings:
+    """
+    :return: the timings of the request being processed or None if not measured
+    """
+    return _current_timings.get()
+
+
+@contextmanager
+def timed(phase: str):
+    """
+    Measures the time of the block as the phase of the current request; does nothing if there's no request
+    :param phase: the name of the phase, must be a valid HTTP token (e.g. rest.current-temperature)
+    """
+    timings = _current_timings.get()
+    if timings is None:
+        yield
+        return
+    started_at = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(phase, time.perf_counter() - started_at)
+
+
+def backend_phase(endpoint_name: str) -> str:
+    """
+    :return: the name of the phase of querying given endpoint, the same for the synchronous and asynchronous calls
+    """
+    return f'rest.{endpoint_name}'
+
+
+def server_timing(timings: RequestTimings) -> str:
+    """
+    :return: the value of the Server-Timing header (durations in milliseconds)
+    """
+    metrics = [f'{phase};dur={total * 1000:.1f}' + (f';desc="x{count}"' if count > 1 else '')
+               for phase, (total, count) in sorted(timings.phases().items())]
+    metrics.append(f'total;dur={timings.elapsed() * 1000:.1f}')
+    return ', '.join(metrics)
+
+
+def long_polling(view):
+    """
+    Marks the asynchronous view holding the request until there's something to answer with (see waiting):
+    its time is not the time of processing, so it is not observed in the metrics
+    """
+    view.long_polling = True
+    return view
+
+
+@contextmanager
+def waiting():
+    """
+    The block of the long-polling view waiting for something to answer with; the request is not counted
+    as being processed meanwhile
+    """
+    requests_in_flight.dec()
+    try:
+        yield
+    finally:
+        requests_in_flight.inc()
+
+
+class TimingMiddleware:
+
+    sync_capable = True
+    async_capable = True
+
+    SLOW_REQUEST = 2.0
+
+    def __init__(self, get_response):
+        """
+        Measures the phases of processing of each request (see timed), reports them to the client
+        in the Server-Timing header and logs them as JSON (logger bhs-info): the requests processed longer than
+        SLOW_REQUEST seconds at level INFO, the others at DEBUG.
+        The time of processing (by view) and the number of requests in flight are exposed in the metrics as well;
+        the streamed responses are not taken into account there: they are sent after the view returns
+        (so they are not in flight here) and their time would not be the time of processing; neither are
+        the long-polling views (see long_polling).
+        """
+        self.get_response = get_response
+        async_aware(self)
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        timings = RequestTimings()
+        token = _current_timings.set(timings)
+        requests_in_flight.inc()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_timings.reset(token)
+            requests_in_flight.dec()
+        return self._reported(request, response, timings)
+
+    async def __acall__(self, request):
+        timings = RequestTimings()
+        token = _current_timings.set(timings)
+        requests_in_flight.inc()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_timings.reset(token)
+            requests_in_flight.dec()
+        return self._reported(request, response, timings)
+
+    def _reported(self, request, response, timings: RequestTimings):
+        # the time of the long-polling view is mostly the time of waiting, not of processing
+        long_polling = getattr(getattr(request.resolver_match, 'func', None), 'long_polling', False)
+        if not response.streaming:
+            if not long_polling:
+                view_latency.observe(timings.elapsed(),
+                                     request.resolver_match.url_name if request.resolver_match else 'unresolved')
+            response['Server-Timing'] = server_timing(timings)
+        level = logging.INFO if not long_polling and timings.elapsed() >= self.SLOW_REQUEST else logging.DEBUG
+        if _log.isEnabledFor(level):
+            _log.log(level, 'timing ' + json.dumps({
+                'path': request.path,
+                'status': response.status_code,
+                'total_ms': round(timings.elapsed() * 1000, 1),
+                'phases': {phase: {'ms': round(total * 1000, 1), 'count': count}
+                           for phase, (total, count) in timings.phases().items()}
+            }))
+        return response
@@ -2,11 +2,20 @@ from django.urls import path
 
 from . import views
 
+# served by WSGI; see urls_async.py for the ones served by ASGI
 urlpatterns = [
     path('', views.index, name='index'),
+    path('live', views.index_live, name='index_live'),
     path('temp/ext', views.external_temperature, name='temp_ext'),
     path('temp/int', views.internal_temperature, name='temp_int'),
     path('temp/any', views.any_temperature, name='any_temp'),
     path('cesspit', views.cesspit, name='cesspit'),
     path('sys_status', views.system_status, name='sys_status'),
+    path('api/main', views.api_index, name='api_index'),
+    path('api/temp/ext', views.api_external_temperature, name='api_temp_ext'),
+    path('api/temp/int', views.api_internal_temperature, name='api_temp_int'),
+    path('api/temp/any', views.api_any_temperature, name='api_any_temp'),
+    path('api/cesspit', views.api_cesspit, name='api_cesspit'),
+    path('api/sys_status', views.api_system_status, name='api_sys_status'),
+    path('metrics', views.metrics, name='metrics'),
 ]
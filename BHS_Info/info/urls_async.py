@@ -0,0 +1,18 @@
+from django.urls import path
+
+from . import urls, views
+
+# served by ASGI (see BHS_Info/settings_asgi.py), the pages waiting for many calls to the backend are asynchronous;
+# the others are the same as the ones served by WSGI
+ASYNC_VIEWS = {
+    'index': views.index_async,
+    'index_live': views.index_live_async,
+    'cesspit': views.cesspit_async,
+    'sys_status': views.system_status_async,
+}
+
+urlpatterns = [
+    path(str(pattern.pattern), ASYNC_VIEWS[pattern.name], name=pattern.name) if pattern.name in ASYNC_VIEWS
+    else pattern
+    for pattern in urls.urlpatterns
+]
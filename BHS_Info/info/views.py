@@ -1,23 +1,132 @@
-from django.http import HttpResponse, HttpResponseBadRequest
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse, HttpResponseBadRequest, JsonResponse
 from django.template import loader
+from django.utils.cache import get_conditional_response, patch_cache_control
 
 from datetime import timedelta
 from functools import reduce
 
+import asyncio
+import hashlib
 import logging as log
+import time
 
 from .restinfo import *
+from .live import LiveFeed, live_event
+from .timing import long_polling, timed, waiting
+from . import metrics as bhs_metrics
+from . import restasync
 
 UNKNOWN = '?'
 UNKNOWN_ICON = 'question.svg'
 CELSIUS = '\u2103'
 REQUEST_DATE_FORMAT = '%Y-%m-%d'
+# the context entries, which are not taken into account while checking if the page has changed
+UNVERSIONED_CONTEXT = ('date',)
+# seconds after which the browser asks for the live updates again, once the held request is answered
+LIVE_RECONNECT = 1
+# the tiles of the main page (templates tiles/<name>.html), rendered separately and cached (see _page)
+INDEX_TILES = ('sun', 'temperatures', 'weather', 'atmosphere', 'solar_plant', 'cesspit', 'water_tank',
+               'system_status')
 
 
+@with_deadline(rest_configuration.get_page_deadline)
 def index(request):
-    template = loader.get_template('index.html')
-
+    return _page(request, 'index.html', _index_context, tiles=INDEX_TILES, calls=_index_calls())
+
+
+@with_deadline(rest_configuration.get_page_deadline)
+async def index_async(request):
+    """
+    Same as index, but the endpoints of the main page are queried on the event loop (ASGI), see _async_page
+    """
+    return await _async_page(request, 'index.html', _index_context, _index_calls(), tiles=INDEX_TILES)
+
+
+def _index_calls() -> list:
+    """
+    :return: tuples (endpoint, params) of all the information presented by the main page
+    """
+    return [(_endpoint, None) for _endpoint in MainPageInfo.main_page_endpoints()]
+
+
+async def _async_page(request, template_name: str, build_context, calls, tiles: tuple = ()) -> HttpResponse:
+    """
+    The page of the asynchronous view: the backend is queried for all the given calls at once, without occupying
+    any thread while waiting (see restasync.prefetched); then the context is built (from the responses received)
+    and the page rendered in a thread, as the rest-clients and the templates are synchronous.
+    :param build_context: callable returning the context of the page
+    :param calls: tuples (endpoint, params) of all the information presented by the page
+    :param tiles: see _page
+    """
+    async with restasync.prefetched(calls):
+        return await sync_to_async(lambda: _page(request, template_name, build_context, tiles=tiles, calls=calls),
+                                   thread_sensitive=False)()
+
+
+def _page(request, template_name: str, build_context, tiles: tuple = (), calls=()) -> HttpResponse:
+    """
+    :param build_context: callable returning the context of the page
+    :param tiles: the names of the tiles (templates tiles/<name>.html) of the page; each one is rendered only
+                  if any of the values it presents has changed, otherwise taken from fragment_cache;
+                  the page gets them as the context entry tiles
+    :param calls: see _conditional_response
+    """
+    def _render(context: dict):
+        with timed('render'):
+            page_context = dict(context, tiles={_name: fragment_cache.render(f'tiles/{_name}.html', context)
+                                                for _name in tiles}) if tiles else context
+            return HttpResponse(loader.get_template(template_name).render(page_context, request))
+    return _conditional_response(request, build_context, _render, calls)
+
+
+def _conditional_response(request, build_context, render, calls=()) -> HttpResponse:
+    """
+    Answers with 304 (Not Modified) if the client already has the response presenting the same information.
+    If all the information of the response is polled, the validator (weak ETag) is the digest of the polled values
+    (see restinfo.snapshot_version) and of the current day, known before anything is queried or rendered; otherwise
+    it is the digest of the context (except the current time), built first. Either way it changes with any
+    new reading as well as when the reading becomes unavailable; so the context must not contain any other values
+    derived from the current time. There's no Last-Modified: the time of the newest reading does not change when
+    the reading becomes unavailable. The client is told to revalidate the response each time it uses it.
+    :param build_context: callable returning the information presented by the response (the context)
+    :param render: callable receiving the context and returning the response (200), called only if the client
+                   does not have it
+    :param calls: tuples (endpoint, params) of all the information presented by the response, if it is all polled;
+                  empty if the response presents anything else
+    """
+    context = None
+    version = snapshot_version(calls) if calls else None
+    if version is not None:
+        digest = hashlib.md5(f'{version} {datetime.today().strftime(REQUEST_DATE_FORMAT)}'.encode()).hexdigest()
+    else:
+        context = build_context()
+        digest = hashlib.md5(repr(
+            sorted((_key, _value) for _key, _value in context.items() if _key not in UNVERSIONED_CONTEXT)
+        ).encode()).hexdigest()
+    etag = f'W/"{digest}"'
+
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = render(context if context is not None else build_context())
+    if response.status_code in (200, 304):
+        response['ETag'] = etag
+        patch_cache_control(response, no_cache=True)
+    return response
+
+
+def _index_context(with_graphs: bool = True) -> dict:
+    """
+    :param with_graphs: if False, the progress bars are neither rendered nor included
+    :return: the context of the main page (index.html); the same values are pushed to the page by index_live
+             and returned by api_index
+    """
     information = MainPageInfo()
+    progress_bars = ProgressBar()
+    progress_bar_size = (4, 0.32)
+
+    # fan-out: query all the endpoints concurrently, the getters below are then served from the cache
+    information.prefetch_main_page()
 
     # note: by convention, the rest-client do not raise any deliberated exceptions
     # if any sort of an error occurs, the client returns Error or NotAvailable beans
@@ -36,8 +145,7 @@ def index(request):
     wind = information.get_wind()
     water_tank = information.get_water_tank()
     system_status = information.get_system_status()
-    progress_bars = ProgressBar()
-    progress_bar_size = (4, 0.32)
+    soil_hums = information.get_soil_moisture()
 
     _current_date = datetime.today().strftime('%Y-%m-%d %H:%M')
     _short_date = datetime.today().strftime(REQUEST_DATE_FORMAT)
@@ -61,19 +169,13 @@ def index(request):
     str_pressure = f'{pressure.current_value:.0f}' if pressure.has_succeeded() else UNKNOWN
     tenicon_pressure = _tendency_icons[pressure.tendency if pressure.has_succeeded() else Tendency.STEADY]
 
-    cesspit_progress = progress_bars.get_progress_bar(
-        cesspit.original_reading.fill if cesspit.has_succeeded() else 0, size=progress_bar_size, colormap='RdYlGn_r')
     cesspit_reading_state = '' if not cesspit.has_succeeded() else 'KO' if cesspit.failure_detected else 'OK'
     tm_cesspit = cesspit.original_reading.timestamp.strftime('%H:%M') if cesspit.has_succeeded() else ''
     cesspit_predicted_full_date = cesspit_prediction.predicted_date.strftime('%Y-%m-%d %H:%M') if cesspit_prediction.has_succeeded() else '?'
 
-    aq_pm_10_norm_perc = progress_bars.get_progress_bar(
-        percentage=air_quality.pm_10 if air_quality.has_succeeded() else 0, size=progress_bar_size, colormap='RdYlGn_r')
     aq_pm_10_level = UNKNOWN if not air_quality.has_succeeded() \
         else (str(air_quality.original_reading.pm_10)+' \u03bcg/m\u00b3')
 
-    aq_pm_2_5_norm_perc = progress_bars.get_progress_bar(
-        percentage=air_quality.pm_2_5 if air_quality.has_succeeded() else 0, size=progress_bar_size, colormap='RdYlGn_r')
     aq_pm_2_5_level = UNKNOWN if not air_quality.has_succeeded() \
         else (str(air_quality.original_reading.pm_2_5)+' \u03bcg/m\u00b3')
 
@@ -95,7 +197,6 @@ def index(request):
     else:
         sky_state_icon = 'question.svg'
 
-    soil_hums = information.get_soil_moisture()
     if type(soil_hums) == list:
         tenicons_shum = [_tendency_icons[soil_hum.tendency] for soil_hum in soil_hums]
         strs_shum = [f'{soil_hum.current_value:.1f}' for soil_hum in soil_hums]
@@ -106,9 +207,6 @@ def index(request):
     tm_sol = solar_plant.reading.last_production_at.strftime('%Y-%m-%d %H:%M') if solar_plant.has_succeeded() and solar_plant.reading.last_production_at else UNKNOWN
     sol_prod_now_w = str(solar_plant.reading.current_production_w) if solar_plant.has_succeeded() else UNKNOWN
     sol_prod_now_perc = str(solar_plant.current_production_perc) if solar_plant.has_succeeded() else '0'
-    sol_prod_now_progress_bar = progress_bars.get_progress_bar(
-        percentage=solar_plant.current_production_perc if solar_plant.has_succeeded() else 0,
-        size=progress_bar_size, show_border=False, colormap='Greens')
     sol_prod_today = f'{solar_plant.reading.daily_production_kwh:.1f}' if solar_plant.has_succeeded() else UNKNOWN
     sol_prod_h_min_w = str(solar_plant.reading.hourly_min_w) if solar_plant.has_succeeded() else UNKNOWN
     sol_prod_h_min_perc = str(solar_plant.hourly_min_perc) if solar_plant.has_succeeded() else '0'
@@ -142,9 +240,6 @@ def index(request):
     rain_obs_h = f'{precipitation.observation_duration_h} h' if precipitation.has_succeeded() else UNKNOWN
 
     # water tank
-    water_level = progress_bars.get_progress_bar(
-        percentage=int(water_tank.fill if water_tank.has_succeeded() else 0),
-        size=progress_bar_size, show_border=False, colormap='Greens')
     tm_water_level = water_tank.timestamp.strftime('%H:%M') if water_tank.has_succeeded() else UNKNOWN
 
     # system status
@@ -206,13 +301,10 @@ def index(request):
         'hum_in_tendency_icon': tenicon_hum_in,
         'pressure': str_pressure,
         'pressure_tendency_icon': tenicon_pressure,
-        'cesspit_progress': cesspit_progress,
         'cesspit_reading_state': cesspit_reading_state,
         'cesspit_predicted_full_date': cesspit_predicted_full_date,
         'tm_cesspit': tm_cesspit,
-        'aq_pm_10_norm_perc': aq_pm_10_norm_perc,
         'aq_pm_10_level': aq_pm_10_level,
-        'aq_pm_2_5_norm_perc': aq_pm_2_5_norm_perc,
         'aq_pm_2_5_level': aq_pm_2_5_level,
         'tm_aq': tm_aq,
         'sunrise': daylight.sunrise if daylight.has_succeeded() else UNKNOWN,
@@ -228,7 +320,6 @@ def index(request):
         'tm_sol': tm_sol,
         'sol_prod_now_w': sol_prod_now_w,
         'sol_prod_now_perc': sol_prod_now_perc,
-        'sol_prod_now_progress': sol_prod_now_progress_bar,
         'sol_prod_today': sol_prod_today,
         'sol_prod_h_min_w': sol_prod_h_min_w,
         'sol_prod_h_min_perc': sol_prod_h_min_perc,
@@ -245,7 +336,6 @@ def index(request):
         'rain_obs_h': rain_obs_h,
         'date': _current_date,
         'date_short': _short_date,
-        'water_tank_progress': water_level,
         'tm_water_tank_level': tm_water_level,
         'internet_icon': internet_icon,
         'internet_download': internet_download,
@@ -260,14 +350,77 @@ def index(request):
         'system_status_tm': system_status_tm,
     }
 
-    return HttpResponse(template.render(context, request))
-
-
+    if with_graphs:
+        cesspit_progress, aq_pm_10_norm_perc, aq_pm_2_5_norm_perc, sol_prod_now_progress_bar, water_level = \
+            progress_bars.get_progress_bars(
+                dict(percentage=cesspit.original_reading.fill if cesspit.has_succeeded() else 0,
+                     size=progress_bar_size, colormap='RdYlGn_r'),
+                dict(percentage=air_quality.pm_10 if air_quality.has_succeeded() else 0,
+                     size=progress_bar_size, colormap='RdYlGn_r'),
+                dict(percentage=air_quality.pm_2_5 if air_quality.has_succeeded() else 0,
+                     size=progress_bar_size, colormap='RdYlGn_r'),
+                dict(percentage=solar_plant.current_production_perc if solar_plant.has_succeeded() else 0,
+                     size=progress_bar_size, show_border=False, colormap='Greens'),
+                dict(percentage=int(water_tank.fill if water_tank.has_succeeded() else 0),
+                     size=progress_bar_size, show_border=False, colormap='Greens'))
+        context.update({
+            'cesspit_progress': cesspit_progress,
+            'aq_pm_10_norm_perc': aq_pm_10_norm_perc,
+            'aq_pm_2_5_norm_perc': aq_pm_2_5_norm_perc,
+            'sol_prod_now_progress': sol_prod_now_progress_bar,
+            'water_tank_progress': water_level,
+        })
+
+    return context
+
+
+# the values of the main page pushed to the displays (see index_live), built once per interval for all of them
+index_feed = LiveFeed(build=with_deadline(rest_configuration.get_page_deadline)(_index_context),
+                      interval=rest_configuration.get_live_interval())
+
+
+def index_live(request):
+    """
+    Server-Sent Events updating the main page in place. Each response carries one event, the values changed since
+    the version the browser has (all of them at first), and ends at once; the browser reconnects after [LIVE] interval,
+    telling the version it has (Last-Event-ID). So the displays do not hold any worker thread between the updates.
+    """
+    version, changes = index_feed.changes(request.META.get('HTTP_LAST_EVENT_ID'))
+    return _live_response(live_event(version, changes, retry=index_feed.interval))
+
+
+@long_polling
+async def index_live_async(request):
+    """
+    Same as index_live, but the browser having the current values is answered only when they change or, at the latest,
+    after [LIVE] max-duration (with no values); then it reconnects at once. The request waits on the event loop (ASGI),
+    without occupying any thread; the values are built in a thread, once per interval for all the displays.
+    """
+    since = request.META.get('HTTP_LAST_EVENT_ID')
+    changes = sync_to_async(index_feed.changes, thread_sensitive=False)
+    answer_at = time.monotonic() + rest_configuration.get_live_max_duration()
+    version, values = await changes(since)
+    while since and not values and time.monotonic() < answer_at:
+        with waiting():
+            await asyncio.sleep(min(index_feed.interval, answer_at - time.monotonic()))
+        version, values = await changes(since)
+    return _live_response(live_event(version, values, retry=LIVE_RECONNECT))
+
+
+def _live_response(event: str) -> HttpResponse:
+    response = HttpResponse(event, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+
+@with_deadline(rest_configuration.get_page_deadline)
 def external_temperature(request):
-    template = loader.get_template('temperatures_ext.html')
+    return _page(request, 'temperatures_ext.html', _external_temperature_context)
+
 
+def _external_temperature_context(with_graphs: bool = True) -> dict:
     information = TemperatureInfo()
-    graph = TemperatureGraph()
+    graph = TemperatureGraph(information)
 
     _current_date = datetime.today().strftime('%Y-%m-%d %H:%M')
     _short_date = datetime.today().strftime(REQUEST_DATE_FORMAT)
@@ -289,10 +442,6 @@ def external_temperature(request):
     str_temp_grass = f'{temp_grass.temperature:.1f} {CELSIUS}' if temp_grass.has_succeeded() else UNKNOWN
     tm_temp_grass = temp_grass.timestamp.strftime('%H:%M') if temp_grass.has_succeeded() else ''
 
-    temp_external_graph_svg = mark_safe(
-        graph.get_temp_daily_graph(sensor_location=SENSOR_LOC_EXTERNAL,
-                                   graph_title='Temperatura zewnętrzna - czujnik pieca'))
-
     context = {
         'temp_external': str_temp_external,
         'tm_temp_external': tm_temp_external,
@@ -304,19 +453,26 @@ def external_temperature(request):
         'tm_temp_garden': tm_temp_garden,
         'temp_grass': str_temp_grass,
         'tm_temp_grass': tm_temp_grass,
-        'temp_external_graph': temp_external_graph_svg,
         'date': _current_date,
-        'date_short': _short_date
+        'date_short': _short_date,
     }
 
-    return HttpResponse(template.render(context, request))
+    if with_graphs:
+        context['temp_external_graph'] = mark_safe(
+            graph.get_temp_daily_graph(sensor_location=SENSOR_LOC_EXTERNAL,
+                                       graph_title=GRAPH_TITLE_EXTERNAL))
 
+    return context
 
+
+@with_deadline(rest_configuration.get_page_deadline)
 def internal_temperature(request):
-    template = loader.get_template('temperatures_int.html')
+    return _page(request, 'temperatures_int.html', _internal_temperature_context)
+
 
+def _internal_temperature_context(with_graphs: bool = True) -> dict:
     information = TemperatureInfo()
-    graph = TemperatureGraph()
+    graph = TemperatureGraph(information)
 
     _current_date = datetime.today().strftime('%Y-%m-%d %H:%M')
     _short_date = datetime.today().strftime(REQUEST_DATE_FORMAT)
@@ -335,9 +491,6 @@ def internal_temperature(request):
     str_temp_garage = f'{temp_garage.temperature:.1f} {CELSIUS}' if temp_garage.has_succeeded() else UNKNOWN
     tm_temp_garage = temp_garage.timestamp.strftime('%H:%M') if temp_garage.has_succeeded() else ''
 
-    temp_office_graph_svg = mark_safe(graph.get_temp_daily_graph(sensor_location=SENSOR_LOC_OFFICE,
-                                                                 graph_title='Temperatura w biurze'))
-
     context = {
         'temp_office': str_temp_office,
         'tm_temp_office': tm_temp_office,
@@ -347,22 +500,33 @@ def internal_temperature(request):
         'tm_temp_bunker': tm_temp_bunker,
         'temp_garage': str_temp_garage,
         'tm_temp_garage': tm_temp_garage,
-        'temp_office_graph': temp_office_graph_svg,
         'date': _current_date,
-        'date_short': _short_date
+        'date_short': _short_date,
     }
 
-    return HttpResponse(template.render(context, request))
+    if with_graphs:
+        context['temp_office_graph'] = mark_safe(graph.get_temp_daily_graph(sensor_location=SENSOR_LOC_OFFICE,
+                                                                            graph_title=GRAPH_TITLE_OFFICE))
+
+    return context
 
 
+@with_deadline(rest_configuration.get_page_deadline)
 def any_temperature(request):
+    if not request.GET.get('sensor'):
+        return HttpResponseBadRequest()
+
+    return _page(request, 'temperature.html', lambda: _any_temperature_context(request))
+
+
+def _any_temperature_context(request, with_graphs: bool = True) -> dict:
+    """
+    :param request: the sensor (location), its name and the date are taken from the parameters of the request
+    """
     sensor_loc = request.GET.get('sensor')
     sensor_name = request.GET.get('name')
     req_date = request.GET.get('date')
 
-    if not sensor_loc:
-        return HttpResponseBadRequest()
-
     if not sensor_name:
         sensor_name = UNKNOWN
 
@@ -379,11 +543,12 @@ def any_temperature(request):
     _str_date_minus = _date_minus.strftime(REQUEST_DATE_FORMAT)
     _str_date_plus = _date_plus.strftime(REQUEST_DATE_FORMAT)
 
-    template = loader.get_template('temperature.html')
-
     stats = TemperatureDailyStatistics().get_daily_statistics(sensor_location=sensor_loc, the_date=_date)
     graph = TemperatureGraph()
 
+    # the user is likely to step to the neighbouring day next
+    prefetch_temperature_history(sensor_loc, _date_minus, _date_plus)
+
     context = {
         'sensor_name': sensor_name,
         'sensor_loc': sensor_loc,
@@ -391,8 +556,6 @@ def any_temperature(request):
         'the_date': _date.strftime('%Y-%m-%d'),
         'date_minus': _date_minus.strftime('%Y-%m-%d'),
         'date_plus': _date_plus.strftime('%Y-%m-%d'),
-        'temp_graph': graph.get_temp_daily_graph(
-            sensor_location=sensor_loc, graph_title=None, the_date=_date),
         'daily_min': f'{stats.statistics_24h.temp_min:.1f} {CELSIUS}' if stats.has_succeeded() else UNKNOWN,
         'daily_min_tm': f'{stats.statistics_24h.min_at.strftime("%H:%M")}' if stats.has_succeeded() else UNKNOWN,
         'daily_avg': f'{stats.statistics_24h.temp_avg:.1f} {CELSIUS}' if stats.has_succeeded() else UNKNOWN,
@@ -410,14 +573,39 @@ def any_temperature(request):
         'night_max_tm': f'{stats.statistics_night.max_at.strftime("%H:%M")}' if stats.has_succeeded() and stats.statistics_night.has_succeeded() else UNKNOWN
     }
 
-    return HttpResponse(template.render(context, request))
+    if with_graphs:
+        context['temp_graph'] = graph.get_temp_daily_graph(
+            sensor_location=sensor_loc, graph_title=None, the_date=_date)
+
+    return context
 
 
+@with_deadline(rest_configuration.get_page_deadline)
 def cesspit(request):
-    template = loader.get_template('cesspit.html')
+    return _page(request, 'cesspit.html', _cesspit_context, calls=_cesspit_calls())
 
+
+@with_deadline(rest_configuration.get_page_deadline)
+async def cesspit_async(request):
+    """
+    Same as cesspit, but the readings and the graphs are queried on the event loop (ASGI), see _async_page
+    """
+    return await _async_page(request, 'cesspit.html', _cesspit_context, _cesspit_calls())
+
+
+def _cesspit_calls() -> list:
+    """
+    :return: tuples (endpoint, params) of all the information presented by the cesspit page
+    """
+    return [(rest_configuration.get_current_cesspit_level_endpoint(), None),
+            (rest_configuration.get_current_cesspit_prediction_endpoint(), None),
+            (rest_configuration.get_current_cesspit_log_endpoint(), None),
+            *CesspitGraph.graph_requests()]
+
+
+def _cesspit_context(with_graphs: bool = True) -> dict:
     information = CesspitInfo()
-    graph = CesspitGraph()
+    graph = CesspitGraph(information)
     progress_bar = ProgressBar()
 
     progress_bar_size = (4, 0.32)
@@ -429,8 +617,6 @@ def cesspit(request):
     r_prediction = information.get_cesspit_prediction()
     r_log = information.get_cesspit_log()
 
-    cesspit_progress = progress_bar.get_progress_bar(
-        r_level.original_reading.fill if r_level.has_succeeded() else 0, size=progress_bar_size, colormap='RdYlGn_r')
     cesspit_reading_state = '' if not r_level.has_succeeded() else 'KO' if r_level.failure_detected else 'OK'
     tm_cesspit = r_level.original_reading.timestamp.strftime('%H:%M') if r_level.has_succeeded() else ''
     cesspit_predicted_full_date = r_prediction.predicted_date.strftime('%Y-%m-%d %H:%M') \
@@ -443,31 +629,45 @@ def cesspit(request):
     #     if r_log.has_succeeded() else []
     cesspit_log = list(reversed(r_log.log_entries)) if r_log.has_succeeded() else []
 
-    graph_today_svg = mark_safe(graph.get_today_usage_graph())
-    graph_week_svg = mark_safe(graph.get_last_week_usage_graph())
-    graph_prediction_svg = mark_safe(graph.get_prediction_graph())
-
     context = {
         'date': _current_date,
         'date_short': _short_date,
-        'cesspit_progress': cesspit_progress,
         'cesspit_reading_state': cesspit_reading_state,
         'cesspit_predicted_full_date': cesspit_predicted_full_date,
         'cesspit_predicted_at': cesspit_predicted_at,
         'cesspit_predicted_in_days': cesspit_predicted_in_days,
         'cesspit_log': cesspit_log,
         'tm_cesspit': tm_cesspit,
-        'graph_today': graph_today_svg,
-        'graph_this_week': graph_week_svg,
-        'graph_prediction': graph_prediction_svg,
     }
 
-    return HttpResponse(template.render(context, request))
+    if with_graphs:
+        context.update({
+            'cesspit_progress': progress_bar.get_progress_bar(
+                r_level.original_reading.fill if r_level.has_succeeded() else 0,
+                size=progress_bar_size, colormap='RdYlGn_r'),
+            'graph_today': mark_safe(graph.get_today_usage_graph()),
+            'graph_this_week': mark_safe(graph.get_last_week_usage_graph()),
+            'graph_prediction': mark_safe(graph.get_prediction_graph()),
+        })
 
+    return context
 
+
+@with_deadline(rest_configuration.get_page_deadline)
 def system_status(request):
-    template = loader.get_template('system_status.html')
+    return _page(request, 'system_status.html', _system_status_context)
+
 
+@with_deadline(rest_configuration.get_page_deadline)
+async def system_status_async(request):
+    """
+    Same as system_status, but the status is queried on the event loop (ASGI), see _async_page
+    """
+    return await _async_page(request, 'system_status.html', _system_status_context,
+                             [(rest_configuration.get_system_status_endpoint(), None)])
+
+
+def _system_status_context() -> dict:
     _icon_internet_ok = 'globe-green.svg'
     _icon_internet_ko = 'globe-red.svg'
     _icon_db_ok = 'database-fill-check.svg'
@@ -492,6 +692,20 @@ def system_status(request):
         else " | ".join([msg for msg in (status.database_status.connected_to, status.database_status.log, status.database_status.issue) if msg is not None])
     )]
 
+    # the state of the circuit breakers of the backend, as seen by this web application
+    backend_host = rest_configuration.get_system_status_endpoint().get_host_id()
+    backend_circuit = circuit_breakers.get(backend_host)
+    components.append((
+        'REST',
+        backend_host,
+        _icon_services_ok if backend_circuit.state == CircuitBreaker.CLOSED else
+        _icon_services_warn if backend_circuit.state == CircuitBreaker.HALF_OPEN else
+        _icon_services_ko,
+        backend_circuit.changed_at.strftime('%H:%M'),
+        " | ".join([f'{_name}: {_state}' for _name, _state in circuit_breakers.states().items()
+                    if _state != CircuitBreaker.CLOSED]) or CircuitBreaker.CLOSED
+    ))
+
     if status.has_succeeded() and status.service_statuses is not None:
         for _service in status.service_statuses:
             components.extend([
@@ -502,7 +716,7 @@ def system_status(request):
                     _icon_services_ko if _a.state == ServiceActivityState.DEAD else
                     _icon_services_warn if _a.state == ServiceActivityState.WARNING else
                     UNKNOWN_ICON,
-                    _a.timestamp.strftime('%H:%M' if (datetime.now() - _a.timestamp).total_seconds() < 24*60*60
+                    _a.timestamp.strftime('%H:%M' if (status.timestamp - _a.timestamp).total_seconds() < 24*60*60
                                           else '%Y-%m-%d %H:%m'),
                     _a.message if _a.message is not None else UNKNOWN,
                 )
@@ -515,7 +729,7 @@ def system_status(request):
             (
                 host_status.host_name,  # 0
                 host_status.timestamp.strftime('%Y-%m-%d %H:%M'),  # 1
-                _time_lapsed(host_status.boot_time),  # 2
+                _time_lapsed(host_status.boot_time, host_status.timestamp),  # 2
                 _icon_services_ok if host_status.up else _icon_services_ko  # 3
             )
             for host_status in status.host_statuses
@@ -531,16 +745,72 @@ def system_status(request):
         "inet_jitter": UNKNOWN if inet is None else f"{inet.jitter_microseconds / 1000:.3f} ms",
         "inet_ip": UNKNOWN if inet is None or inet.external_ip is None else inet.external_ip,
         "components": components,
-        "servers": servers
+        "servers": servers,
     }
 
-    return HttpResponse(template.render(context, request))
+    return context
+
+
+# the JSON API: the same information as presented by the pages (formatted the same way), but without the graphs;
+# for the lightweight clients (e.g. e-ink panels), which poll the state and can't afford parsing the whole page
+
+def _api_response(request, build_context, calls=()) -> HttpResponse:
+    """
+    :param build_context: callable returning the context of the page presenting the same information
+    :param calls: see _conditional_response
+    """
+    def _render(context: dict):
+        with timed('render'):
+            return JsonResponse(context, json_dumps_params={'separators': (',', ':'), 'ensure_ascii': False})
+    return _conditional_response(request, build_context, _render, calls)
+
+
+@with_deadline(rest_configuration.get_page_deadline)
+def api_index(request):
+    return _api_response(request, lambda: _index_context(with_graphs=False), _index_calls())
+
+
+@with_deadline(rest_configuration.get_page_deadline)
+def api_external_temperature(request):
+    return _api_response(request, lambda: _external_temperature_context(with_graphs=False))
+
+
+@with_deadline(rest_configuration.get_page_deadline)
+def api_internal_temperature(request):
+    return _api_response(request, lambda: _internal_temperature_context(with_graphs=False))
+
+
+@with_deadline(rest_configuration.get_page_deadline)
+def api_any_temperature(request):
+    if not request.GET.get('sensor'):
+        return HttpResponseBadRequest()
+    return _api_response(request, lambda: _any_temperature_context(request, with_graphs=False))
+
+
+@with_deadline(rest_configuration.get_page_deadline)
+def api_cesspit(request):
+    return _api_response(request, lambda: _cesspit_context(with_graphs=False), _cesspit_calls())
+
+
+@with_deadline(rest_configuration.get_page_deadline)
+def api_system_status(request):
+    return _api_response(request, _system_status_context)
+
+
+def metrics(request):
+    """
+    The metrics of this process, in the format of Prometheus
+    """
+    return HttpResponse(bhs_metrics.registry.exposition(), content_type=bhs_metrics.CONTENT_TYPE)
 
 
-def _time_lapsed(start_time: datetime) -> str:
+def _time_lapsed(start_time: datetime, as_of: datetime) -> str:
+    """
+    :param as_of: the time of the reading (not the current time, so that the page does not change by itself)
+    """
     if start_time is None:
         return UNKNOWN
-    delta = datetime.now() - start_time
+    delta = as_of - start_time
     hours = round(delta.total_seconds()) // (60*60)
     days = (hours // 24) % 7
     weeks = (hours // 24) // 7